@@ -0,0 +1,146 @@
+from app.db import AppDB
+
+
+CATALOG_KINDS = ("mkl", "meridian")
+
+
+def _mask(positions, size: int) -> int:
+    """Битовая маска (int) из номеров товаров."""
+    bits = bytearray((size + 7) // 8)
+    for i in positions:
+        bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, "little")
+
+
+class CatalogIndex:
+    """
+    Снимок каталога товаров (МКЛ или Меридиан) в памяти для окон выбора товара.
+
+    Названия заранее приведены к нижнему регистру; для каждой группы хранится
+    битовая маска товаров всего её поддерева. Поиск отмечает совпавшие товары
+    маской, и группа попадает в дерево, если её маска пересекается с найденными,
+    — без запросов к БД. При уточнении запроса (дописывании символов) проверяются
+    только товары, совпавшие с предыдущим запросом.
+    """
+
+    def __init__(self, kind: str, groups: list[dict], products: list[dict], version: int = 0):
+        self.kind = kind
+        self.version = version
+        self.groups: dict[int, dict] = {g["id"]: g for g in groups}
+        self.products = products
+        self._lower = [(p.get("name", "") or "").lower() for p in products]
+
+        # Порядок групп и товаров — как в list_*_by_group (sort_order, name)
+        self.children: dict[int | None, list[int]] = {}
+        for g in groups:
+            parent = g.get("parent_id")
+            if parent is not None and parent not in self.groups:
+                parent = None
+            self.children.setdefault(parent, []).append(g["id"])
+        self.by_group: dict[int | None, list[int]] = {}
+        for i, p in enumerate(products):
+            self.by_group.setdefault(p.get("group_id"), []).append(i)
+
+        size = len(products)
+        self.all_mask = (1 << size) - 1
+        self.subtree_mask: dict[int, int] = {}
+        for gid in self.groups:
+            self.subtree_mask[gid] = _mask(self._subtree_positions(gid), size)
+        self._last: tuple[str, list[int]] | None = None
+
+    @classmethod
+    def load(cls, db: AppDB, kind: str) -> "CatalogIndex":
+        if kind == "mkl":
+            groups, products = db.list_product_groups_mkl(), db.list_products_mkl()
+        elif kind == "meridian":
+            groups, products = db.list_product_groups_meridian(), db.list_products_meridian()
+        else:
+            raise ValueError(f"Неизвестный каталог: {kind}")
+        return cls(kind, groups, products, version=db.catalog_version(kind))
+
+    def _subtree_positions(self, gid: int) -> list[int]:
+        positions: list[int] = []
+        stack, seen = [gid], set()
+        while stack:
+            g = stack.pop()
+            if g in seen:
+                continue  # защита от циклов parent_id
+            seen.add(g)
+            positions.extend(self.by_group.get(g, ()))
+            stack.extend(self.children.get(g, ()))
+        return positions
+
+    # --- Search ---
+    def match(self, term: str) -> list[int]:
+        """Номера товаров, в названии которых есть term (без учёта регистра)."""
+        term = (term or "").strip().lower()
+        if not term:
+            return list(range(len(self.products)))
+        if self._last and term.startswith(self._last[0]):
+            candidates = self._last[1]
+        else:
+            candidates = range(len(self.products))
+        lower = self._lower
+        found = [i for i in candidates if term in lower[i]]
+        self._last = (term, found)
+        return found
+
+    def filter(self, term: str, positions: list[int] | None = None, ranked: bool = False) -> dict:
+        """
+        Отфильтрованное дерево: {"ungrouped": [товары без группы], "groups": [узлы]},
+        узел — {"group": группа, "products": [товары], "children": [узлы]}.
+        При пустом term возвращается весь каталог. positions — уже найденные
+        номера товаров (например, из другого поискового движка); ranked=True —
+        positions упорядочены по релевантности, и товары внутри группы и сами
+        группы выводятся в этом порядке (группа — по лучшему товару поддерева).
+        """
+        term = (term or "").strip().lower()
+        if positions is None:
+            positions = self.match(term) if term else None
+        if positions is None:
+            matched, mask = None, self.all_mask
+        else:
+            matched, mask = set(positions), _mask(positions, len(self.products))
+        rank = {pos: i for i, pos in reversed(list(enumerate(positions)))} if (ranked and positions) else None
+        best: dict[int, int] = {}
+
+        def products_of(gid):
+            idx = self.by_group.get(gid, ())
+            if matched is not None:
+                idx = [i for i in idx if i in matched]
+            if rank is not None:
+                idx = sorted(idx, key=rank.__getitem__)
+            return [self.products[i] for i in idx]
+
+        def by_rank(nodes):
+            if rank is not None:
+                nodes.sort(key=lambda n: best.get(n["group"]["id"], len(rank)))
+            return nodes
+
+        def build(gid, guard) -> dict | None:
+            if gid in guard:
+                return None
+            if matched is not None and not (self.subtree_mask.get(gid, 0) & mask):
+                return None
+            guard = guard | {gid}
+            children = by_rank([n for n in (build(c, guard) for c in self.children.get(gid, ())) if n])
+            node = {"group": self.groups[gid], "products": products_of(gid), "children": children}
+            if rank is not None:
+                own = [rank[i] for i in self.by_group.get(gid, ()) if i in rank]
+                sub = [best[c["group"]["id"]] for c in children if c["group"]["id"] in best]
+                if own or sub:
+                    best[gid] = min(own + sub)
+            return node
+
+        nodes = by_rank([n for n in (build(gid, frozenset()) for gid in self.children.get(None, ())) if n])
+        return {"ungrouped": products_of(None), "groups": nodes}
+
+
+def catalog_index(db: AppDB, kind: str) -> CatalogIndex:
+    """Общий индекс каталога для БД; перечитывается только после записи в каталог."""
+    cache = db.__dict__.setdefault("_catalog_indexes", {})
+    index = cache.get(kind)
+    if index is None or index.version != db.catalog_version(kind):
+        index = CatalogIndex.load(db, kind)
+        cache[kind] = index
+    return index
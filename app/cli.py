@@ -0,0 +1,223 @@
+"""
+Пакетные задачи без окна: python -m app.cli КОМАНДА …
+
+Для планировщика заданий ОС и скриптов обслуживания: работает с той же базой
+и настройками, что и программа, но не импортирует tkinter и модули экранов.
+Команды: export, backup, import, vacuum, reindex, prices, stats.
+"""
+import argparse
+import os
+import sys
+
+from app.storage import storage_dir
+
+
+# Заголовки CSV: ключи полей или подписи колонок экранов
+_CSV_ALIASES = {
+    "фио": "fio", "клиент": "fio", "телефон": "phone", "товар": "product",
+    "количество": "qty", "статус": "status", "дата": "date", "комментарий": "comment",
+}
+
+
+def _open_db(args, create: bool = False):
+    from app.db import AppDB
+
+    # Опечатка в --db не должна молча создавать пустую базу: задача планировщика получит код ошибки
+    if not create and not os.path.isfile(args.db):
+        raise FileNotFoundError(f"база не найдена: {args.db}")
+    # Сиды каталогов не нужны пакетным задачам — их выполнит окно при открытии
+    return AppDB(args.db, defer_seed=True)
+
+
+def _read_settings(path: str) -> dict:
+    import json
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _read_csv(path: str) -> list[dict]:
+    """Строки CSV как словари с нормализованными ключами (разделитель ; или , определяется сам)."""
+    import csv
+
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+        except csv.Error:
+            dialect = csv.excel
+        rows = []
+        for row in csv.DictReader(f, dialect=dialect):
+            item = {}
+            for key, value in row.items():
+                if key is None:
+                    continue
+                norm = key.strip().lower()
+                item[_CSV_ALIASES.get(norm, norm)] = (value or "").strip()
+            rows.append(item)
+    return rows
+
+
+def _db_size(path: str) -> int:
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.isfile(p))
+
+
+# --- Commands ---
+def cmd_export(args) -> int:
+    from app.export import PENDING, default_export_dir, export_orders
+
+    db = _open_db(args)
+    folder = args.out or default_export_dir(_read_settings(args.settings))
+    status = None if args.all else PENDING
+    path = export_orders(db.db_path, args.type, args.format, folder, status)
+    if path is None:
+        print("Нет заказов для экспорта.")
+        return 0
+    print(path)
+    return 0
+
+
+def cmd_backup(args) -> int:
+    from app.storage import backup_db_weekly
+
+    if not os.path.isfile(args.db):
+        print(f"База не найдена: {args.db}", file=sys.stderr)
+        return 1
+    path = backup_db_weekly(args.db, args.dir or os.path.dirname(os.path.abspath(args.db)), force=args.force)
+    if path is None:
+        print("Не удалось создать копию.", file=sys.stderr)
+        return 1
+    print(path)
+    return 0
+
+
+def cmd_import(args) -> int:
+    rows = _read_csv(args.file)
+    db = _open_db(args, create=True)
+    if args.kind == "clients":
+        added, skipped = db.import_clients(rows)
+        print(f"Клиенты: добавлено {added}, пропущено {skipped}.")
+    else:
+        added = db.import_mkl_orders([r for r in rows if r.get("fio") or r.get("phone") or r.get("product")])
+        print(f"Заказы МКЛ: добавлено {added}.")
+    return 0
+
+
+def cmd_vacuum(args) -> int:
+    db = _open_db(args)
+    before = _db_size(args.db)
+    db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+    db.conn.execute("VACUUM;")
+    print(f"{before / 1024:.0f} КБ -> {_db_size(args.db) / 1024:.0f} КБ")
+    return 0
+
+
+def cmd_reindex(args) -> int:
+    from app.rules import RuleEngine
+
+    db = _open_db(args)
+    RuleEngine(db)  # создаёт недостающие индексы правил уведомлений
+    db.conn.execute("REINDEX;")
+    db._rebuild_status_counts()
+    db.conn.commit()
+    db.conn.execute("ANALYZE;")
+    db.conn.execute("PRAGMA optimize;")
+    print("Индексы перестроены, счётчики статусов пересчитаны.")
+    return 0
+
+
+def cmd_prices(args) -> int:
+    from app.pricelist import PriceIndex
+
+    db = _open_db(args)
+    summary = PriceIndex(db).refresh(force=args.force)
+    print(f"Разобрано: {summary['parsed']}, без изменений: {summary['cached']}, позиций: {summary['rows']}.")
+    for name, error in summary["errors"].items():
+        print(f"  {name}: {error}", file=sys.stderr)
+    return 1 if summary["errors"] else 0
+
+
+def cmd_stats(args) -> int:
+    import json
+
+    db = _open_db(args)
+    tables = [
+        r["name"] for r in db.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name;"
+        )
+    ]
+    stats = {
+        "db": os.path.abspath(args.db),
+        "size_kb": round(_db_size(args.db) / 1024),
+        "rows": {t: db.conn.execute(f'SELECT COUNT(*) FROM "{t}";').fetchone()[0] for t in tables},
+        "status_counts": db.status_counts(),
+    }
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        return 0
+    print(f"База: {stats['db']} ({stats['size_kb']} КБ)")
+    for table, count in stats["rows"].items():
+        print(f"  {table:<32} {count}")
+    for order_type, counts in stats["status_counts"].items():
+        line = ", ".join(f"{s}: {n}" for s, n in counts.items()) or "нет заказов"
+        print(f"{order_type}: {line}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    base = storage_dir()
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Пакетные задачи без окна программы.")
+    parser.add_argument("--db", default=os.path.join(base, "data.db"), help="файл базы (по умолчанию data.db рядом с программой)")
+    parser.add_argument("--settings", default=os.path.join(base, "settings.json"), help="файл настроек")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export", help="выгрузить заказы «Не заказан» (TXT для поставщика, CSV, JSON Lines, XLSX)")
+    p.add_argument("type", choices=("mkl", "meridian"))
+    p.add_argument("--format", default="txt", choices=("txt", "csv", "jsonl", "xlsx"))
+    p.add_argument("--all", action="store_true", help="все заказы, а не только «Не заказан»")
+    p.add_argument("--out", help="папка (по умолчанию — папка экспорта из настроек)")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("backup", help="копия базы в «Копия БД» с ротацией")
+    p.add_argument("--dir", help="папка, в которой создаётся «Копия БД» (по умолчанию — рядом с базой)")
+    p.add_argument("--force", action="store_true", help="перезаписать сегодняшнюю копию")
+    p.set_defaults(func=cmd_backup)
+
+    p = sub.add_parser("import", help="импорт из CSV (заголовки — ключи полей или подписи колонок)")
+    p.add_argument("kind", choices=("clients", "mkl"))
+    p.add_argument("file")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("vacuum", help="сжать базу (VACUUM)")
+    p.set_defaults(func=cmd_vacuum)
+
+    p = sub.add_parser("reindex", help="перестроить индексы и счётчики статусов, обновить статистику")
+    p.set_defaults(func=cmd_reindex)
+
+    p = sub.add_parser("prices", help="разобрать изменившиеся файлы прайсов в строки (товар, цена)")
+    p.add_argument("--force", action="store_true", help="разобрать заново все файлы")
+    p.set_defaults(func=cmd_prices)
+
+    p = sub.add_parser("stats", help="размер базы, число строк, заказы по статусам")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_stats)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except Exception as e:
+        # Например, «database is locked», пока окно держит запись
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
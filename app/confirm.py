@@ -0,0 +1,222 @@
+import csv
+import re
+from collections import deque
+
+from app.db import AppDB
+from app.supplier import ORDERED, PARAMS, PENDING, line_key_sql, qty_sql
+
+
+# Подтверждение поставщика сопоставляется с открытыми заказами МКЛ
+OPEN_STATUSES = (PENDING, ORDERED)
+SNIFF = 65536  # байт для определения кодировки и разделителя CSV
+
+# Подписи полей — как в экспорте TXT/CSV (app/export.py), без регистра
+LABELS = {
+    "товар": "product", "sph": "sph", "cyl": "cyl", "ax": "ax", "add": "add", "bc": "bc", "d": "d",
+    "d, мм": "d", "количество": "qty", "кол-во": "qty", "комментарий": "comment",
+}
+_LABEL_RE = re.compile(r"(?i)(?<![\w])(товар|sph|cyl|ax|add|bc|d|количество|кол-во|комментарий)\s*:\s*")
+
+
+def _encoding(path: str) -> str:
+    with open(path, "rb") as f:
+        head = f.read(SNIFF)
+    try:
+        head.decode("utf-8")
+        return "utf-8-sig"
+    except UnicodeDecodeError as e:
+        # Обрезанный на границе блока символ — всё равно UTF-8
+        return "utf-8-sig" if e.start >= len(head) - 3 else "cp1251"
+
+
+def parse_txt_line(text: str) -> dict:
+    """«Sph: -1.25 Cyl: -0.75 … Количество: 2» → {"sph": "-1.25", …}; без подписей — {}."""
+    found = list(_LABEL_RE.finditer(text))
+    item = {}
+    for i, m in enumerate(found):
+        end = found[i + 1].start() if i + 1 < len(found) else len(text)
+        value = text[m.end():end].strip()
+        key = LABELS[m.group(1).lower()]
+        if key == "d" and value.lower().endswith("мм"):
+            value = value[:-2].strip()
+        item[key] = value
+    return item
+
+
+def _iter_txt(f):
+    product = ""
+    for lineno, raw in enumerate(f, 1):
+        text = raw.strip()
+        if not text:
+            continue
+        item = parse_txt_line(text)
+        if not item:
+            # Строка без подписей — заголовок товара, как в экспорте
+            product = "" if text == "(Без названия)" else text
+            continue
+        item.setdefault("product", product)
+        item["lineno"] = lineno
+        yield item
+
+
+def _iter_csv(f, sample: str):
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(f, dialect=dialect)
+    for lineno, row in enumerate(reader, 2):
+        item = {}
+        for key, value in row.items():
+            if key is None:
+                continue
+            norm = key.strip().lower()
+            item[LABELS.get(norm, norm)] = (value or "").strip()
+        if any(item.get(k) for k in ("product", "qty", *PARAMS)):
+            item["lineno"] = lineno
+            yield item
+
+
+def iter_confirmation(path: str):
+    """
+    Строки подтверждения/накладной поставщика потоком: TXT в формате экспорта
+    (заголовок товара, затем «Sph: … Количество: …») или CSV с теми же
+    подписями колонок. Каждая строка — {"product", параметры, "qty", "lineno"}.
+    """
+    encoding = _encoding(path)
+    with open(path, "r", encoding=encoding, errors="replace", newline="") as f:
+        sample = f.read(SNIFF)
+        f.seek(0)
+        first = next((l for l in sample.splitlines() if l.strip()), "")
+        if path.lower().endswith(".csv") or ("товар" in first.lower() and ("sph" in first.lower()) and not _LABEL_RE.search(first)):
+            yield from _iter_csv(f, sample)
+        else:
+            yield from _iter_txt(f)
+
+
+class ConfirmationImport:
+    """
+    Сверка подтверждения поставщика с заказами МКЛ.
+
+    Строки файла и снимок открытых заказов с вычисленным ключом товар +
+    параметры (те же выражения, что в сводном заказе) кладутся во временные
+    таблицы с индексом по ключу, так что тысячи строк сверяются одним
+    запросом. Ключ использует функцию соединения casefold, поэтому индекс
+    временный, а не на mkl_orders: запись в базу из соединения без этой
+    функции не ломается. Количество строки закрывает сначала заказы
+    «Заказан» (их и подтверждает поставщик), затем «Не заказан»; внутри —
+    заказ ровно на остаток, иначе самый старый. apply() меняет статусы
+    совпавших заказов одной транзакцией.
+    """
+
+    def __init__(self, db: AppDB):
+        self.db = db
+        self.conn = db.conn
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        # Индекс прежних версий на выражениях ключа (с LOWER) больше не используется
+        self.conn.execute("DROP INDEX IF EXISTS idx_mkl_orders_line_key;")
+        keys = ", ".join(f"k{i}" for i in range(len(PARAMS) + 1))
+        self.conn.execute(
+            f"""
+            CREATE TEMP TABLE IF NOT EXISTS confirmation_orders (
+                id INTEGER PRIMARY KEY, ordered INTEGER NOT NULL, qty INTEGER NOT NULL, {keys}
+            );
+            """
+        )
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS temp.idx_confirmation_orders_key ON confirmation_orders({keys});")
+        self.conn.execute(
+            f"""
+            CREATE TEMP TABLE IF NOT EXISTS confirmation_lines (
+                lineno INTEGER PRIMARY KEY,
+                product TEXT, sph TEXT, cyl TEXT, ax TEXT, "add" TEXT, bc TEXT, qty TEXT, {keys}
+            );
+            """
+        )
+        self.conn.commit()
+
+    def reconcile(self, items, statuses=OPEN_STATUSES) -> list[dict]:
+        """
+        Сопоставить строки файла (iter_confirmation) с заказами в статусах
+        statuses. Для каждой строки: qty — количество в файле, matched —
+        покрыто заказами, order_ids — эти заказы (каждый заказ — не более
+        одной строки).
+        """
+        keys = [f"k{i}" for i in range(len(PARAMS) + 1)]
+        marks = ", ".join("?" for _ in statuses)
+        with self.conn:
+            self.conn.execute("DELETE FROM temp.confirmation_lines;")
+            self.conn.execute("DELETE FROM temp.confirmation_orders;")
+            self.conn.executemany(
+                'INSERT INTO temp.confirmation_lines (lineno, product, sph, cyl, ax, "add", bc, qty) VALUES (?, ?, ?, ?, ?, ?, ?, ?);',
+                (
+                    (it["lineno"], it.get("product", ""), *(it.get(p, "") for p in PARAMS), it.get("qty", ""))
+                    for it in items
+                ),
+            )
+            # Ключ строки файла вычисляется один раз, дальше — только по колонкам k*
+            self.conn.execute(
+                f"UPDATE temp.confirmation_lines SET {', '.join(f'{k} = {e}' for k, e in zip(keys, line_key_sql()))};"
+            )
+            # Снимок только тех открытых заказов, чьи товары есть в файле
+            self.conn.execute(
+                f"""
+                INSERT INTO temp.confirmation_orders (id, ordered, qty, {", ".join(keys)})
+                SELECT o.id, o.status = ?, {qty_sql('o.qty')}, {", ".join(line_key_sql("o"))}
+                FROM mkl_orders o
+                WHERE o.status IN ({marks}) AND casefold(TRIM(o.product)) IN (SELECT k0 FROM temp.confirmation_lines);
+                """,
+                (ORDERED, *statuses),
+            )
+        key_c = ", ".join(keys)
+        lines = {}
+        groups = {}  # строка-представитель ключа → строки файла с этим ключом
+        for r in self.conn.execute(
+            f'''
+            SELECT lineno, product, sph, cyl, ax, "add", bc, {qty_sql("qty")} AS qty,
+                   MIN(lineno) OVER (PARTITION BY {key_c}) AS leader
+            FROM temp.confirmation_lines c ORDER BY lineno;
+            '''
+        ):
+            line = {k: r[k] for k in r.keys() if k != "leader"}
+            line.update(matched=0, order_ids=[])
+            lines[r["lineno"]] = line
+            groups.setdefault(r["leader"], []).append(line)
+        # Заказы ищутся один раз на ключ (по индексу), а не на каждую строку файла
+        on = " AND ".join(f"o.{k} IS c.{k}" for k in keys)
+        orders = {}
+        for r in self.conn.execute(
+            f"""
+            SELECT c.lineno, o.id, o.ordered, o.qty
+            FROM temp.confirmation_lines c JOIN temp.confirmation_orders o ON {on}
+            WHERE c.lineno IN (SELECT MIN(lineno) FROM temp.confirmation_lines GROUP BY {key_c})
+            ORDER BY c.lineno, o.ordered DESC, o.id;
+            """
+        ):
+            orders.setdefault(r["lineno"], []).append((0 if r["ordered"] else 1, r["id"], r["qty"]))
+        # «Заказан» раньше «Не заказан»; среди них — заказ ровно на остаток, иначе самый старый
+        for leader, group in groups.items():
+            by_qty = {}
+            for rank, order_id, qty in orders.get(leader, []):
+                by_qty.setdefault(qty, deque()).append((rank, order_id))
+            for line in group:
+                rest = line["qty"]
+                while rest > 0:
+                    fits = [q for q, queue in by_qty.items() if queue and q <= rest]
+                    if not fits:
+                        break
+                    qty = min(fits, key=lambda q: (by_qty[q][0][0], q != rest, by_qty[q][0][1]))
+                    line["order_ids"].append(by_qty[qty].popleft()[1])
+                    line["matched"] += qty
+                    rest -= qty
+        return list(lines.values())
+
+    def apply(self, order_ids, status: str, date: str) -> int:
+        """Перевести заказы в status одной транзакцией; вернуть число изменённых."""
+        with self.conn:
+            cur = self.conn.executemany(
+                "UPDATE mkl_orders SET status = ?, date = ? WHERE id = ? AND status != ?;",
+                [(status, date, oid, status) for oid in order_ids],
+            )
+        return cur.rowcount
@@ -1,19 +1,36 @@
+import re
 import sqlite3
 from datetime import datetime
+from pathlib import Path
 
 
 class AppDB:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, defer_seed: bool = False):
         self.db_path = db_path
         self.conn = sqlite3.connect(self.db_path)
         self.conn.row_factory = sqlite3.Row
         # Флаг, чтобы не запускать синхронизацию во время массового сида
         self._sync_enabled = False
+        self._ready = False
         try:
             self.conn.execute("PRAGMA foreign_keys = ON;")
         except Exception:
             pass
+        # LOWER() в SQLite понимает только ASCII: для кириллицы — str.casefold
+        self.conn.create_function(
+            "casefold", 1, lambda s: s.casefold() if isinstance(s, str) else s, deterministic=True
+        )
         self._init_schema()
+        self._init_catalog_watch()
+        # defer_seed=True (старт в трей): сиды и синхронизация — в ensure_ready() при открытии окна
+        if not defer_seed:
+            self.ensure_ready()
+
+    def ensure_ready(self):
+        """Сиды каталогов и синхронизация контактов МКЛ -> Меридиан (выполняется один раз)."""
+        if self._ready:
+            return
+        self._ready = True
         # Сид Меридиан (если база абсолютно пустая) — необязателен, оставим как есть
         try:
             self._seed_meridian_default_if_empty()
@@ -30,7 +47,7 @@ class AppDB:
         try:
             self.sync_meridian_contacts_from_mkl()
         except Exception:
-            pass 
+            pass
 
     def _init_schema(self):
         cur = self.conn.cursor()
@@ -44,6 +61,8 @@ class AppDB:
             );
             """
         )
+        # Порядок списка клиентов: страницы таблицы читаются по индексу, без сортировки
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_clients_fio ON clients(fio COLLATE NOCASE);")
         # Product groups (hierarchy depth=1)
         cur.execute(
             """
@@ -214,8 +233,206 @@ class AppDB:
             """
         )
 
+        # Служебные значения фоновых движков (водяные знаки и т.п.)
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS app_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            """
+        )
+
+        self._init_status_history(cur)
+        self._init_status_counts(cur)
+
         self.conn.commit()
 
+    def _init_status_counts(self, cur):
+        """
+        Материализованные счётчики заказов по (тип заказа, статус), поддерживаются триггерами.
+        Позволяют показывать бейджи на главном экране и в трее без чтения таблиц заказов.
+        """
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS order_status_counts (
+                order_type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (order_type, status)
+            );
+            """
+        )
+        for table, order_type in (("mkl_orders", "mkl"), ("meridian_orders", "meridian")):
+            inc = (
+                "INSERT INTO order_status_counts (order_type, status, count) VALUES ('{t}', {s}, 1) "
+                "ON CONFLICT(order_type, status) DO UPDATE SET count = count + 1;"
+            )
+            dec = "UPDATE order_status_counts SET count = count - 1 WHERE order_type='{t}' AND status={s};"
+            cur.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{order_type}_count_insert AFTER INSERT ON {table}
+                BEGIN
+                    {inc.format(t=order_type, s="NEW.status")}
+                END;
+                """
+            )
+            cur.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{order_type}_count_delete AFTER DELETE ON {table}
+                BEGIN
+                    {dec.format(t=order_type, s="OLD.status")}
+                END;
+                """
+            )
+            cur.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{order_type}_count_update AFTER UPDATE OF status ON {table}
+                WHEN OLD.status IS NOT NEW.status
+                BEGIN
+                    {dec.format(t=order_type, s="OLD.status")}
+                    {inc.format(t=order_type, s="NEW.status")}
+                END;
+                """
+            )
+        # Первое создание (или пустая таблица) — пересчитать один раз из заказов
+        has_counts = cur.execute("SELECT 1 FROM order_status_counts LIMIT 1;").fetchone()
+        if not has_counts:
+            self._rebuild_status_counts(cur)
+
+    def _rebuild_status_counts(self, cur=None):
+        cur = cur or self.conn.cursor()
+        cur.execute("DELETE FROM order_status_counts;")
+        cur.execute(
+            """
+            INSERT INTO order_status_counts (order_type, status, count)
+            SELECT 'mkl', status, COUNT(*) FROM mkl_orders GROUP BY status
+            UNION ALL
+            SELECT 'meridian', status, COUNT(*) FROM meridian_orders GROUP BY status;
+            """
+        )
+
+    def _init_status_history(self, cur):
+        """
+        Журнал смен статусов (только добавление). Пишется триггерами, поэтому
+        покрывает любые обновления: формы, контекстное меню, уведомления.
+        Для МКЛ дополнительно сохраняем товар, чтобы аналитика не терялась
+        после удаления заказа.
+        """
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS order_status_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                order_type TEXT NOT NULL,
+                order_id INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                changed_at TEXT NOT NULL,
+                product TEXT
+            );
+            """
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_osh_order ON order_status_history(order_type, order_id, changed_at, id);"
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_osh_status ON order_status_history(order_type, status, changed_at);"
+        )
+        now_sql = "strftime('%Y-%m-%d %H:%M', 'now', 'localtime')"
+        # Дата создания берётся из заказа (если распознаётся), иначе — текущее время
+        insert_time_sql = f"COALESCE(CASE WHEN julianday(NEW.date) IS NOT NULL THEN NEW.date END, {now_sql})"
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_mkl_status_insert AFTER INSERT ON mkl_orders
+            BEGIN
+                INSERT INTO order_status_history (order_type, order_id, status, changed_at, product)
+                VALUES ('mkl', NEW.id, NEW.status, {insert_time_sql}, NEW.product);
+            END;
+            """
+        )
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_mkl_status_update AFTER UPDATE OF status ON mkl_orders
+            WHEN OLD.status IS NOT NEW.status
+            BEGIN
+                INSERT INTO order_status_history (order_type, order_id, status, changed_at, product)
+                VALUES ('mkl', NEW.id, NEW.status, {now_sql}, NEW.product);
+            END;
+            """
+        )
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_meridian_status_insert AFTER INSERT ON meridian_orders
+            BEGIN
+                INSERT INTO order_status_history (order_type, order_id, status, changed_at)
+                VALUES ('meridian', NEW.id, NEW.status, {insert_time_sql});
+            END;
+            """
+        )
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_meridian_status_update AFTER UPDATE OF status ON meridian_orders
+            WHEN OLD.status IS NOT NEW.status
+            BEGIN
+                INSERT INTO order_status_history (order_type, order_id, status, changed_at)
+                VALUES ('meridian', NEW.id, NEW.status, {now_sql});
+            END;
+            """
+        )
+        # Заказы, созданные до появления журнала: одна стартовая запись с текущим статусом
+        cur.execute(
+            """
+            INSERT INTO order_status_history (order_type, order_id, status, changed_at, product)
+            SELECT 'mkl', o.id, o.status, o.date, o.product FROM mkl_orders o
+            WHERE NOT EXISTS (
+                SELECT 1 FROM order_status_history h WHERE h.order_type='mkl' AND h.order_id=o.id
+            );
+            """
+        )
+        cur.execute(
+            """
+            INSERT INTO order_status_history (order_type, order_id, status, changed_at)
+            SELECT 'meridian', o.id, o.status, o.date FROM meridian_orders o
+            WHERE NOT EXISTS (
+                SELECT 1 FROM order_status_history h WHERE h.order_type='meridian' AND h.order_id=o.id
+            );
+            """
+        )
+
+    def _init_catalog_watch(self):
+        """
+        Версии каталогов товаров в памяти: любая запись в товары/группы МКЛ или
+        Меридиан увеличивает версию (TEMP-триггеры этого соединения вызывают
+        Python-функцию), по ней кэши каталога понимают, что их надо перечитать.
+        Так же отслеживаются заказы ("mkl_orders", "meridian_orders") — для
+        правил уведомлений (app/rules.py).
+        """
+        self._catalog_versions = {"mkl": 0, "meridian": 0, "mkl_orders": 0, "meridian_orders": 0}
+
+        def touch(kind):
+            self._catalog_versions[kind] = self._catalog_versions.get(kind, 0) + 1
+            return None
+
+        self.conn.create_function("catalog_touch", 1, touch)
+        tables = (
+            ("products_mkl", "mkl"),
+            ("product_groups_mkl", "mkl"),
+            ("products_meridian", "meridian"),
+            ("product_groups_meridian", "meridian"),
+            ("mkl_orders", "mkl_orders"),
+            ("meridian_orders", "meridian_orders"),
+            ("meridian_items", "meridian_orders"),
+        )
+        cur = self.conn.cursor()
+        for table, kind in tables:
+            for op in ("INSERT", "UPDATE", "DELETE"):
+                cur.execute(
+                    f"CREATE TEMP TRIGGER IF NOT EXISTS trg_catalog_{table}_{op.lower()} "
+                    f"AFTER {op} ON main.{table} BEGIN SELECT catalog_touch('{kind}'); END;"
+                )
+
+    def catalog_version(self, kind: str) -> int:
+        return self._catalog_versions.get(kind, 0)
+
     def _seed_meridian_default_if_empty(self):
         cur = self.conn.cursor()
         try:
@@ -344,10 +561,37 @@ class AppDB:
                 self.add_product_meridian(nm, gid)
 
     # --- Clients ---
-    def list_clients(self) -> list[dict]:
-        rows = self.conn.execute("SELECT id, fio, phone FROM clients ORDER BY fio COLLATE NOCASE;").fetchall()
+    CLIENTS_SQL = "SELECT id, fio, phone FROM clients ORDER BY fio COLLATE NOCASE, id"
+
+    def list_clients(self, limit: int | None = None, offset: int = 0) -> list[dict]:
+        """Клиенты по ФИО; limit/offset — страница списка (для виртуальной таблицы)."""
+        sql, params = self.CLIENTS_SQL, ()
+        if limit is not None:
+            sql, params = sql + " LIMIT ? OFFSET ?", (int(limit), int(offset))
+        rows = self.conn.execute(sql + ";", params).fetchall()
         return [{"id": r["id"], "fio": r["fio"], "phone": r["phone"]} for r in rows]
 
+    @classmethod
+    def read_clients(cls, db_path: str) -> list[dict]:
+        """list_clients() через своё соединение только для чтения — можно вызывать из рабочего потока."""
+        conn = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+        try:
+            return [{"id": r[0], "fio": r[1], "phone": r[2]} for r in conn.execute(cls.CLIENTS_SQL + ";")]
+        finally:
+            conn.close()
+
+    def count_clients(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM clients;").fetchone()[0]
+
+    def client_position(self, client_id: int) -> int | None:
+        """Номер клиента в list_clients(); None — клиента нет."""
+        row = self.conn.execute("SELECT fio FROM clients WHERE id=?;", (client_id,)).fetchone()
+        if row is None:
+            return None
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM clients WHERE (fio COLLATE NOCASE, id) < (?, ?);", (row["fio"], client_id)
+        ).fetchone()[0]
+
     def add_client(self, fio: str, phone: str) -> int:
         cur = self.conn.execute("INSERT INTO clients (fio, phone) VALUES (?, ?);", (fio, phone))
         self.conn.commit()
@@ -361,6 +605,40 @@ class AppDB:
         self.conn.execute("DELETE FROM clients WHERE id=?;", (client_id,))
         self.conn.commit()
 
+    def find_client_by_phone(self, phone: str) -> dict | None:
+        """Клиент по номеру: сравниваются последние 10 цифр (+7…, 8 (…) и 7… совпадают)."""
+        digits = re.sub(r"\D", "", phone or "")[-10:]
+        if len(digits) < 10:
+            return None
+        for r in self.conn.execute("SELECT id, fio, phone FROM clients ORDER BY id DESC;"):
+            if re.sub(r"\D", "", r["phone"] or "")[-10:] == digits:
+                return dict(r)
+        return None
+
+    def import_clients(self, clients: list[dict]) -> tuple[int, int]:
+        """
+        Массовый импорт клиентов одной транзакцией. Клиент с уже известным
+        телефоном (последние 10 цифр — 8 и +7 совпадают) или пустыми ФИО
+        и телефоном пропускается.
+        Возвращает (добавлено, пропущено).
+        """
+        known = {re.sub(r"\D", "", r["phone"] or "")[-10:] for r in self.conn.execute("SELECT phone FROM clients;")}
+        known.discard("")
+        rows, skipped = [], 0
+        for c in clients:
+            fio = (c.get("fio") or "").strip()
+            phone = (c.get("phone") or "").strip()
+            digits = re.sub(r"\D", "", phone)[-10:]
+            if (not fio and not digits) or (digits and digits in known):
+                skipped += 1
+                continue
+            if digits:
+                known.add(digits)
+            rows.append((fio, phone))
+        with self.conn:
+            self.conn.executemany("INSERT INTO clients (fio, phone) VALUES (?, ?);", rows)
+        return len(rows), skipped
+
     # --- Product Groups ---
     def list_product_groups(self) -> list[dict]:
         rows = self.conn.execute("SELECT id, name, sort_order FROM product_groups ORDER BY sort_order ASC, name COLLATE NOCASE;").fetchall()
@@ -1588,10 +1866,38 @@ class AppDB:
                     self.add_product_meridian(p["name"], mer_gid)
 
     # --- MKL Orders ---
-    def list_mkl_orders(self) -> list[dict]:
+    def list_mkl_orders(self, limit: int | None = None, offset: int = 0) -> list[dict]:
+        """Заказы МКЛ, новые сверху; limit/offset — страница списка (для виртуальной таблицы)."""
+        sql, params = "SELECT id, fio, phone, product, sph, cyl, ax, \"add\", bc, qty, status, date, COALESCE(comment,'') AS comment FROM mkl_orders ORDER BY id DESC", ()
+        if limit is not None:
+            sql, params = sql + " LIMIT ? OFFSET ?", (int(limit), int(offset))
+        return self._mkl_order_dicts(self.conn.execute(sql + ";", params).fetchall())
+
+    def sample_mkl_orders(self, n: int) -> list[dict]:
+        """Около n заказов МКЛ, равномерно по списку (для подбора ширины колонок)."""
+        step = max(1, self.count_mkl_orders() // max(1, int(n)))
         rows = self.conn.execute(
-            "SELECT id, fio, phone, product, sph, cyl, ax, \"add\", bc, qty, status, date, COALESCE(comment,'') AS comment FROM mkl_orders ORDER BY id DESC;"
+            """
+            SELECT id, fio, phone, product, sph, cyl, ax, "add", bc, qty, status, date, COALESCE(comment,'') AS comment
+            FROM mkl_orders WHERE id IN (
+                SELECT id FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY id DESC) AS rn FROM mkl_orders) WHERE (rn - 1) % ? = 0
+            ) ORDER BY id DESC;
+            """,
+            (step,),
         ).fetchall()
+        return self._mkl_order_dicts(rows)
+
+    def count_mkl_orders(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM mkl_orders;").fetchone()[0]
+
+    def mkl_order_position(self, order_id: int) -> int | None:
+        """Номер заказа в list_mkl_orders(); None — заказа нет."""
+        if self.conn.execute("SELECT 1 FROM mkl_orders WHERE id=?;", (order_id,)).fetchone() is None:
+            return None
+        return self.conn.execute("SELECT COUNT(*) FROM mkl_orders WHERE id > ?;", (order_id,)).fetchone()[0]
+
+    @staticmethod
+    def _mkl_order_dicts(rows) -> list[dict]:
         return [
             {
                 "id": r["id"],
@@ -1653,6 +1959,28 @@ class AppDB:
         self.conn.execute("DELETE FROM mkl_orders WHERE id=?;", (order_id,))
         self.conn.commit()
 
+    def import_mkl_orders(self, orders: list[dict]) -> int:
+        """Массовое добавление заказов МКЛ (поля как в add_mkl_order) одной транзакцией."""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M")
+        rows = [
+            (
+                o.get("fio", ""), o.get("phone", ""), o.get("product", ""),
+                o.get("sph", ""), o.get("cyl", ""), o.get("ax", ""), o.get("add", ""), o.get("bc", ""),
+                o.get("qty", ""), o.get("status") or "Не заказан", o.get("date") or now,
+                (o.get("comment", "") or "").strip(),
+            )
+            for o in orders
+        ]
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO mkl_orders (fio, phone, product, sph, cyl, ax, "add", bc, qty, status, date, comment)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+                """,
+                rows,
+            )
+        return len(rows)
+
     # --- Meridian Orders + Items ---
     def list_meridian_orders(self) -> list[dict]:
         rows = self.conn.execute(
@@ -1680,6 +2008,18 @@ class AppDB:
             for r in rows
         ]
 
+    def count_meridian_items(self, order_ids: list[int]) -> dict[int, int]:
+        """Число позиций по заказам Меридиан: {order_id: count}."""
+        ids = [int(i) for i in order_ids]
+        if not ids:
+            return {}
+        placeholders = ",".join("?" for _ in ids)
+        rows = self.conn.execute(
+            f"SELECT order_id, COUNT(*) AS n FROM meridian_items WHERE order_id IN ({placeholders}) GROUP BY order_id;",
+            tuple(ids),
+        ).fetchall()
+        return {r["order_id"]: r["n"] for r in rows}
+
     def add_meridian_order(self, order: dict, items: list[dict]) -> int:
         cur = self.conn.execute(
             "INSERT INTO meridian_orders (title, status, date) VALUES (?, ?, ?);",
@@ -1761,4 +2101,211 @@ class AppDB:
 
     def delete_price(self, price_id: int):
         self.conn.execute("DELETE FROM prices WHERE id=?;", (price_id,))
-        self.conn.commit()
\ No newline at end of file
+        self.conn.commit()
+
+    # --- Status history / lead-time analytics ---
+    # Статус «начала» и статусы «прибытия» по умолчанию для каждого типа заказа
+    LEAD_TIME_DEFAULTS = {
+        "mkl": ("Заказан", ("Прозвонен", "Вручен")),
+        "meridian": ("Не заказан", ("Заказан",)),
+    }
+
+    def list_status_history(self, order_type: str, order_id: int) -> list[dict]:
+        rows = self.conn.execute(
+            "SELECT id, order_type, order_id, status, changed_at, product FROM order_status_history "
+            "WHERE order_type=? AND order_id=? ORDER BY changed_at ASC, id ASC;",
+            (order_type, order_id),
+        ).fetchall()
+        return [
+            {
+                "id": r["id"],
+                "order_type": r["order_type"],
+                "order_id": r["order_id"],
+                "status": r["status"],
+                "changed_at": r["changed_at"],
+                "product": r["product"] or "",
+            }
+            for r in rows
+        ]
+
+    def _brand_tree_cte(self, order_type: str) -> str:
+        """CTE brand_tree(id, brand): каждой группе каталога сопоставляет верхнеуровневую группу (бренд)."""
+        if order_type == "meridian":
+            # Зеркало МКЛ лежит внутри «Контактные Линзы МКЛ» — брендами считаем его дочерние группы
+            return """
+                brand_tree(id, brand) AS (
+                    SELECT id, name FROM product_groups_meridian
+                    WHERE parent_id IS NULL AND name <> 'Контактные Линзы МКЛ'
+                    UNION ALL
+                    SELECT g.id, g.name FROM product_groups_meridian g
+                    JOIN product_groups_meridian w ON g.parent_id = w.id
+                    WHERE w.parent_id IS NULL AND w.name = 'Контактные Линзы МКЛ'
+                    UNION ALL
+                    SELECT g.id, t.brand FROM product_groups_meridian g
+                    JOIN brand_tree t ON g.parent_id = t.id
+                ),
+                product_group(name, gid) AS (
+                    SELECT name, MIN(group_id) FROM products_meridian GROUP BY name
+                ),"""
+        return """
+            brand_tree(id, brand) AS (
+                SELECT id, name FROM product_groups_mkl WHERE parent_id IS NULL
+                UNION ALL
+                SELECT g.id, t.brand FROM product_groups_mkl g
+                JOIN brand_tree t ON g.parent_id = t.id
+            ),
+            product_group(name, gid) AS (
+                SELECT name, MIN(group_id) FROM products_mkl GROUP BY name
+            ),"""
+
+    def lead_time_stats(
+        self,
+        order_type: str = "mkl",
+        group_by: str = "product",
+        from_status: str | None = None,
+        to_statuses: tuple[str, ...] | list[str] | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> list[dict]:
+        """
+        Сроки выполнения (в днях) по журналу статусов: от входа в from_status
+        до первого последующего перехода в любой из to_statuses.
+        group_by: 'product' или 'brand'. since/until ограничивают дату входа в from_status.
+        Возвращает [{key, count, avg_days, median_days, p90_days}], медиана и p90
+        считаются оконными функциями прямо в SQLite.
+        """
+        if order_type not in self.LEAD_TIME_DEFAULTS:
+            raise ValueError(f"Неизвестный тип заказа: {order_type}")
+        if group_by not in ("product", "brand"):
+            raise ValueError(f"Неизвестная группировка: {group_by}")
+        d_from, d_to = self.LEAD_TIME_DEFAULTS[order_type]
+        from_status = from_status or d_from
+        to_statuses = tuple(to_statuses or d_to)
+        if not to_statuses:
+            return []
+
+        params: list = [order_type]
+        to_marks = ", ".join("?" for _ in to_statuses)
+        params.extend(to_statuses)
+        params.append(from_status)
+        span_filter = ""
+        if since:
+            span_filter += " AND t >= julianday(?)"
+            params.append(since)
+        if until:
+            span_filter += " AND t < julianday(?)"
+            params.append(until)
+
+        brand_cte = self._brand_tree_cte(order_type) if group_by == "brand" else ""
+        if order_type == "mkl":
+            product_sql = "s.product"
+            source_sql = "spans s"
+        else:
+            # Для Меридиан товары хранятся в позициях заказа
+            product_sql = "i.product"
+            source_sql = "spans s JOIN meridian_items i ON i.order_id = s.order_id"
+        if group_by == "brand":
+            key_sql = "COALESCE(b.brand, '(Без бренда)')"
+            source_sql += (
+                f" LEFT JOIN product_group pg ON pg.name = {product_sql}"
+                " LEFT JOIN brand_tree b ON b.id = pg.gid"
+            )
+        else:
+            key_sql = f"COALESCE(NULLIF(TRIM({product_sql}), ''), '(Без названия)')"
+
+        sql = f"""
+            WITH RECURSIVE {brand_cte}
+            h AS (
+                SELECT id, order_id, status, product, julianday(changed_at) AS t
+                FROM order_status_history
+                WHERE order_type = ? AND julianday(changed_at) IS NOT NULL
+            ),
+            marked AS (
+                SELECT order_id, status, product, t,
+                    MIN(CASE WHEN status IN ({to_marks}) THEN t END) OVER (
+                        PARTITION BY order_id ORDER BY t, id
+                        ROWS BETWEEN 1 FOLLOWING AND UNBOUNDED FOLLOWING
+                    ) AS arrival
+                FROM h
+            ),
+            spans_all AS (
+                SELECT order_id, product, t, arrival - t AS days,
+                    ROW_NUMBER() OVER (PARTITION BY order_id, arrival ORDER BY t DESC) AS pick
+                FROM marked
+                WHERE status = ? AND arrival IS NOT NULL{span_filter}
+            ),
+            spans AS (
+                SELECT order_id, product, days FROM spans_all WHERE pick = 1
+            ),
+            keyed AS (
+                SELECT {key_sql} AS key, s.days AS days FROM {source_sql}
+            ),
+            ranked AS (
+                SELECT key, days,
+                    ROW_NUMBER() OVER (PARTITION BY key ORDER BY days) AS rn,
+                    COUNT(*) OVER (PARTITION BY key) AS n
+                FROM keyed
+            )
+            SELECT key,
+                MAX(n) AS n,
+                AVG(days) AS avg_days,
+                AVG(CASE WHEN rn IN ((n + 1) / 2, (n + 2) / 2) THEN days END) AS median_days,
+                MAX(CASE WHEN rn = (9 * n + 9) / 10 THEN days END) AS p90_days
+            FROM ranked
+            GROUP BY key
+            ORDER BY n DESC, key COLLATE NOCASE;
+        """
+        rows = self.conn.execute(sql, tuple(params)).fetchall()
+        return [
+            {
+                "key": r["key"],
+                "count": r["n"],
+                "avg_days": round(r["avg_days"] or 0.0, 2),
+                "median_days": round(r["median_days"] or 0.0, 2),
+                "p90_days": round(r["p90_days"] or 0.0, 2),
+            }
+            for r in rows
+        ]
+
+    def data_stamp(self, *kinds: str) -> tuple[tuple[int, ...], int]:
+        """
+        Метка состояния данных: счётчики записей этим соединением в таблицы
+        kinds (см. _init_catalog_watch: "mkl_orders", "meridian_orders",
+        каталоги; без kinds — все) и PRAGMA data_version — запись другим
+        процессом. По ней экраны из пула решают, перечитывать ли данные при
+        показе; фоновые записи планировщика (jobs, app_state) её не меняют.
+        """
+        row = self.conn.execute("PRAGMA data_version;").fetchone()
+        versions = self._catalog_versions
+        return tuple(versions.get(k, 0) for k in (kinds or tuple(versions))), int(row[0])
+
+    # --- App state (key/value) ---
+    def get_state(self, key: str, default: str | None = None) -> str | None:
+        row = self.conn.execute("SELECT value FROM app_state WHERE key=?;", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def set_state(self, key: str, value: str | None, commit: bool = True):
+        self.conn.execute(
+            "INSERT INTO app_state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value;",
+            (key, value),
+        )
+        if commit:
+            self.conn.commit()
+
+    # --- Status counters ---
+    def status_counts(self, order_type: str | None = None) -> dict:
+        """
+        Счётчики заказов по статусам из материализованной таблицы (без чтения заказов).
+        Без order_type: {"mkl": {статус: n}, "meridian": {...}}; с order_type: {статус: n}.
+        """
+        if order_type is None:
+            rows = self.conn.execute("SELECT order_type, status, count FROM order_status_counts WHERE count > 0;").fetchall()
+            result: dict[str, dict[str, int]] = {"mkl": {}, "meridian": {}}
+            for r in rows:
+                result.setdefault(r["order_type"], {})[r["status"]] = r["count"]
+            return result
+        rows = self.conn.execute(
+            "SELECT status, count FROM order_status_counts WHERE order_type=? AND count > 0;",
+            (order_type,),
+        ).fetchall()
+        return {r["status"]: r["count"] for r in rows}
@@ -0,0 +1,111 @@
+import itertools
+import queue
+import time
+
+
+# Типы команд для UI-потока
+CMD_CALL = "call"  # payload: (func, args) — выполнить func(*args) в потоке Tk
+CMD_SHOW = "show"  # показать главное окно (трей, второй запуск)
+CMD_EXIT = "exit"  # сохранить состояние и выйти
+
+# Приоритеты: меньше — раньше
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+
+
+class UiDispatcher:
+    """
+    Очередь команд из фоновых потоков (трей, сокет единственного экземпляра,
+    фоновые задачи) в поток Tk.
+
+    Tk нельзя трогать из других потоков — даже root.after(). Фоновый поток
+    только кладёт команду в queue.PriorityQueue (post/call), а один таймер
+    after() в потоке Tk раз в POLL_MS забирает команды по приоритету и
+    выполняет обработчики, не дольше BUDGET_MS за проход — остаток доедается
+    следующим проходом, чтобы окно не подвисало.
+    """
+
+    POLL_MS = 50
+    BUDGET_MS = 30
+
+    def __init__(self, root):
+        self.root = root
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._seq = itertools.count()  # порядок внутри одного приоритета
+        self._handlers: dict[str, object] = {CMD_CALL: self._run_call}
+        self._after_id = None
+
+    def register(self, kind: str, handler):
+        """handler(payload) будет вызываться в потоке Tk."""
+        self._handlers[kind] = handler
+
+    def post(self, kind: str, payload=None, priority: int = PRIORITY_NORMAL):
+        """Поставить команду в очередь (из любого потока)."""
+        self._queue.put((priority, next(self._seq), kind, payload))
+
+    def call(self, func, *args, priority: int = PRIORITY_NORMAL):
+        """Выполнить func(*args) в потоке Tk (из любого потока)."""
+        self.post(CMD_CALL, (func, args), priority)
+
+    def start(self):
+        """Запустить опрос очереди (вызывать из потока Tk)."""
+        if self._after_id is None:
+            self._after_id = self.root.after(self.POLL_MS, self._pump)
+
+    def stop(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _pump(self):
+        self._after_id = None
+        deadline = time.perf_counter() + self.BUDGET_MS / 1000.0
+        while time.perf_counter() < deadline:
+            try:
+                _, _, kind, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            handler = self._handlers.get(kind)
+            if handler is None:
+                continue
+            try:
+                handler(payload)
+            except Exception:
+                pass
+        try:
+            # Очередь не разобрана за бюджет — следующий проход сразу после перерисовки
+            delay = 1 if not self._queue.empty() else self.POLL_MS
+            self._after_id = self.root.after(delay, self._pump)
+        except Exception:
+            self._after_id = None  # окно уничтожено
+
+    @staticmethod
+    def _run_call(payload):
+        func, args = payload
+        func(*args)
+
+
+def ui_dispatcher(root) -> UiDispatcher | None:
+    """Диспетчер окна, если он запущен (см. main.main)."""
+    return getattr(root, "dispatcher", None)
+
+
+def post_ui(root, kind: str, payload=None, priority: int = PRIORITY_NORMAL) -> bool:
+    """Отправить команду в поток Tk; False — диспетчера нет (окно ещё не создано или уже закрыто)."""
+    dispatcher = ui_dispatcher(root)
+    if dispatcher is None:
+        return False
+    dispatcher.post(kind, payload, priority)
+    return True
+
+
+def call_ui(root, func, *args, priority: int = PRIORITY_NORMAL) -> bool:
+    """Выполнить func(*args) в потоке Tk через диспетчер."""
+    return post_ui(root, CMD_CALL, (func, args), priority)
@@ -0,0 +1,446 @@
+import csv
+import json
+import os
+import re
+import sqlite3
+import threading
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+
+PENDING = "Не заказан"
+BATCH = 500  # строк за один fetchmany
+PROGRESS_EVERY = 250  # как часто сообщать о ходе выгрузки
+
+
+def default_export_dir(settings: dict | None = None) -> str:
+    """Папка экспорта: настройка export_path, иначе Рабочий стол, иначе текущая папка."""
+    path = (settings or {}).get("export_path") or ""
+    if path:
+        return path
+    desktop = os.path.join(os.path.expanduser("~"), "Desktop")
+    return desktop if os.path.isdir(desktop) else os.getcwd()
+
+
+# --- Sources: один запрос на выгрузку, строки идут потоком ---
+class ExportSource:
+    """
+    Что выгружается: columns — [(ключ, заголовок)], sql — запрос с
+    необязательным фильтром статуса, упорядоченный по товару (TXT группирует
+    по товару, не держа выгрузку в памяти). txt_fields / txt_d / txt_comment —
+    формат строки позиции в TXT для поставщика.
+    """
+
+    def __init__(self, name: str, prefix: str, columns, select: str, order_by: str,
+                 txt_fields, txt_d: bool, txt_comment: bool):
+        self.name = name
+        self.prefix = prefix
+        self.columns = columns
+        self.select = select
+        self.order_by = order_by
+        self.txt_fields = txt_fields
+        self.txt_d = txt_d
+        self.txt_comment = txt_comment
+
+    def query(self, status: str | None) -> tuple[str, str, list]:
+        """(запрос строк, запрос количества, параметры)."""
+        where, params = ("WHERE o.status = ?", [status]) if status else ("", [])
+        return (
+            f"{self.select} {where} ORDER BY {self.order_by};",
+            f"SELECT COUNT(*) FROM ({self.select} {where});",
+            params,
+        )
+
+
+SOURCES = {
+    "mkl": ExportSource(
+        "mkl", "MKL",
+        [("fio", "ФИО"), ("phone", "Телефон"), ("product", "Товар"), ("sph", "Sph"), ("cyl", "Cyl"),
+         ("ax", "Ax"), ("add", "ADD"), ("bc", "BC"), ("qty", "Количество"), ("status", "Статус"),
+         ("date", "Дата"), ("comment", "Комментарий")],
+        "SELECT o.id, o.fio, o.phone, o.product, o.sph, o.cyl, o.ax, o.\"add\", o.bc, o.qty, o.status, o.date, "
+        "COALESCE(o.comment, '') AS comment FROM mkl_orders o",
+        "casefold(TRIM(o.product)), o.id",
+        (("sph", "Sph"), ("cyl", "Cyl"), ("ax", "Ax"), ("add", "ADD"), ("bc", "BC")),
+        txt_d=False, txt_comment=True,
+    ),
+    # Позиции всех заказов одним JOIN — вместо запроса позиций на каждый заказ
+    "meridian": ExportSource(
+        "meridian", "MERIDIAN",
+        [("title", "Заказ"), ("product", "Товар"), ("sph", "Sph"), ("cyl", "Cyl"), ("ax", "Ax"),
+         ("add", "Add"), ("d", "D, мм"), ("qty", "Количество"), ("status", "Статус"), ("date", "Дата")],
+        "SELECT i.id, o.title, i.product, i.sph, i.cyl, i.ax, i.\"add\", i.d, i.qty, o.status, o.date "
+        "FROM meridian_items i JOIN meridian_orders o ON o.id = i.order_id",
+        "casefold(TRIM(i.product)), o.id, i.id",
+        (("sph", "Sph"), ("cyl", "Cyl"), ("ax", "Ax"), ("add", "Add")),
+        txt_d=True, txt_comment=False,
+    ),
+}
+
+
+def _clean(row: sqlite3.Row) -> dict:
+    item = {k: ("" if row[k] is None else row[k]) for k in row.keys()}
+    qty = str(item.get("qty", "")).strip()
+    if qty.isdigit():
+        item["qty"] = int(qty)
+    return item
+
+
+def iter_rows(conn: sqlite3.Connection, source: ExportSource, status: str | None):
+    """Строки выгрузки по одной (fetchmany пачками по BATCH)."""
+    sql, _, params = source.query(status)
+    cur = conn.execute(sql, params)
+    while True:
+        chunk = cur.fetchmany(BATCH)
+        if not chunk:
+            return
+        for row in chunk:
+            yield _clean(row)
+
+
+def format_txt_line(row: dict, source: ExportSource) -> str:
+    """Строка позиции в TXT для поставщика: «Sph: -1.25 … Количество: 2 [Комментарий: …]»."""
+    parts = []
+    for key, label in source.txt_fields:
+        val = str(row.get(key, "") or "").strip()
+        if val != "":
+            parts.append(f"{label}: {val}")
+    if source.txt_d:
+        dval = str(row.get("d", "") or "").strip()
+        if dval != "":
+            parts.append(f"D:{dval}мм")
+    qty = str(row.get("qty", "") or "").strip()
+    if qty != "":
+        parts.append(f"Количество: {qty}")
+    # Комментарий — после количества
+    if source.txt_comment:
+        comment = (row.get("comment", "") or "").strip()
+        if comment:
+            parts.append(f"Комментарий: {comment}")
+    return " ".join(parts)
+
+
+# --- Writers ---
+class ExportWriter:
+    """
+    Писатель формата: write(row) для каждой строки по порядку, close() в конце.
+    Новый формат — подкласс с extension/title и регистрация в WRITERS.
+    """
+
+    extension = ""
+    title = ""
+
+    def __init__(self, path: str, source: ExportSource):
+        self.path = path
+        self.source = source
+
+    def write(self, row: dict):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class TxtWriter(ExportWriter):
+    """Прежний формат для поставщика: товар, под ним строки параметров, пустая строка между товарами."""
+
+    extension = "txt"
+    title = "TXT для поставщика"
+
+    def __init__(self, path: str, source: ExportSource):
+        super().__init__(path, source)
+        self._f = open(path, "w", encoding="utf-8")
+        self._product = None
+
+    def write(self, row: dict):
+        product = (row.get("product", "") or "").strip() or "(Без названия)"
+        # Строки упорядочены без учёта регистра — и группа меняется так же
+        if product.casefold() != self._product:
+            if self._product is not None:
+                self._f.write("\n")
+            self._f.write(product + "\n")
+            self._product = product.casefold()
+        line = format_txt_line(row, self.source)
+        if line:
+            self._f.write(line + "\n")
+
+    def close(self):
+        self._f.close()
+
+
+class CsvWriter(ExportWriter):
+    """CSV для Excel: UTF-8 с BOM, разделитель «;»."""
+
+    extension = "csv"
+    title = "CSV"
+
+    def __init__(self, path: str, source: ExportSource):
+        super().__init__(path, source)
+        self._f = open(path, "w", encoding="utf-8-sig", newline="")
+        self._keys = [k for k, _ in source.columns]
+        self._w = csv.writer(self._f, delimiter=";")
+        self._w.writerow([caption for _, caption in source.columns])
+
+    def write(self, row: dict):
+        self._w.writerow([row.get(k, "") for k in self._keys])
+
+    def close(self):
+        self._f.close()
+
+
+class JsonLinesWriter(ExportWriter):
+    """JSON Lines: один объект на строку, ключи — имена полей."""
+
+    extension = "jsonl"
+    title = "JSON Lines"
+
+    def __init__(self, path: str, source: ExportSource):
+        super().__init__(path, source)
+        self._f = open(path, "w", encoding="utf-8")
+        self._keys = [k for k, _ in source.columns]
+
+    def write(self, row: dict):
+        self._f.write(json.dumps({k: row.get(k, "") for k in self._keys}, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self._f.close()
+
+
+_XML_BAD = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Заказы" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Стиль 1 — жирный шрифт для строки заголовков
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+
+def _col_letter(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+class XlsxWriter(ExportWriter):
+    """
+    XLSX без сторонних библиотек: служебные части книги пишутся сразу, лист —
+    потоком в запись zip-архива (строки inline, без таблицы общих строк),
+    поэтому память не зависит от размера выгрузки.
+    """
+
+    extension = "xlsx"
+    title = "Excel (XLSX)"
+    FLUSH_ROWS = 200
+
+    def __init__(self, path: str, source: ExportSource):
+        super().__init__(path, source)
+        self._keys = [k for k, _ in source.columns]
+        self._refs = [_col_letter(i) for i in range(len(self._keys))]
+        self._zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        for name, content in _XLSX_STATIC.items():
+            self._zip.writestr(name, content)
+        self._sheet = self._zip.open("xl/worksheets/sheet1.xml", "w")
+        self._row = 0
+        self._buf: list[str] = []
+        self._emit(
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            '<sheetViews><sheetView workbookViewId="0">'
+            '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+            '</sheetView></sheetViews><sheetData>'
+        )
+        self._add_row([caption for _, caption in source.columns], style=1)
+
+    def _emit(self, text: str):
+        self._buf.append(text)
+        if len(self._buf) >= self.FLUSH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if self._buf:
+            self._sheet.write("".join(self._buf).encode("utf-8"))
+            self._buf.clear()
+
+    def _add_row(self, values, style: int = 0):
+        self._row += 1
+        n = self._row
+        s = f' s="{style}"' if style else ""
+        cells = []
+        for ref, value in zip(self._refs, values):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                cells.append(f'<c r="{ref}{n}"{s}><v>{value}</v></c>')
+            elif value != "" and value is not None:
+                text = escape(_XML_BAD.sub("", str(value)))
+                cells.append(f'<c r="{ref}{n}" t="inlineStr"{s}><is><t xml:space="preserve">{text}</t></is></c>')
+        self._emit(f'<row r="{n}">{"".join(cells)}</row>')
+
+    def write(self, row: dict):
+        self._add_row([row.get(k, "") for k in self._keys])
+
+    def close(self):
+        self._emit("</sheetData></worksheet>")
+        self._flush()
+        self._sheet.close()
+        self._zip.close()
+
+
+WRITERS: dict[str, type[ExportWriter]] = {
+    "txt": TxtWriter,
+    "csv": CsvWriter,
+    "jsonl": JsonLinesWriter,
+    "xlsx": XlsxWriter,
+}
+
+
+def register_writer(name: str, writer: type[ExportWriter]):
+    """Подключить дополнительный формат выгрузки."""
+    WRITERS[name] = writer
+
+
+# --- Engine ---
+def export_orders(db_path: str, order_type: str, fmt: str = "txt", folder: str | None = None,
+                  status: str | None = PENDING, progress=None, cancel: threading.Event | None = None) -> str | None:
+    """
+    Выгрузить заказы order_type ("mkl" | "meridian") со статусом status (None — все)
+    в файл формата fmt в folder: MKL_ДД.ММ.ГГ.txt и т. п. Строки идут из одного
+    запроса прямо в писатель; своё соединение только для чтения, поэтому можно
+    вызывать из рабочего потока. progress(сделано, всего) — по ходу выгрузки.
+    Возвращает путь или None, если выгружать нечего (или выгрузку отменили).
+    """
+    source = SOURCES.get(order_type)
+    if source is None:
+        raise ValueError(f"Неизвестный тип заказов: {order_type}")
+    writer_cls = WRITERS.get(fmt)
+    if writer_cls is None:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+    conn = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    # COLLATE NOCASE и LOWER не знают кириллицу: товары без учёта регистра — через str.casefold
+    conn.create_function("casefold", 1, lambda s: s.casefold() if isinstance(s, str) else s, deterministic=True)
+    try:
+        _, count_sql, params = source.query(status)
+        total = conn.execute(count_sql, params).fetchone()[0]
+        if not total:
+            return None
+        filepath = os.path.join(folder or os.getcwd(), f"{source.prefix}_{datetime.now().strftime('%d.%m.%y')}.{writer_cls.extension}")
+        # Пишем во временный файл: прерванная выгрузка не оставит половину документа
+        tmp = filepath + ".part"
+        writer = writer_cls(tmp, source)
+        done = 0
+        try:
+            for row in iter_rows(conn, source, status):
+                writer.write(row)
+                done += 1
+                if progress is not None and done % PROGRESS_EVERY == 0:
+                    progress(done, total)
+                if cancel is not None and cancel.is_set():
+                    break
+        finally:
+            writer.close()
+        if cancel is not None and cancel.is_set():
+            os.remove(tmp)
+            return None
+        os.replace(tmp, filepath)
+        if progress is not None:
+            progress(done, total)
+        return filepath
+    finally:
+        conn.close()
+
+
+def open_file(filepath: str):
+    """Открыть файл программой по умолчанию, не дожидаясь её (ошибки игнорируются)."""
+    try:
+        import platform, subprocess
+        if hasattr(os, "startfile"):
+            os.startfile(filepath)
+        else:
+            opener = "open" if platform.system() == "Darwin" else "xdg-open"
+            subprocess.Popen([opener, filepath], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except Exception:
+        pass
+
+
+class ExportTask:
+    """
+    Выгрузка в рабочем потоке. on_progress(сделано, всего) и on_done(путь, ошибка)
+    вызываются в потоке Tk через диспетчер (app/dispatch.py); готовый файл
+    открывается из рабочего потока (open_after), окно при этом не ждёт.
+    """
+
+    def __init__(self, root, order_type: str, fmt: str, folder: str, status: str | None = PENDING,
+                 on_progress=None, on_done=None, open_after: bool = True):
+        self.root = root
+        self.args = (root.db.db_path, order_type, fmt, folder, status)
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.open_after = open_after
+        self.cancel_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "ExportTask":
+        self._thread = threading.Thread(target=self._run, name="export", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _post(self, func, *args):
+        from app.dispatch import PRIORITY_LOW, call_ui
+
+        if func is not None:
+            call_ui(self.root, func, *args, priority=PRIORITY_LOW)
+
+    def _run(self):
+        path, error = None, None
+        try:
+            path = export_orders(*self.args, progress=lambda d, t: self._post(self.on_progress, d, t),
+                                 cancel=self.cancel_event)
+        except Exception as e:
+            error = e
+        if path and self.open_after:
+            open_file(path)
+        self._post(self.on_done, path, error)
@@ -0,0 +1,195 @@
+import math
+from datetime import datetime, timedelta
+
+from app.db import AppDB
+from app.supplier import num_sql
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+
+# Понедельник, от которого считаются номера недель (julianday)
+_EPOCH = "2000-01-03"
+_WEEKS_PER_MONTH = 30.0 / 7.0
+
+
+class DemandForecaster:
+    """
+    Прогноз спроса по истории заказов МКЛ и позиций Меридиан.
+
+    Ряд — сочетание (источник, товар, Sph, Cyl, Ax, ADD, BC/D); значения — спрос по неделям.
+    Товар сравнивается без регистра, параметры — как числа (num_sql, как в сводном
+    заказе поставщику): «-1,25», «-1.25» и «-1.250» — один ряд.
+    Недельная агрегация делается одним GROUP BY в SQLite, модель (экспоненциальное
+    сглаживание или скользящее среднее) считается сразу для всех рядов: через NumPy
+    по матрице «ряды × недели», если он установлен, иначе — простым циклом.
+    """
+
+    METHODS = ("ses", "ma")
+
+    def __init__(self, db: AppDB, weeks: int = 52, alpha: float = 0.3, ma_window: int = 8):
+        self.db = db
+        self.weeks = max(4, int(weeks))
+        self.alpha = min(1.0, max(0.01, float(alpha)))
+        self.ma_window = max(1, int(ma_window))
+
+    # --- Data ---
+    def _window_start(self, today: datetime | None = None) -> tuple[int, str]:
+        """Номер первой недели окна и дата её понедельника."""
+        today = today or datetime.now()
+        monday = (today - timedelta(days=today.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+        start = monday - timedelta(weeks=self.weeks - 1)
+        epoch = datetime.strptime(_EPOCH, "%Y-%m-%d")
+        return (start - epoch).days // 7, start.strftime("%Y-%m-%d")
+
+    def weekly_demand(self, today: datetime | None = None) -> tuple[list[tuple], list[tuple[int, int, float]]]:
+        """
+        Недельный спрос за окно. Возвращает (ряды, [(индекс ряда, неделя 0..weeks-1, количество)]);
+        ряд — (источник, товар, Sph, Cyl, Ax, ADD, BC/D) в написании одного из его заказов.
+        Дата заказа МКЛ берётся из первой записи журнала статусов (поле date меняется при смене статуса).
+        """
+        first_week, start_date = self._window_start(today)
+        qty_sql = "COALESCE(NULLIF(CAST({col} AS INTEGER), 0), 1)"
+        week_sql = f"CAST((t - julianday('{_EPOCH}')) / 7 AS INTEGER) - ?"
+        # Ключ ряда: товар без регистра и параметры как числа; написание для таблицы — из заказов.
+        # Ключ считается по уже сгруппированным по тексту строкам — их много меньше, чем заказов
+        key_cols = ("k_product", "k_sph", "k_cyl", "k_ax", "k_add", "k_extra")
+        key_exprs = ", ".join(
+            f"{e} AS {k}"
+            for e, k in zip(["casefold(product)"] + [num_sql(c) for c in ("sph", "cyl", "ax", "addv", "extra")], key_cols)
+        )
+        sql = f"""
+            WITH created AS (
+                SELECT order_type, order_id, MIN(julianday(changed_at)) AS ct
+                FROM order_status_history
+                GROUP BY order_type, order_id
+            ),
+            mkl AS (
+                SELECT 'mkl' AS source, TRIM(o.product) AS product, TRIM(COALESCE(o.sph, '')) AS sph,
+                    TRIM(COALESCE(o.cyl, '')) AS cyl, TRIM(COALESCE(o.ax, '')) AS ax, TRIM(COALESCE(o."add", '')) AS addv,
+                    TRIM(COALESCE(o.bc, '')) AS extra, {qty_sql.format(col="o.qty")} AS qty,
+                    COALESCE(c.ct, julianday(o.date)) AS t
+                FROM mkl_orders o
+                LEFT JOIN created c ON c.order_type = 'mkl' AND c.order_id = o.id
+            ),
+            mer AS (
+                SELECT 'meridian' AS source, TRIM(i.product) AS product, TRIM(COALESCE(i.sph, '')) AS sph,
+                    TRIM(COALESCE(i.cyl, '')) AS cyl, TRIM(COALESCE(i.ax, '')) AS ax, TRIM(COALESCE(i."add", '')) AS addv,
+                    TRIM(COALESCE(i.d, '')) AS extra, {qty_sql.format(col="i.qty")} AS qty,
+                    COALESCE(c.ct, julianday(m.date)) AS t
+                FROM meridian_items i
+                JOIN meridian_orders m ON m.id = i.order_id
+                LEFT JOIN created c ON c.order_type = 'meridian' AND c.order_id = m.id
+            ),
+            demand AS (
+                SELECT * FROM mkl UNION ALL SELECT * FROM mer
+            ),
+            raw AS (
+                SELECT source, product, sph, cyl, ax, addv, extra, {week_sql} AS week, SUM(qty) AS qty
+                FROM demand
+                WHERE t >= julianday(?) AND product <> ''
+                GROUP BY 1, 2, 3, 4, 5, 6, 7, 8
+            ),
+            keyed AS (
+                SELECT *, {key_exprs} FROM raw
+            )
+            SELECT source, MIN(product) AS product, MIN(sph) AS sph, MIN(cyl) AS cyl, MIN(ax) AS ax,
+                MIN(addv) AS addv, MIN(extra) AS extra, {", ".join(key_cols)}, week, SUM(qty) AS qty
+            FROM keyed
+            GROUP BY source, {", ".join(key_cols)}, week
+        """
+        rows = self.db.conn.execute(sql, (first_week, start_date)).fetchall()
+        keys: list[tuple] = []
+        index: dict[tuple, int] = {}
+        cells: list[tuple[int, int, float]] = []
+        for r in rows:
+            week = r["week"]
+            if week is None or week < 0 or week >= self.weeks:
+                continue
+            key = (r["source"], *(r[k] for k in key_cols))
+            i = index.get(key)
+            if i is None:
+                i = len(keys)
+                index[key] = i
+                keys.append((r["source"], r["product"], r["sph"], r["cyl"], r["ax"], r["addv"], r["extra"]))
+            cells.append((i, int(week), float(r["qty"] or 0)))
+        return keys, cells
+
+    # --- Models ---
+    def _fit_numpy(self, n_series: int, cells, method: str) -> list[tuple[float, float, int]]:
+        x = np.zeros((n_series, self.weeks), dtype=np.float64)
+        if cells:
+            idx = np.fromiter((c[0] for c in cells), dtype=np.int64, count=len(cells))
+            wk = np.fromiter((c[1] for c in cells), dtype=np.int64, count=len(cells))
+            qty = np.fromiter((c[2] for c in cells), dtype=np.float64, count=len(cells))
+            np.add.at(x, (idx, wk), qty)
+        if method == "ma":
+            level = x[:, -self.ma_window:].mean(axis=1)
+        else:
+            # Старт с среднего за окно — устойчивее для редкого (прерывистого) спроса
+            level = x.mean(axis=1)
+            a = self.alpha
+            for w in range(self.weeks):
+                level = a * x[:, w] + (1.0 - a) * level
+        total = x.sum(axis=1)
+        active = (x > 0).sum(axis=1)
+        return list(zip(level.tolist(), total.tolist(), active.tolist()))
+
+    def _fit_python(self, n_series: int, cells, method: str) -> list[tuple[float, float, int]]:
+        series: list[dict[int, float]] = [dict() for _ in range(n_series)]
+        for i, w, q in cells:
+            series[i][w] = series[i].get(w, 0.0) + q
+        result = []
+        a = self.alpha
+        for s in series:
+            total = sum(s.values())
+            if method == "ma":
+                lo = self.weeks - self.ma_window
+                level = sum(q for w, q in s.items() if w >= lo) / self.ma_window
+            else:
+                level = total / self.weeks
+                for w in range(self.weeks):
+                    level = a * s.get(w, 0.0) + (1.0 - a) * level
+            result.append((level, total, sum(1 for q in s.values() if q > 0)))
+        return result
+
+    def forecast(self, method: str = "ses", top: int | None = 200, min_qty: float = 0.5, today: datetime | None = None) -> list[dict]:
+        """
+        Ранжированная таблица «что закупить на следующий месяц».
+        forecast_month — ожидаемый спрос за месяц, recommended — округление вверх.
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Неизвестный метод: {method}")
+        keys, cells = self.weekly_demand(today)
+        if not keys:
+            return []
+        if np is not None:
+            fitted = self._fit_numpy(len(keys), cells, method)
+        else:
+            fitted = self._fit_python(len(keys), cells, method)
+        rows = []
+        for key, (level, total, active) in zip(keys, fitted):
+            month = level * _WEEKS_PER_MONTH
+            if month < min_qty:
+                continue
+            source, product, sph, cyl, ax, addv, extra = key
+            rows.append({
+                "source": source,
+                "product": product,
+                "sph": sph,
+                "cyl": cyl,
+                "ax": ax,
+                "add": addv,
+                # Для МКЛ это BC, для Меридиан — диаметр D
+                "extra": extra,
+                "forecast_month": round(month, 2),
+                "recommended": int(math.ceil(month - 1e-9)),
+                "total": int(total),
+                "weeks_active": int(active),
+            })
+        rows.sort(key=lambda r: (-r["forecast_month"], -r["total"], r["product"]))
+        if top:
+            rows = rows[:top]
+        return rows
@@ -0,0 +1,144 @@
+import json
+import os
+import sys
+
+
+ICON_SIZES = (16, 32, 64, 128)  # 16/32/64 — заголовок окна, 128 — трей
+MANIFEST = "icons.json"
+
+_ASSETS = [
+    os.path.join("app", "assets", "logo.png"),
+    os.path.join("app", "assets", "android-chrome-192x192.png"),
+    os.path.join("app", "assets", "apple-touch-icon.png"),
+    os.path.join("app", "assets", "favicon-32x32.png"),
+    os.path.join("app", "assets", "favicon-16x16.png"),
+    os.path.join("app", "assets", "favicon.ico"),
+]
+
+
+def _default_cache_dir() -> str:
+    # Как STORAGE_DIR в main.py: рядом с exe или рядом с исходниками
+    if getattr(sys, "frozen", False):
+        base = os.path.dirname(sys.executable)
+    else:
+        base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, "icon_cache")
+
+
+def icon_sources(settings: dict | None) -> list[str]:
+    """Существующие файлы-кандидаты иконки (настроенный логотип первым), без повторов."""
+    configured = ((settings or {}).get("tray_logo_path") or "").strip()
+    bases = [
+        os.getcwd(),
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        os.path.dirname(sys.executable) if getattr(sys, "frozen", False) else None,
+        getattr(sys, "_MEIPASS", None),  # PyInstaller onefile
+    ]
+    bases = [b for b in bases if b]
+    found: list[str] = []
+    seen: set[str] = set()
+    for rel in [configured] + _ASSETS:
+        if not rel:
+            continue
+        paths = [rel] if os.path.isabs(rel) else [os.path.join(b, rel) for b in bases]
+        for p in paths:
+            p = os.path.normpath(p)
+            key = os.path.normcase(p)
+            if key in seen:
+                continue
+            seen.add(key)
+            try:
+                if os.path.isfile(p):
+                    found.append(p)
+            except Exception:
+                continue
+    return found
+
+
+def _stamp(paths: list[str]) -> list[list]:
+    out = []
+    for p in paths:
+        st = os.stat(p)
+        out.append([p, st.st_mtime_ns, st.st_size])
+    return out
+
+
+def _score(info: tuple[str, int, int, bool], size: int) -> float:
+    """Пригодность исходника для иконки size px: PNG, квадрат, прозрачность, запас по размеру."""
+    path, w, h, alpha = info
+    ext = os.path.splitext(path)[1].lower()
+    score = {".png": 3.0, ".ico": 1.5}.get(ext, 0.5)
+    score += 2.0 if w == h else -0.5
+    if alpha:
+        score += 1.0
+    long_side = max(w, h)
+    if long_side >= size:
+        score += 2.0
+    ideal = size * 1.5  # уменьшение с чуть большего размера даёт самую чёткую картинку
+    return score - abs(long_side - ideal) / max(128.0, size * 2.0)
+
+
+def _build(sources: list[str], cache_dir: str) -> dict[int, str]:
+    # Pillow нужен только при промахе кэша: тёплый старт его не импортирует
+    from PIL import Image
+
+    infos = []
+    for p in sources:
+        try:
+            with Image.open(p) as im:
+                alpha = im.mode in ("RGBA", "LA") or ("transparency" in im.info)
+                infos.append((p, im.size[0], im.size[1], alpha))
+        except Exception:
+            continue
+    if not infos:
+        return {}
+    os.makedirs(cache_dir, exist_ok=True)
+    files: dict[int, str] = {}
+    for size in ICON_SIZES:
+        src = max(infos, key=lambda info: _score(info, size))[0]
+        with Image.open(src) as im:
+            img = im.convert("RGBA").resize((size, size), Image.LANCZOS)
+        out = os.path.join(cache_dir, f"icon_{size}.png")
+        img.save(out, format="PNG")
+        files[size] = out
+    return files
+
+
+def prepared_icons(settings: dict | None, cache_dir: str | None = None) -> dict[int, str]:
+    """
+    Готовые PNG иконки {размер: путь} для ICON_SIZES.
+
+    Кэш в cache_dir проверяется по пути, mtime и размеру всех файлов-кандидатов:
+    если ни один не менялся, возвращаются ранее подготовленные картинки без
+    обращения к Pillow. Иначе лучший исходник для каждого размера выбирается
+    и масштабируется заново. Пустой словарь — иконок нет или Pillow недоступен.
+    """
+    cache_dir = cache_dir or _default_cache_dir()
+    try:
+        sources = icon_sources(settings)
+        if not sources:
+            return {}
+        stamp = _stamp(sources)
+    except Exception:
+        return {}
+    manifest_path = os.path.join(cache_dir, MANIFEST)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("sources") == stamp:
+            files = {int(k): v for k, v in (manifest.get("files") or {}).items()}
+            if files and all(os.path.isfile(p) for p in files.values()):
+                return files
+    except Exception:
+        pass
+    try:
+        files = _build(sources, cache_dir)
+    except Exception:
+        return {}
+    if files:
+        try:
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump({"sources": stamp, "files": {str(k): v for k, v in files.items()}}, f, ensure_ascii=False)
+        except Exception:
+            pass
+    return files
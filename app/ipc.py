@@ -0,0 +1,331 @@
+import asyncio
+import concurrent.futures
+import json
+import socket
+import struct
+import sys
+import threading
+
+from app.dispatch import PRIORITY_HIGH, call_ui
+
+
+# Кадр: 4 байта длины (big-endian) + JSON в UTF-8.
+# Запрос {"cmd": имя, "args": {...}, "id": любое}; ответ {"id", "ok": true, "result"} или {"id", "ok": false, "error"}.
+# Старый сигнал второго запуска — голые байты b"SHOW" без длины — по-прежнему понимается.
+HEADER = struct.Struct(">I")
+MAX_FRAME = 1 << 20
+LEGACY_SHOW = b"SHOW"
+HOST = "127.0.0.1"
+CALL_TIMEOUT = 10.0  # ожидание выполнения команды в потоке Tk
+BACKGROUND_TIMEOUT = 600.0  # команды вне потока Tk (выгрузка) могут идти долго
+READ_TIMEOUT = 5.0
+
+
+class IpcError(Exception):
+    """Ошибка команды: текст уходит клиенту в поле error."""
+
+
+def encode_frame(message: dict) -> bytes:
+    data = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    return HEADER.pack(len(data)) + data
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("соединение закрыто")
+        buf += chunk
+    return buf
+
+
+def send_command(port: int, cmd: str, args: dict | None = None, timeout: float = CALL_TIMEOUT + 2) -> dict:
+    """Отправить команду запущенному экземпляру и дождаться ответа (ConnectionError/OSError — экземпляра нет)."""
+    with socket.create_connection((HOST, int(port)), timeout=timeout) as s:
+        s.sendall(encode_frame({"cmd": cmd, "args": args or {}, "id": 1}))
+        (size,) = HEADER.unpack(_recv_exact(s, HEADER.size))
+        if size > MAX_FRAME:
+            raise ConnectionError("слишком большой ответ")
+        return json.loads(_recv_exact(s, size).decode("utf-8"))
+
+
+def post_command(port: int, cmd: str, args: dict | None = None, timeout: float = 1.0) -> bool:
+    """
+    Отправить команду без ожидания ответа: True — экземпляр принял соединение
+    и кадр. Для второго запуска: «show» может строить окно дольше любого
+    таймаута, а ждать его не нужно — важно лишь, что экземпляр жив.
+    """
+    try:
+        with socket.create_connection((HOST, int(port)), timeout=timeout) as s:
+            s.sendall(encode_frame({"cmd": cmd, "args": args or {}, "id": 1}))
+        return True
+    except OSError:
+        return False
+
+
+# --- Commands (выполняются в потоке Tk, кроме помеченных background) ---
+def background(func):
+    """Команда не трогает Tk и соединение окна: выполняется в пуле потоков asyncio, окно не ждёт."""
+    func.background = True
+    return func
+
+
+
+def _ui_ready(root):
+    """Окно могло ещё не строиться (запуск в трей): построить и показать."""
+    ensure = getattr(root, "ensure_ui", None)
+    if callable(ensure):
+        ensure()
+    show = getattr(root, "show_from_background", None)
+    if callable(show):
+        show()
+
+
+def _cmd_ping(root, args):
+    return {"pong": True}
+
+
+def _cmd_show(root, args):
+    _ui_ready(root)
+    return {"shown": True}
+
+
+def _cmd_open(root, args):
+    from app.views.main import VIEWS, open_view
+
+    view = (args.get("view") or "main").strip().lower()
+    if view not in VIEWS:
+        raise IpcError(f"неизвестный экран: {view}; доступны: {', '.join(VIEWS)}")
+    _ui_ready(root)
+    open_view(root, view)
+    return {"view": view}
+
+
+def _cmd_new_mkl_order(root, args):
+    fio = (args.get("fio") or "").strip()
+    phone = (args.get("phone") or "").strip()
+    if not fio and phone:
+        # Входящий звонок: подставить ФИО известного клиента по номеру (+7 и 8 — один номер)
+        client = root.db.find_client_by_phone(phone)
+        if client:
+            fio = client.get("fio", "") or ""
+    _ui_ready(root)
+    from app.views.main import open_mkl
+
+    view = open_mkl(root)
+    view._new_order({"fio": fio, "phone": phone})
+    return {"fio": fio, "phone": phone}
+
+
+def _cmd_search(root, args):
+    text = (args.get("text") or "").strip()
+    what = (args.get("what") or "clients").strip().lower()
+    limit = max(1, min(200, int(args.get("limit") or 20)))
+    if what == "clients":
+        from app.search import ClientSearchIndex
+
+        clients = root.db.list_clients()
+        return [
+            {"id": clients[pos].get("id"), "fio": clients[pos].get("fio", ""), "phone": clients[pos].get("phone", "")}
+            for pos in ClientSearchIndex(clients).search(text, limit=limit)
+        ]
+    if what == "products":
+        from app.search import search_products
+
+        return [
+            {"kind": h["kind"], "product": h["product"].get("name", ""), "score": round(h["score"], 3)}
+            for h in search_products(root.db, text, limit=limit)
+        ]
+    if what == "prices":
+        from app.pricelist import PriceIndex
+
+        return PriceIndex(root.db).search(text, limit=limit)
+    raise IpcError("what: clients | products | prices")
+
+
+@background
+def _cmd_export(root, args):
+    # export_orders открывает своё соединение только для чтения — поток Tk не нужен
+    from app.export import PENDING, WRITERS, default_export_dir, export_orders
+
+    order_type = (args.get("type") or "mkl").strip().lower()
+    if order_type not in ("mkl", "meridian"):
+        raise IpcError("type: mkl | meridian")
+    fmt = (args.get("format") or "txt").strip().lower()
+    if fmt not in WRITERS:
+        raise IpcError(f"format: {' | '.join(WRITERS)}")
+    folder = args.get("folder") or default_export_dir(getattr(root, "app_settings", None))
+    status = None if str(args.get("all", "")).lower() in ("1", "true", "yes") else PENDING
+    return {"path": export_orders(root.db.db_path, order_type, fmt, folder, status)}
+
+
+def _cmd_counts(root, args):
+    order_type = args.get("type") or None
+    return root.db.status_counts(order_type)
+
+
+COMMANDS = {
+    "ping": _cmd_ping,
+    "show": _cmd_show,
+    "open": _cmd_open,
+    "new_mkl_order": _cmd_new_mkl_order,
+    "search": _cmd_search,
+    "export": _cmd_export,
+    "counts": _cmd_counts,
+}
+
+
+class IpcServer:
+    """
+    Сервер команд на порту единственного экземпляра (только 127.0.0.1).
+
+    Цикл asyncio живёт в фоновом потоке и только читает/пишет кадры; сама
+    команда выполняется в потоке Tk через диспетчер (Tk и соединение SQLite
+    принадлежат ему), результат возвращается через concurrent.futures.Future.
+    Так второй запуск, телефония или скрипт управляют уже открытой программой
+    за миллисекунды вместо холодного старта.
+    """
+
+    def __init__(self, root, port: int, commands: dict | None = None):
+        self.root = root
+        self.port = int(port)
+        self.commands = dict(COMMANDS if commands is None else commands)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._server = None
+        self._thread: threading.Thread | None = None
+        self._ready = threading.Event()
+
+    def start(self) -> bool:
+        """Запустить поток сервера; False — порт занят (сервер не работает)."""
+        self._thread = threading.Thread(target=self._run, name="ipc-server", daemon=True)
+        self._thread.start()
+        self._ready.wait(2.0)
+        return self._server is not None
+
+    def stop(self):
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(loop.stop)
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        try:
+            self._server = loop.run_until_complete(asyncio.start_server(self._handle, HOST, self.port))
+        except Exception:
+            # Порт занят или bind не удался — работаем без сервера
+            self._server = None
+            self._ready.set()
+            loop.close()
+            return
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self._server.close()
+            loop.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readexactly(HEADER.size), READ_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                if head == LEGACY_SHOW:
+                    await self._execute("show", {})
+                    break
+                (size,) = HEADER.unpack(head)
+                if size > MAX_FRAME:
+                    break
+                try:
+                    request = json.loads((await asyncio.wait_for(reader.readexactly(size), READ_TIMEOUT)).decode("utf-8"))
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                except ValueError:
+                    writer.write(encode_frame({"id": None, "ok": False, "error": "неверный JSON"}))
+                    await writer.drain()
+                    continue
+                if not isinstance(request, dict) or not isinstance(request.get("args") or {}, dict):
+                    writer.write(encode_frame({"id": None, "ok": False, "error": "ожидается {\"cmd\", \"args\": {...}}"}))
+                    await writer.drain()
+                    continue
+                response = await self._execute(request.get("cmd"), request.get("args") or {})
+                response["id"] = request.get("id")
+                writer.write(encode_frame(response))
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def _execute(self, cmd, args: dict) -> dict:
+        func = self.commands.get(cmd)
+        if func is None:
+            return {"ok": False, "error": f"неизвестная команда: {cmd}; доступны: {', '.join(self.commands)}"}
+        if getattr(func, "background", False):
+            try:
+                result = await asyncio.wait_for(
+                    asyncio.get_running_loop().run_in_executor(None, func, self.root, args), BACKGROUND_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                return {"ok": False, "error": "таймаут выполнения"}
+            except Exception as e:
+                return {"ok": False, "error": str(e) or e.__class__.__name__}
+            return {"ok": True, "result": result}
+        future: concurrent.futures.Future = concurrent.futures.Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(func(self.root, args))
+            except Exception as e:
+                future.set_exception(e)
+
+        if not call_ui(self.root, run, priority=PRIORITY_HIGH):
+            return {"ok": False, "error": "окно не готово"}
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), CALL_TIMEOUT)
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": "таймаут выполнения"}
+        except Exception as e:
+            return {"ok": False, "error": str(e) or e.__class__.__name__}
+        return {"ok": True, "result": result}
+
+
+def _parse_cli_args(argv: list[str]) -> tuple[str, dict]:
+    if not argv:
+        raise IpcError("укажите команду: " + ", ".join(COMMANDS))
+    cmd, args = argv[0], {}
+    for item in argv[1:]:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise IpcError(f"аргумент без '=': {item}")
+        args[key.strip()] = value
+    return cmd, args
+
+
+def cli_main(argv: list[str], port: int) -> int:
+    """
+    main.py --cmd ИМЯ [ключ=значение …]: отправить команду запущенному
+    экземпляру и напечатать ответ JSON. Код выхода: 0 — успех, 1 — ошибка
+    команды, 2 — программа не запущена или неверные аргументы.
+    """
+    try:
+        cmd, args = _parse_cli_args(argv)
+    except IpcError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    try:
+        slow = getattr(COMMANDS.get(cmd), "background", False)
+        response = send_command(port, cmd, args, timeout=(BACKGROUND_TIMEOUT if slow else CALL_TIMEOUT) + 2)
+    except (OSError, ConnectionError, ValueError) as e:
+        print(f"программа не запущена (порт {port}): {e}", file=sys.stderr)
+        return 2
+    print(json.dumps(response, ensure_ascii=False, indent=2))
+    return 0 if response.get("ok") else 1
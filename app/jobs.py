@@ -0,0 +1,208 @@
+from datetime import datetime, timedelta
+
+from app.rules import NotifyRule, builtin_rules, custom_rules, rule_engine
+from app.scheduler import IntervalJob, Job, Scheduler, next_daily, parse_hhmm
+
+
+class _ReminderJob(Job):
+    """Ежедневное напоминание в заданное в настройках время; reveal() показывает окно из трея."""
+
+    enabled_key = ""
+    time_key = ""
+    default_time = "09:00"
+
+    def __init__(self, root, reveal):
+        self.root = root
+        self.reveal = reveal
+
+    @property
+    def settings(self) -> dict:
+        return getattr(self.root, "app_settings", None) or {}
+
+    def weekdays(self):
+        return None
+
+    def next_after(self, moment: datetime) -> datetime | None:
+        if not bool(self.settings.get(self.enabled_key, False)):
+            return None
+        hh, mm = parse_hhmm(self.settings.get(self.time_key, self.default_time), parse_hhmm(self.default_time))
+        return next_daily(moment, hh, mm, self.weekdays())
+
+    def snooze(self, delta: timedelta):
+        if self.scheduler is not None:
+            self.scheduler.snooze(self.name, datetime.now() + delta)
+
+
+class MeridianPendingJob(_ReminderJob):
+    """Заказы Меридиан в статусе «Не заказан» — по выбранным дням недели."""
+
+    name = "notify_meridian"
+    enabled_key = "notify_enabled"
+    time_key = "notify_time"
+
+    def weekdays(self):
+        return self.settings.get("notify_days") or []
+
+    def run(self, now: datetime):
+        db = self.root.db
+        rule = builtin_rules(self.settings)["meridian"]
+        pending = rule_engine(self.root).matches(rule, now)
+        if not pending:
+            return
+        self.reveal()
+        from app.views.notify import show_meridian_notification
+
+        def on_mark_ordered():
+            try:
+                for o in pending:
+                    db.update_meridian_order(o["id"], {"status": "Заказан", "date": datetime.now().strftime("%Y-%m-%d %H:%M")})
+            except Exception:
+                pass
+
+        show_meridian_notification(
+            self.root, pending,
+            on_snooze=lambda minutes: self.snooze(timedelta(minutes=minutes)),
+            on_mark_ordered=on_mark_ordered,
+        )
+
+
+class MklAgedJob(_ReminderJob):
+    """Заказы МКЛ «Не заказан» старше mkl_notify_after_days дней — ежедневно."""
+
+    name = "notify_mkl"
+    enabled_key = "mkl_notify_enabled"
+    time_key = "mkl_notify_time"
+
+    def run(self, now: datetime):
+        db = self.root.db
+        rule = builtin_rules(self.settings)["mkl"]
+        aged_pending = rule_engine(self.root).matches(rule, now)
+        if not aged_pending:
+            return
+        self.reveal()
+        from app.views.notify import show_mkl_notification
+
+        def on_mark_ordered():
+            try:
+                for o in aged_pending:
+                    db.update_mkl_order(o["id"], {"status": "Заказан", "date": datetime.now().strftime("%Y-%m-%d %H:%M")})
+            except Exception:
+                pass
+
+        show_mkl_notification(
+            self.root, aged_pending,
+            on_snooze_days=lambda d: self.snooze(timedelta(days=d)),
+            on_mark_ordered=on_mark_ordered,
+        )
+
+
+class ReorderJob(_ReminderJob):
+    """Клиенты, у которых скоро закончатся линзы (ReorderEngine) — ежедневно."""
+
+    name = "notify_reorder"
+    enabled_key = "reorder_notify_enabled"
+    time_key = "reorder_notify_time"
+    default_time = "10:00"
+
+    def run(self, now: datetime):
+        from app.reorder import ReorderEngine
+
+        engine = getattr(self.root, "reorder_engine", None)
+        if engine is None:
+            engine = ReorderEngine(self.root.db)
+            self.root.reorder_engine = engine
+        # Catalog may have changed since the last run; history is folded incrementally
+        engine.invalidate_catalog()
+        engine.refresh()
+        due_items = engine.due(before_days=int(self.settings.get("reorder_notify_before_days", 7)))
+        if not due_items:
+            return
+        self.reveal()
+        from app.views.notify import show_reorder_notification
+
+        def on_dismiss():
+            try:
+                engine.dismiss(due_items)
+            except Exception:
+                pass
+
+        show_reorder_notification(
+            self.root, due_items,
+            on_snooze_days=lambda d: self.snooze(timedelta(days=d)),
+            on_dismiss=on_dismiss,
+        )
+
+
+class RuleJob(_ReminderJob):
+    """Пользовательское правило уведомления (настройка notify_rules, app/rules.py)."""
+
+    def __init__(self, root, reveal, rule: NotifyRule):
+        super().__init__(root, reveal)
+        self.rule = rule
+        self.name = f"rule_{rule.id}"
+
+    def next_after(self, moment: datetime) -> datetime | None:
+        if not self.rule.enabled:
+            return None
+        hh, mm = parse_hhmm(self.rule.time)
+        return next_daily(moment, hh, mm, self.rule.days or None)
+
+    def run(self, now: datetime):
+        orders = rule_engine(self.root).matches(self.rule, now)
+        if not orders:
+            return
+        self.reveal()
+        from app.views.notify import show_rule_notification
+
+        show_rule_notification(
+            self.root, self.rule.name, self.rule.order_type, orders,
+            on_snooze_days=lambda d: self.snooze(timedelta(days=d)),
+        )
+
+
+def sync_rule_jobs(root):
+    """Привести задачи пользовательских правил в соответствие с настройками (после их изменения)."""
+    scheduler = getattr(root, "scheduler", None)
+    if scheduler is None:
+        return
+    reveal = getattr(scheduler, "reveal", None)
+    rules = {f"rule_{r.id}": r for r in custom_rules(getattr(root, "app_settings", None) or {})}
+    for name in [n for n in scheduler.jobs if n.startswith("rule_") and n not in rules]:
+        scheduler.remove(name)
+    for name, rule in rules.items():
+        job = scheduler.jobs.get(name)
+        if job is None:
+            scheduler.add(RuleJob(root, reveal, rule))
+        else:
+            job.rule = rule
+    scheduler.reschedule()
+
+
+def _refresh_reports(root):
+    from app.reports import ReportEngine
+
+    ReportEngine(root.db).refresh()
+
+
+def install_jobs(root, reveal, backup) -> Scheduler:
+    """
+    Планировщик приложения: напоминания Меридиан/МКЛ/повторный заказ и
+    пользовательские правила (app/rules.py), суточная резервная копия БД
+    (backup()), свёртка журнала статусов в отчёты и подпись иконки трея.
+    Хранится в root.scheduler; reveal() сохраняется для задач новых правил.
+    """
+    from app.tray import _update_tray_title
+
+    scheduler = Scheduler(root, root.db)
+    scheduler.reveal = reveal
+    scheduler.add(MeridianPendingJob(root, reveal))
+    scheduler.add(MklAgedJob(root, reveal))
+    scheduler.add(ReorderJob(root, reveal))
+    for rule in custom_rules(getattr(root, "app_settings", None) or {}):
+        scheduler.add(RuleJob(root, reveal, rule))
+    scheduler.add(IntervalJob("backup", timedelta(days=1), backup))
+    scheduler.add(IntervalJob("reports_refresh", timedelta(hours=1), lambda: _refresh_reports(root)))
+    # Keep tray tooltip counters fresh (cheap: reads materialized counters)
+    scheduler.add(IntervalJob("tray_title", timedelta(minutes=1), lambda: _update_tray_title(root), catch_up=False, persist=False))
+    root.scheduler = scheduler
+    return scheduler
@@ -0,0 +1,115 @@
+import tkinter as tk
+from collections import OrderedDict
+
+
+class ViewPool:
+    """
+    Кэш экранов главного окна.
+
+    Экран (фрейм в root) создаётся один раз и при уходе с него прячется
+    (grid_remove/pack_forget), а не уничтожается; при возврате показывается
+    снова и, если у него есть метод refresh_if_stale(), тот сам решает,
+    перечитывать ли данные. Неиспользуемые дольше всех экраны сверх capacity
+    уничтожаются. Экраны не из пула (формы, разовые виды) при переходе
+    уничтожаются, как раньше.
+    """
+
+    def __init__(self, root: tk.Tk, capacity: int = 5):
+        self.root = root
+        self.capacity = capacity
+        self._views: OrderedDict[str, tk.Widget] = OrderedDict()
+        self._layout: dict[str, tuple[str, dict]] = {}
+
+    def show(self, key: str, factory) -> tk.Widget:
+        """Показать экран key; factory() создаёт и размещает его, если в пуле его нет."""
+        view = self._views.get(key)
+        if view is not None and not self._alive(view):
+            self._forget(key)
+            view = None
+        self.hide_all(keep=view)
+        if view is None:
+            view = factory()
+            self._views[key] = view
+            self._evict()
+        else:
+            self._views.move_to_end(key)
+            self._restore(key, view)
+            refresh = getattr(view, "refresh_if_stale", None)
+            if callable(refresh):
+                try:
+                    refresh()
+                except Exception:
+                    pass
+        return view
+
+    def hide_all(self, keep: tk.Widget | None = None):
+        """Спрятать экраны пула и уничтожить прочие фреймы root (диалоги и меню не трогаются)."""
+        pooled = {id(v): k for k, v in self._views.items()}
+        for child in list(self.root.winfo_children()):
+            if child is keep or isinstance(child, (tk.Toplevel, tk.Menu)):
+                continue
+            key = pooled.get(id(child))
+            try:
+                if key is None:
+                    child.destroy()
+                else:
+                    self._hide(key, child)
+            except Exception:
+                pass
+
+    def evict(self, key: str):
+        """Уничтожить экран key (следующий show() построит его заново)."""
+        view = self._views.get(key)
+        self._forget(key)
+        if view is not None:
+            try:
+                view.destroy()
+            except Exception:
+                pass
+
+    def owns(self, view: tk.Widget) -> bool:
+        return any(v is view for v in self._views.values())
+
+    # --- Internal ---
+    def _hide(self, key: str, view: tk.Widget):
+        manager = view.winfo_manager()
+        if manager == "grid":
+            self._layout[key] = ("grid", {})
+            view.grid_remove()  # grid запоминает параметры размещения сам
+        elif manager == "pack":
+            info = dict(view.pack_info())
+            info.pop("in", None)
+            self._layout[key] = ("pack", info)
+            view.pack_forget()
+
+    def _restore(self, key: str, view: tk.Widget):
+        manager, info = self._layout.pop(key, ("", {}))
+        if manager == "grid":
+            view.grid()
+        elif manager == "pack":
+            view.pack(**info)
+
+    def _evict(self):
+        while len(self._views) > self.capacity:
+            key = next(iter(self._views))
+            self.evict(key)
+
+    def _forget(self, key: str):
+        self._views.pop(key, None)
+        self._layout.pop(key, None)
+
+    @staticmethod
+    def _alive(view: tk.Widget) -> bool:
+        try:
+            return bool(view.winfo_exists())
+        except Exception:
+            return False
+
+
+def view_pool(root: tk.Tk) -> ViewPool:
+    """Пул экранов окна (создаётся при первом обращении)."""
+    pool = root.__dict__.get("_view_pool")
+    if pool is None:
+        pool = ViewPool(root)
+        root._view_pool = pool
+    return pool
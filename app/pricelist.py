@@ -0,0 +1,489 @@
+import csv
+import hashlib
+import os
+import re
+import threading
+import zipfile
+from datetime import datetime
+from xml.etree.ElementTree import iterparse
+
+from app.db import AppDB
+
+
+PDF_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+HASH_CHUNK = 1 << 20
+PARSER_VERSION = 3
+SNIFF = 65536
+
+# Цена: «1 250,00», «1250.5», «990 руб.», «1 250 ₽» — число в конце ячейки или строки
+_PRICE_RE = re.compile(
+    r"(?<![\w.,])(?!0\d)(\d{1,3}(?:[ \u00a0]\d{3})+|\d+)(?:[.,](\d{1,2}))?\s*(?:руб\.?|р\.?|₽|rub)?\s*$",
+    re.IGNORECASE,
+)
+_LETTER_RE = re.compile(r"[A-Za-zА-Яа-яЁё]")
+# Заголовок колонки цены: «Цена», «Цена, руб.», «Стоимость», «₽»
+_PRICE_HEADER_RE = re.compile(r"цена|стоимость|руб|₽", re.IGNORECASE)
+# Ячейка заголовка короткая: «Цены указаны в рублях с НДС» — это титул, а не колонка
+PRICE_HEADER_MAX = 24
+_XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+class PriceParseError(Exception):
+    """Файл прайса не удалось разобрать: текст показывается пользователю."""
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 файла вместе с версией разборщика: после её смены файлы разбираются заново."""
+    h = hashlib.sha256(f"price-parser:{PARSER_VERSION}\n".encode())
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def parse_price(text) -> float | None:
+    """Число цены из ячейки/хвоста строки; None — не цена."""
+    if isinstance(text, (int, float)):
+        return float(text) if text > 0 else None
+    m = _PRICE_RE.search(str(text or "").strip())
+    if not m:
+        return None
+    value = float(re.sub(r"[ \u00a0]", "", m.group(1)) + ("." + m.group(2) if m.group(2) else ""))
+    return value if value > 0 else None
+
+
+def _cell_text(cell) -> str:
+    if isinstance(cell, float):
+        return f"{cell:g}" if cell != int(cell) else str(int(cell))
+    return "" if cell is None else str(cell).strip()
+
+
+def row_from_cells(cells, loc: str, price_col: int | None = None) -> dict | None:
+    """
+    Строка таблицы → {"product", "price", "raw", "loc"}: цена — ячейка
+    price_col (колонка из заголовка), без неё — самая правая ячейка-число;
+    товар — самая длинная ячейка с буквами. Числа XLSX приходят как float.
+    Заголовки, разделы без цены и пустые строки отбрасываются.
+    """
+    cells = [c if isinstance(c, float) else _cell_text(c) for c in cells]
+    price, price_pos = None, -1
+    if price_col is not None:
+        if price_col < len(cells):
+            price, price_pos = _cell_price(cells[price_col]), price_col
+    else:
+        for pos in range(len(cells) - 1, -1, -1):
+            price = _cell_price(cells[pos])
+            if price is not None:
+                price_pos = pos
+                break
+    if price is None:
+        return None
+    texts = [c for i, c in enumerate(cells) if i != price_pos and isinstance(c, str) and _LETTER_RE.search(c)]
+    if not texts:
+        return None
+    product = max(texts, key=len).replace("\n", " ")
+    raw = " | ".join(t for t in (_cell_text(c) for c in cells) if t)
+    return {"product": product, "price": price, "raw": raw, "loc": loc}
+
+
+def _cell_price(cell) -> float | None:
+    if isinstance(cell, float):
+        return round(cell, 2) if cell > 0 else None
+    if not cell or _LETTER_RE.search(cell.lower().replace("руб", "").replace("р.", "")):
+        return None
+    return parse_price(cell)
+
+
+class PriceTable:
+    """
+    Строки одной таблицы (лист XLSX, таблица PDF, файл CSV): если встретился
+    заголовок с колонкой цены («Цена», «Стоимость», «руб»), цена берётся из
+    неё — иначе правые колонки «Кол-во»/«Остаток» приняли бы за цену. Без
+    заголовка — эвристика row_from_cells. Заголовок — строка из нескольких
+    непустых ячеек, где ячейка цены короткая и без цифр.
+    """
+
+    def __init__(self):
+        self.price_col: int | None = None
+
+    def row(self, cells, loc: str) -> dict | None:
+        texts = [_cell_text(c) for c in cells] if self.price_col is None else []
+        if sum(1 for t in texts if t) >= 2:
+            for pos, text in enumerate(texts):
+                if len(text) <= PRICE_HEADER_MAX and _PRICE_HEADER_RE.search(text) and not re.search(r"\d", text):
+                    self.price_col = pos
+                    return None
+        return row_from_cells(cells, loc, self.price_col)
+
+
+def row_from_text(line: str, loc: str) -> dict | None:
+    """Строка текста «Товар … 1 250,00» → строка прайса (цена — число в конце)."""
+    line = line.strip()
+    m = _PRICE_RE.search(line)
+    if not m:
+        return None
+    product = line[:m.start()].strip(" \t.-–—:;|")
+    if not _LETTER_RE.search(product):
+        return None
+    price = parse_price(line[m.start():])
+    if price is None:
+        return None
+    return {"product": product, "price": price, "raw": line, "loc": loc}
+
+
+# --- Parsers: каждый возвращает список строк прайса ---
+def _pdf_page_rows(path: str, index: int) -> list[dict]:
+    """Одна страница PDF (выполняется в процессе пула): таблицы, иначе строки текста."""
+    import pdfplumber
+
+    loc = f"стр. {index + 1}"
+    with pdfplumber.open(path) as pdf:
+        page = pdf.pages[index]
+        rows = []
+        for table in page.extract_tables() or []:
+            parser = PriceTable()
+            rows.extend(r for cells in table if (r := parser.row(cells, loc)))
+        if not rows:
+            rows = [r for line in (page.extract_text() or "").splitlines() if (r := row_from_text(line, loc))]
+    return rows
+
+
+def parse_pdf(path: str) -> list[dict]:
+    """PDF через pdfplumber: страницы разбираются параллельно в пуле процессов, по странице на задачу."""
+    try:
+        import pdfplumber
+    except ImportError:
+        raise PriceParseError("Для PDF-прайсов нужен пакет pdfplumber (pip install pdfplumber).")
+    with pdfplumber.open(path) as pdf:
+        pages = len(pdf.pages)
+    if pages <= 1:
+        return [r for i in range(pages) for r in _pdf_page_rows(path, i)]
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+
+    try:
+        with ProcessPoolExecutor(max_workers=min(PDF_WORKERS, pages)) as pool:
+            chunks = list(pool.map(_pdf_page_rows, [path] * pages, range(pages)))
+    except (BrokenProcessPool, OSError):
+        # Процессы недоступны (ограничения ОС, антивирус) — по страницам в этом потоке
+        chunks = [_pdf_page_rows(path, i) for i in range(pages)]
+    return [r for chunk in chunks for r in chunk]
+
+
+def _xlsx_shared_strings(zf: zipfile.ZipFile) -> list[str]:
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    strings = []
+    with zf.open("xl/sharedStrings.xml") as f:
+        for _, elem in iterparse(f):
+            if elem.tag == _XLSX_NS + "si":
+                strings.append("".join(t.text or "" for t in elem.iter(_XLSX_NS + "t")))
+                elem.clear()
+    return strings
+
+
+def parse_xlsx(path: str) -> list[dict]:
+    """XLSX без сторонних библиотек: zipfile + потоковый разбор XML листов (память — одна строка)."""
+    try:
+        zf = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise PriceParseError("Файл не является книгой XLSX (старый формат .xls не поддерживается — сохраните как .xlsx).")
+    rows = []
+    with zf:
+        strings = _xlsx_shared_strings(zf)
+        sheets = sorted(
+            (n for n in zf.namelist() if re.fullmatch(r"xl/worksheets/sheet\d+\.xml", n)),
+            key=lambda n: int(re.search(r"(\d+)\.xml$", n).group(1)),
+        )
+        for sheet_no, name in enumerate(sheets, 1):
+            with zf.open(name) as f:
+                table = PriceTable()
+                cells = []
+                for _, elem in iterparse(f):
+                    if elem.tag == _XLSX_NS + "c":
+                        kind = elem.get("t")
+                        if kind == "inlineStr":
+                            value = "".join(t.text or "" for t in elem.iter(_XLSX_NS + "t"))
+                        else:
+                            v = elem.find(_XLSX_NS + "v")
+                            value = "" if v is None else (v.text or "")
+                            if kind == "s" and value.isdigit():
+                                value = strings[int(value)] if int(value) < len(strings) else ""
+                            elif kind in (None, "n") and value:
+                                # Число (в т.ч. результат формулы 1319.9879999999998) — как float, не текстом
+                                try:
+                                    value = float(value)
+                                except ValueError:
+                                    pass
+                        cells.append(value)
+                    elif elem.tag == _XLSX_NS + "row":
+                        row = table.row(cells, f"лист {sheet_no}, строка {elem.get('r', '')}")
+                        if row:
+                            rows.append(row)
+                        cells = []
+                        elem.clear()
+    return rows
+
+
+def _text_encoding(path: str) -> str:
+    with open(path, "rb") as f:
+        head = f.read(SNIFF)
+    try:
+        head.decode("utf-8")
+        return "utf-8-sig"
+    except UnicodeDecodeError as e:
+        return "utf-8-sig" if e.start >= len(head) - 3 else "cp1251"
+
+
+def parse_csv(path: str) -> list[dict]:
+    """CSV: разделитель определяется сам, строка — ячейки таблицы."""
+    rows = []
+    with open(path, "r", encoding=_text_encoding(path), errors="replace", newline="") as f:
+        sample = f.read(SNIFF)
+        f.seek(0)
+        fmt = {}
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+        except csv.Error:
+            # Строки разной длины (титул над таблицей) — самый частый из разделителей
+            dialect = csv.excel
+            fmt["delimiter"] = max(";,\t", key=sample.count)
+        table = PriceTable()
+        for n, cells in enumerate(csv.reader(f, dialect, **fmt), 1):
+            row = table.row(cells, f"строка {n}")
+            if row:
+                rows.append(row)
+    return rows
+
+
+def parse_text(path: str) -> list[dict]:
+    """Текстовый прайс: строка «товар … цена»."""
+    rows = []
+    with open(path, "r", encoding=_text_encoding(path), errors="replace") as f:
+        for n, line in enumerate(f, 1):
+            row = row_from_text(line, f"строка {n}")
+            if row:
+                rows.append(row)
+    return rows
+
+
+PARSERS = {
+    ".pdf": parse_pdf,
+    ".xlsx": parse_xlsx,
+    ".xlsm": parse_xlsx,
+    ".csv": parse_csv,
+    ".txt": parse_text,
+}
+
+
+def parse_price_file(path: str) -> list[dict]:
+    parser = PARSERS.get(os.path.splitext(path)[1].lower())
+    if parser is None:
+        raise PriceParseError(f"Формат не поддерживается: {os.path.basename(path)} (PDF, XLSX, CSV, TXT).")
+    return parser(path)
+
+
+def prepare(price: dict, cached_hash: str | None, hash_owners: dict) -> dict:
+    """
+    Работа вне потока Tk и без базы: хэш файла и разбор, если файл менялся.
+    action: "cached" — не изменился, "copy" — такой же файл уже разобран
+    для другого прайса (source), "parsed" — rows, "error" — error.
+    """
+    path = price.get("path") or ""
+    if not os.path.isfile(path):
+        return {"action": "error", "error": "файл не найден"}
+    try:
+        sha = file_hash(path)
+        if sha == cached_hash:
+            return {"action": "cached", "sha": sha}
+        owner = hash_owners.get(sha)
+        if owner is not None and owner != price["id"]:
+            return {"action": "copy", "sha": sha, "source": owner}
+        return {"action": "parsed", "sha": sha, "rows": parse_price_file(path)}
+    except PriceParseError as e:
+        return {"action": "error", "error": str(e)}
+    except Exception as e:
+        return {"action": "error", "error": f"{e.__class__.__name__}: {e}"}
+
+
+class PriceIndex:
+    """
+    Строки прайсов (товар, цена) из зарегистрированных файлов в price_rows.
+
+    price_files хранит SHA-256 разобранного файла: неизменённый файл не
+    разбирается повторно, одинаковый файл под другим названием копируется из
+    уже разобранного. Разбор (prepare) идёт без базы — в рабочем потоке,
+    запись (apply) — одной транзакцией в потоке владельца соединения.
+    """
+
+    def __init__(self, db: AppDB):
+        self.db = db
+        self.conn = db.conn
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS price_files (
+                price_id INTEGER PRIMARY KEY,
+                sha256 TEXT,
+                rows INTEGER NOT NULL DEFAULT 0,
+                parsed_at TEXT,
+                error TEXT,
+                FOREIGN KEY(price_id) REFERENCES prices(id) ON DELETE CASCADE
+            );
+            """
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS price_rows (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                price_id INTEGER NOT NULL,
+                product TEXT NOT NULL,
+                search TEXT NOT NULL,
+                price REAL NOT NULL,
+                raw TEXT,
+                loc TEXT,
+                FOREIGN KEY(price_id) REFERENCES prices(id) ON DELETE CASCADE
+            );
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_price_rows_price ON price_rows(price_id);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_price_files_sha ON price_files(sha256);")
+        self.conn.commit()
+
+    def cached(self) -> dict[int, str]:
+        """price_id → хэш последнего удачного разбора."""
+        rows = self.conn.execute("SELECT price_id, sha256 FROM price_files WHERE error IS NULL AND sha256 IS NOT NULL;")
+        return {r["price_id"]: r["sha256"] for r in rows}
+
+    def status(self) -> dict[int, dict]:
+        rows = self.conn.execute("SELECT price_id, rows, parsed_at, error FROM price_files;")
+        return {r["price_id"]: dict(r) for r in rows}
+
+    def apply(self, price_id: int, result: dict) -> int:
+        """Записать результат prepare(); вернуть число строк прайса."""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M")
+        action = result["action"]
+        if action == "cached":
+            row = self.conn.execute("SELECT rows FROM price_files WHERE price_id = ?;", (price_id,)).fetchone()
+            return row["rows"] if row else 0
+        with self.conn:
+            if action == "error":
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO price_files (price_id, sha256, rows, parsed_at, error) VALUES (?, NULL, 0, ?, ?);",
+                    (price_id, now, result["error"]),
+                )
+                self.conn.execute("DELETE FROM price_rows WHERE price_id = ?;", (price_id,))
+                return 0
+            self.conn.execute("DELETE FROM price_rows WHERE price_id = ?;", (price_id,))
+            if action == "copy":
+                self.conn.execute(
+                    "INSERT INTO price_rows (price_id, product, search, price, raw, loc) "
+                    "SELECT ?, product, search, price, raw, loc FROM price_rows WHERE price_id = ?;",
+                    (price_id, result["source"]),
+                )
+            else:
+                self.conn.executemany(
+                    "INSERT INTO price_rows (price_id, product, search, price, raw, loc) VALUES (?, ?, ?, ?, ?, ?);",
+                    [
+                        (price_id, r["product"], r["product"].lower(), r["price"], r.get("raw", ""), r.get("loc", ""))
+                        for r in result["rows"]
+                    ],
+                )
+            count = self.conn.execute("SELECT COUNT(*) FROM price_rows WHERE price_id = ?;", (price_id,)).fetchone()[0]
+            self.conn.execute(
+                "INSERT OR REPLACE INTO price_files (price_id, sha256, rows, parsed_at, error) VALUES (?, ?, ?, ?, NULL);",
+                (price_id, result["sha"], count, now),
+            )
+        return count
+
+    def refresh(self, prices: list[dict] | None = None, force: bool = False, progress=None) -> dict:
+        """Разобрать изменившиеся файлы в этом потоке (пакетные задачи); вернуть сводку."""
+        prices = self.db.list_prices() if prices is None else prices
+        cached = {} if force else self.cached()
+        owners = {} if force else {sha: pid for pid, sha in cached.items()}
+        summary = {"parsed": 0, "cached": 0, "rows": 0, "errors": {}}
+        for done, price in enumerate(prices, 1):
+            result = prepare(price, cached.get(price["id"]), owners)
+            summary["rows"] += self.apply(price["id"], result)
+            _count(summary, price, result)
+            if result["action"] in ("parsed", "copy"):
+                owners[result["sha"]] = price["id"]
+            if progress:
+                progress(done, len(prices))
+        return summary
+
+    def search(self, text: str, limit: int = 50) -> list[dict]:
+        """Строки прайсов, где товар содержит все слова запроса (без регистра)."""
+        # LOWER в SQLite не знает кириллицу: search заполняется str.lower() при записи
+        words = [w for w in (text or "").lower().split() if w]
+        if not words:
+            return []
+        rows = self.conn.execute(
+            f"""
+            SELECT r.product, r.price, r.loc, p.name AS price_name
+            FROM price_rows r JOIN prices p ON p.id = r.price_id
+            WHERE {" AND ".join("r.search LIKE ?" for _ in words)}
+            ORDER BY r.price LIMIT ?;
+            """,
+            (*[f"%{w}%" for w in words], limit),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+def _count(summary: dict, price: dict, result: dict):
+    if result["action"] == "error":
+        summary["errors"][price.get("name") or price.get("path")] = result["error"]
+    elif result["action"] == "cached":
+        summary["cached"] += 1
+    else:
+        summary["parsed"] += 1
+
+
+class PriceIngestTask:
+    """
+    Обновление строк прайсов в рабочем потоке: хэш и разбор файлов (PDF — в
+    пуле процессов) идут вне Tk, запись каждого прайса и on_progress(сделано,
+    всего) / on_done(сводка) — в потоке Tk через диспетчер (app/dispatch.py).
+    """
+
+    def __init__(self, root, prices: list[dict] | None = None, force: bool = False, on_progress=None, on_done=None):
+        self.root = root
+        self.index = PriceIndex(root.db)
+        self.prices = root.db.list_prices() if prices is None else prices
+        self.cached = {} if force else self.index.cached()
+        self.owners = {} if force else {sha: pid for pid, sha in self.cached.items()}
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.summary = {"parsed": 0, "cached": 0, "rows": 0, "errors": {}}
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "PriceIngestTask":
+        self._thread = threading.Thread(target=self._run, name="price-ingest", daemon=True)
+        self._thread.start()
+        return self
+
+    def _post(self, func, *args):
+        from app.dispatch import PRIORITY_LOW, call_ui
+
+        if func is not None:
+            call_ui(self.root, func, *args, priority=PRIORITY_LOW)
+
+    def _store(self, price: dict, result: dict):
+        try:
+            self.summary["rows"] += self.index.apply(price["id"], result)
+        except Exception as e:
+            result = {"action": "error", "error": str(e)}
+        _count(self.summary, price, result)
+
+    def _run(self):
+        total = len(self.prices)
+        for done, price in enumerate(self.prices, 1):
+            result = prepare(price, self.cached.get(price["id"]), self.owners)
+            if result["action"] in ("parsed", "copy"):
+                self.owners[result["sha"]] = price["id"]
+            self._post(self._store, price, result)
+            self._post(self.on_progress, done, total)
+        self._post(lambda: self.on_done(self.summary) if self.on_done else None)
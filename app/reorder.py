@@ -0,0 +1,251 @@
+import re
+from datetime import datetime, timedelta
+
+from app.db import AppDB
+
+
+# Срок ношения одной линзы (дней) по названию группы каталога МКЛ
+_GROUP_MODALITY = (
+    ("однодневн", 1),
+    ("двухнедельн", 14),
+    ("ежемесячн", 30),
+    ("квартальн", 90),
+)
+# Подсказки в названии товара важнее группы (например, «1-DAY … for ASTIGMATISM» лежит в «Двухнедельные»)
+_NAME_MODALITY = (
+    (re.compile(r"\b1[\s-]?day\b|\bdailies\b|однодн", re.IGNORECASE), 1),
+)
+_PACK_RE = (
+    re.compile(r"(\d+)\s*pk\b", re.IGNORECASE),
+    re.compile(r"\((\d+)\s*линз", re.IGNORECASE),
+)
+
+
+def parse_pack_size(name: str) -> int | None:
+    """Число линз в упаковке из названия: «Adria GO 30pk» -> 30, «ADRIA WOW (30 линз)» -> 30."""
+    for rx in _PACK_RE:
+        m = rx.search(name or "")
+        if m:
+            try:
+                n = int(m.group(1))
+                return n if n > 0 else None
+            except Exception:
+                return None
+    return None
+
+
+def parse_modality_days(name: str, group_names: list[str]) -> int | None:
+    """Срок ношения линзы: сначала по названию товара, затем по цепочке групп от ближайшей к корню."""
+    for rx, days in _NAME_MODALITY:
+        if rx.search(name or ""):
+            return days
+    for gname in group_names:
+        low = (gname or "").lower()
+        for marker, days in _GROUP_MODALITY:
+            if marker in low:
+                return days
+    return None
+
+
+def client_key(fio: str, phone: str) -> str:
+    """Ключ клиента: последние 10 цифр телефона, иначе ФИО в нижнем регистре."""
+    digits = re.sub(r"\D", "", phone or "")
+    if len(digits) >= 10:
+        return digits[-10:]
+    return (fio or "").strip().lower().replace("ё", "е")
+
+
+class ReorderEngine:
+    """
+    Напоминания о повторном заказе контактных линз.
+
+    Для каждого врученного заказа МКЛ оцениваем, когда у клиента закончатся линзы:
+    дата вручения (из журнала статусов) + упаковка × срок ношения × количество.
+    Считаем, что строка заказа МКЛ — линзы на один глаз.
+
+    Результат хранится в индексированной таблице reorder_due (клиент, товар).
+    refresh() обрабатывает только новые события журнала после водяного знака:
+    «Вручен» создаёт/обновляет запись, новый заказ клиента на тот же товар — снимает её.
+    """
+
+    WATERMARK_KEY = "reorder_history_watermark"
+
+    def __init__(self, db: AppDB):
+        self.db = db
+        self.conn = db.conn
+        self._supply_cache: dict[str, int | None] | None = None
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS reorder_due (
+                client_key TEXT NOT NULL,
+                product TEXT NOT NULL,
+                fio TEXT,
+                phone TEXT,
+                order_id INTEGER,
+                delivered_at TEXT NOT NULL,
+                run_out TEXT NOT NULL,
+                dismissed INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (client_key, product)
+            );
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_reorder_due_run_out ON reorder_due(dismissed, run_out);")
+        self.conn.commit()
+
+    # --- Catalog parsing ---
+    def _days_per_pack(self) -> dict[str, int | None]:
+        """Название товара МКЛ -> дней на одну упаковку (None — не линзы или не распознано)."""
+        if self._supply_cache is not None:
+            return self._supply_cache
+        groups = {
+            g["id"]: (g["name"], g["parent_id"])
+            for g in self.db.list_product_groups_mkl()
+        }
+        cache: dict[str, int | None] = {}
+        for p in self.db.list_products_mkl():
+            chain = []
+            gid = p.get("group_id")
+            guard = 0
+            while gid is not None and gid in groups and guard < 32:
+                name, parent = groups[gid]
+                chain.append(name)
+                gid = parent
+                guard += 1
+            pack = parse_pack_size(p["name"])
+            days = parse_modality_days(p["name"], chain)
+            value = pack * days if (pack and days) else None
+            # При дублях названий берём распознанное значение
+            if cache.get(p["name"]) is None:
+                cache[p["name"]] = value
+        self._supply_cache = cache
+        return cache
+
+    def invalidate_catalog(self):
+        self._supply_cache = None
+
+    def supply_days(self, product: str, qty: str | int | None) -> int | None:
+        per_pack = self._days_per_pack().get((product or "").strip())
+        if not per_pack:
+            return None
+        try:
+            n = int(str(qty).strip())
+        except Exception:
+            n = 1
+        return per_pack * max(1, n)
+
+    # --- Incremental maintenance ---
+    def refresh(self) -> int:
+        """Обработать новые события журнала статусов МКЛ. Возвращает число событий."""
+        try:
+            lo = int(self.db.get_state(self.WATERMARK_KEY, "0") or 0)
+        except Exception:
+            lo = 0
+        rows = self.conn.execute(
+            """
+            SELECT h.id, h.order_id, h.status, h.changed_at, h.product, o.fio, o.phone, o.qty
+            FROM order_status_history h
+            JOIN mkl_orders o ON o.id = h.order_id
+            WHERE h.order_type = 'mkl' AND h.id > ?
+            ORDER BY h.id ASC;
+            """,
+            (lo,),
+        ).fetchall()
+        hi_row = self.conn.execute("SELECT COALESCE(MAX(id), 0) AS m FROM order_status_history;").fetchone()
+        hi = max(lo, int(hi_row["m"] or 0))
+        if hi <= lo:
+            return 0
+        try:
+            for r in rows:
+                product = (r["product"] or "").strip()
+                if not product:
+                    continue
+                key = client_key(r["fio"], r["phone"])
+                if not key:
+                    continue
+                when = self._parse_dt(r["changed_at"])
+                if when is None:
+                    continue
+                stamp = when.strftime("%Y-%m-%d %H:%M")
+                if r["status"] == "Вручен":
+                    days = self.supply_days(product, r["qty"])
+                    if not days:
+                        continue
+                    run_out = (when + timedelta(days=days)).strftime("%Y-%m-%d")
+                    self.conn.execute(
+                        """
+                        INSERT INTO reorder_due (client_key, product, fio, phone, order_id, delivered_at, run_out, dismissed)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+                        ON CONFLICT(client_key, product) DO UPDATE SET
+                            fio = excluded.fio, phone = excluded.phone, order_id = excluded.order_id,
+                            delivered_at = excluded.delivered_at, run_out = excluded.run_out, dismissed = 0
+                        WHERE excluded.delivered_at >= reorder_due.delivered_at;
+                        """,
+                        (key, product, r["fio"], r["phone"], r["order_id"], stamp, run_out),
+                    )
+                elif r["status"] == "Не заказан":
+                    # Клиент уже сделал новый заказ на этот товар — напоминание больше не нужно
+                    self.conn.execute(
+                        "DELETE FROM reorder_due WHERE client_key=? AND product=? AND delivered_at <= ?;",
+                        (key, product, stamp),
+                    )
+            self.db.set_state(self.WATERMARK_KEY, str(hi), commit=False)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return len(rows)
+
+    def rebuild(self):
+        self.invalidate_catalog()
+        self.conn.execute("DELETE FROM reorder_due;")
+        self.db.set_state(self.WATERMARK_KEY, "0", commit=False)
+        self.conn.commit()
+        self.refresh()
+
+    @staticmethod
+    def _parse_dt(s: str):
+        for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%d.%m.%Y %H:%M", "%d.%m.%Y"):
+            try:
+                return datetime.strptime((s or "").strip(), fmt)
+            except Exception:
+                continue
+        return None
+
+    # --- Queries ---
+    def due(self, before_days: int = 7, today: datetime | None = None, limit: int | None = None) -> list[dict]:
+        """Клиенты, у которых линзы закончатся в ближайшие before_days дней (или уже закончились)."""
+        today = today or datetime.now()
+        horizon = (today + timedelta(days=max(0, int(before_days)))).strftime("%Y-%m-%d")
+        sql = (
+            "SELECT client_key, product, fio, phone, order_id, delivered_at, run_out FROM reorder_due "
+            "WHERE dismissed = 0 AND run_out <= ? ORDER BY run_out ASC"
+        )
+        params: list = [horizon]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        rows = self.conn.execute(sql, tuple(params)).fetchall()
+        return [
+            {
+                "client_key": r["client_key"],
+                "product": r["product"],
+                "fio": r["fio"] or "",
+                "phone": r["phone"] or "",
+                "order_id": r["order_id"],
+                "delivered_at": r["delivered_at"],
+                "run_out": r["run_out"],
+            }
+            for r in rows
+        ]
+
+    def dismiss(self, items: list[dict]):
+        """Скрыть напоминания (до следующего вручения этого товара клиенту)."""
+        self.conn.executemany(
+            "UPDATE reorder_due SET dismissed = 1 WHERE client_key=? AND product=?;",
+            [(it["client_key"], it["product"]) for it in items],
+        )
+        self.conn.commit()
@@ -0,0 +1,243 @@
+import sqlite3
+from datetime import datetime
+
+from app.db import AppDB
+
+
+class ReportEngine:
+    """
+    Отчёты по объёмам заказов МКЛ и Меридиан на основе дневных агрегатов.
+
+    Источник — журнал статусов order_status_history (см. AppDB._init_status_history).
+    Новые события журнала инкрементально сворачиваются в report_daily по водяному
+    знаку (последний обработанный id), поэтому запросы за несколько лет читают
+    только агрегаты и не трогают таблицы заказов.
+
+    Товары и количество берутся из заказов в момент свёртки, поэтому правка или
+    удаление уже свёрнутого заказа (позиции Меридиан, количество МКЛ) отмечается
+    триггерами в report_dirty, и refresh() пересчитывает дни с событиями этих
+    заказов. Удалённые заказы в отчёты не попадают.
+
+    Строка report_daily: сколько заказов (orders) и единиц товара (qty) перешли
+    в статус status в день day по товару product.
+    """
+
+    GROUP_KEYS = ("day", "month", "year", "product", "brand", "status")
+    WATERMARK_KEY = "report_history_watermark"
+
+    def __init__(self, db: AppDB):
+        self.db = db
+        self.conn: sqlite3.Connection = db.conn
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS report_daily (
+                order_type TEXT NOT NULL,
+                day TEXT NOT NULL,
+                product TEXT NOT NULL,
+                status TEXT NOT NULL,
+                orders INTEGER NOT NULL DEFAULT 0,
+                qty INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (order_type, day, product, status)
+            ) WITHOUT ROWID;
+            """
+        )
+        # Заказы, изменённые после свёртки (триггеры постоянные — ловят и запись из CLI)
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS report_dirty (
+                order_type TEXT NOT NULL,
+                order_id INTEGER NOT NULL,
+                PRIMARY KEY (order_type, order_id)
+            ) WITHOUT ROWID;
+            """
+        )
+        for op, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            cur.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS trg_report_meridian_items_{op.lower()} AFTER {op} ON meridian_items
+                BEGIN
+                    INSERT OR IGNORE INTO report_dirty (order_type, order_id) VALUES ('meridian', {row}.order_id);
+                END;
+                """
+            )
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_report_mkl_qty_update AFTER UPDATE OF qty ON mkl_orders
+            WHEN OLD.qty IS NOT NEW.qty
+            BEGIN
+                INSERT OR IGNORE INTO report_dirty (order_type, order_id) VALUES ('mkl', NEW.id);
+            END;
+            """
+        )
+        # Удалённый заказ МКЛ выпадает из отчётов, как заказ Меридиан вместе с позициями
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_report_mkl_delete AFTER DELETE ON mkl_orders
+            BEGIN
+                INSERT OR IGNORE INTO report_dirty (order_type, order_id) VALUES ('mkl', OLD.id);
+            END;
+            """
+        )
+        self.conn.commit()
+
+    # --- Incremental maintenance ---
+    def _watermark(self) -> int:
+        try:
+            return int(self.db.get_state(self.WATERMARK_KEY, "0") or 0)
+        except Exception:
+            return 0
+
+    @staticmethod
+    def _fold_sql(order_type: str, events: str) -> str:
+        """Свёртка событий журнала order_type, отобранных условием events (по h), в report_daily."""
+        qty_sql = "COALESCE(NULLIF(CAST({col} AS INTEGER), 0), 1)"
+        upsert = (
+            " ON CONFLICT(order_type, day, product, status) DO UPDATE SET"
+            " orders = orders + excluded.orders, qty = qty + excluded.qty;"
+        )
+        if order_type == "mkl":
+            return """
+                INSERT INTO report_daily (order_type, day, product, status, orders, qty)
+                SELECT 'mkl', date(h.changed_at), COALESCE(NULLIF(TRIM(h.product), ''), '(Без названия)'), h.status,
+                    COUNT(*), SUM(""" + qty_sql.format(col="o.qty") + """)
+                FROM order_status_history h
+                JOIN mkl_orders o ON o.id = h.order_id
+                WHERE h.order_type = 'mkl' AND """ + events + """ AND date(h.changed_at) IS NOT NULL
+                GROUP BY 2, 3, 4
+                """ + upsert
+        # Меридиан: товары берутся из позиций заказа
+        return """
+            INSERT INTO report_daily (order_type, day, product, status, orders, qty)
+            SELECT 'meridian', date(h.changed_at), COALESCE(NULLIF(TRIM(i.product), ''), '(Без названия)'), h.status,
+                COUNT(DISTINCT h.id), SUM(""" + qty_sql.format(col="i.qty") + """)
+            FROM order_status_history h
+            JOIN meridian_items i ON i.order_id = h.order_id
+            WHERE h.order_type = 'meridian' AND """ + events + """ AND date(h.changed_at) IS NOT NULL
+            GROUP BY 2, 3, 4
+            """ + upsert
+
+    def _refold_dirty(self, lo: int) -> int:
+        """
+        Пересчитать уже свёрнутые (id <= lo) дни, где есть события изменённых
+        заказов: строки report_daily дня складываются из всех его заказов, поэтому
+        день удаляется и сворачивается заново. Возвращает число таких заказов.
+        """
+        dirty = self.conn.execute("SELECT COUNT(*) AS n FROM report_dirty;").fetchone()["n"]
+        if not dirty:
+            return 0
+        days = """(
+            SELECT date(d.changed_at) FROM order_status_history d
+            JOIN report_dirty x ON x.order_type = d.order_type AND x.order_id = d.order_id
+            WHERE d.order_type = ? AND d.id <= ?
+        )"""
+        for order_type in ("mkl", "meridian"):
+            self.conn.execute(f"DELETE FROM report_daily WHERE order_type = ? AND day IN {days};", (order_type, order_type, lo))
+            self.conn.execute(
+                self._fold_sql(order_type, f"h.id <= ? AND date(h.changed_at) IN {days}"),
+                (lo, order_type, lo),
+            )
+        self.conn.execute("DELETE FROM report_dirty;")
+        return dirty
+
+    def refresh(self) -> int:
+        """
+        Свернуть новые события журнала в дневные агрегаты и пересчитать дни
+        изменённых заказов. Возвращает число новых событий и изменённых заказов.
+        """
+        lo = self._watermark()
+        row = self.conn.execute("SELECT COALESCE(MAX(id), 0) AS m FROM order_status_history;").fetchone()
+        hi = max(lo, int(row["m"] or 0))
+        try:
+            refolded = self._refold_dirty(lo)
+            if hi > lo:
+                for order_type in ("mkl", "meridian"):
+                    self.conn.execute(self._fold_sql(order_type, "h.id > ? AND h.id <= ?"), (lo, hi))
+                self.db.set_state(self.WATERMARK_KEY, str(hi), commit=False)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return hi - lo + refolded
+
+    def rebuild(self):
+        """Полностью пересчитать агрегаты из журнала статусов."""
+        self.conn.execute("DELETE FROM report_daily;")
+        self.conn.execute("DELETE FROM report_dirty;")
+        self.db.set_state(self.WATERMARK_KEY, "0", commit=False)
+        self.conn.commit()
+        self.refresh()
+
+    # --- Queries ---
+    def query(
+        self,
+        order_type: str = "mkl",
+        date_from: str | None = None,
+        date_to: str | None = None,
+        group_by: tuple[str, ...] | list[str] = ("month", "brand"),
+        status: str | None = "Не заказан",
+    ) -> list[dict]:
+        """
+        Объёмы за период [date_from, date_to] (даты 'YYYY-MM-DD', включительно),
+        сгруппированные по ключам из GROUP_KEYS. status=None — все статусы
+        (тогда один заказ учитывается в каждом статусе, через который прошёл).
+        """
+        group_by = tuple(group_by)
+        for key in group_by:
+            if key not in self.GROUP_KEYS:
+                raise ValueError(f"Неизвестный ключ группировки: {key}")
+        self.refresh()
+
+        key_exprs = {
+            "day": "r.day",
+            "month": "substr(r.day, 1, 7)",
+            "year": "substr(r.day, 1, 4)",
+            "product": "r.product",
+            "brand": "COALESCE(b.brand, '(Без бренда)')",
+            "status": "r.status",
+        }
+        select_keys = [f"{key_exprs[k]} AS {k}" for k in group_by]
+        where = ["r.order_type = ?"]
+        params: list = [order_type]
+        if date_from:
+            where.append("r.day >= ?")
+            params.append(date_from)
+        if date_to:
+            where.append("r.day <= ?")
+            params.append(date_to)
+        if status:
+            where.append("r.status = ?")
+            params.append(status)
+
+        cte = ""
+        joins = ""
+        if "brand" in group_by:
+            cte = "WITH RECURSIVE " + self.db._brand_tree_cte(order_type).rstrip().rstrip(",")
+            joins = " LEFT JOIN product_group pg ON pg.name = r.product LEFT JOIN brand_tree b ON b.id = pg.gid"
+
+        sql = f"""
+            {cte}
+            SELECT {", ".join(select_keys + ["SUM(r.orders) AS orders", "SUM(r.qty) AS qty"])}
+            FROM report_daily r{joins}
+            WHERE {" AND ".join(where)}
+        """
+        if group_by:
+            positions = ", ".join(str(i + 1) for i in range(len(group_by)))
+            sql += f" GROUP BY {positions} ORDER BY {positions}"
+        rows = self.conn.execute(sql, tuple(params)).fetchall()
+        result = []
+        for r in rows:
+            item = {k: r[k] for k in group_by}
+            item["orders"] = r["orders"] or 0
+            item["qty"] = r["qty"] or 0
+            result.append(item)
+        return result
+
+    @staticmethod
+    def default_period() -> tuple[str, str]:
+        """Период по умолчанию: с начала прошлого года по сегодня."""
+        today = datetime.now()
+        return f"{today.year - 1}-01-01", today.strftime("%Y-%m-%d")
@@ -0,0 +1,212 @@
+import uuid
+from datetime import datetime, timedelta
+
+from app.db import AppDB
+
+
+ORDER_TYPES = {"mkl": "МКЛ", "meridian": "Меридиан"}
+STATUSES = {
+    "mkl": ["Не заказан", "Заказан", "Прозвонен", "Вручен"],
+    "meridian": ["Не заказан", "Заказан"],
+}
+
+_TABLES = {"mkl": "mkl_orders", "meridian": "meridian_orders"}
+_GROUPS = {"mkl": ("products_mkl", "product_groups_mkl"), "meridian": ("products_meridian", "product_groups_meridian")}
+
+
+def _date_key(col: str) -> str:
+    """
+    Дата заказа как сравнимая строка «YYYY-MM-DD HH:MM»: ISO-даты как есть,
+    «ДД.ММ.ГГГГ[ ЧЧ:ММ]» переставляются. Это же выражение лежит в индексе
+    (status, дата), поэтому запросы «статус X старше N дней» идут по индексу.
+    """
+    return (
+        f"(CASE WHEN {col} GLOB '[0-9][0-9].[0-9][0-9].[0-9][0-9][0-9][0-9]*' "
+        f"THEN substr({col}, 7, 4) || '-' || substr({col}, 4, 2) || '-' || substr({col}, 1, 2) || substr({col}, 11) "
+        f"ELSE {col} END)"
+    )
+
+
+def _parse_key(key: str) -> datetime | None:
+    for fmt, size in (("%Y-%m-%d %H:%M", 16), ("%Y-%m-%d", 10)):
+        try:
+            return datetime.strptime((key or "")[:size], fmt)
+        except Exception:
+            continue
+    return None
+
+
+class NotifyRule:
+    """
+    Правило уведомления: заказы типа order_type в статусе status, лежащие в нём
+    не меньше min_age_days дней (по дате заказа), при необходимости — только
+    товары группы group_id (с подгруппами) и клиент/название, содержащее client.
+    Проверяется ежедневно в time в дни days (пусто — каждый день).
+    """
+
+    def __init__(self, data: dict | None = None):
+        data = data or {}
+        self.id = str(data.get("id") or uuid.uuid4().hex[:8])
+        self.name = (data.get("name") or "").strip() or "Правило"
+        self.order_type = data.get("order_type") if data.get("order_type") in _TABLES else "mkl"
+        self.status = (data.get("status") or "Не заказан").strip()
+        self.min_age_days = max(0, int(data.get("min_age_days") or 0))
+        self.group_id = data.get("group_id") or None
+        self.group_name = data.get("group_name") or ""
+        self.client = (data.get("client") or "").strip()
+        self.time = (data.get("time") or "09:00").strip()
+        self.days = [int(d) for d in (data.get("days") or [])]
+        self.enabled = bool(data.get("enabled", True))
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id, "name": self.name, "order_type": self.order_type, "status": self.status,
+            "min_age_days": self.min_age_days, "group_id": self.group_id, "group_name": self.group_name,
+            "client": self.client, "time": self.time, "days": self.days, "enabled": self.enabled,
+        }
+
+    def describe(self) -> str:
+        parts = [f"{ORDER_TYPES[self.order_type]}: «{self.status}»"]
+        if self.min_age_days:
+            parts.append(f"дольше {self.min_age_days} дн.")
+        if self.group_id:
+            parts.append(f"группа «{self.group_name}»")
+        if self.client:
+            parts.append(f"клиент «{self.client}»")
+        return ", ".join(parts)
+
+    def watched(self) -> tuple[str, ...]:
+        """Версии данных (AppDB.catalog_version), от которых зависит результат."""
+        kinds = (_TABLES[self.order_type],)
+        return kinds + ((self.order_type,) if self.group_id else ())
+
+    def compile(self) -> tuple[str, list]:
+        """WHERE-условие (без порога возраста) и параметры; o — псевдоним таблицы заказов."""
+        where, params = ["o.status = ?"], [self.status]
+        if self.group_id:
+            products, groups = _GROUPS[self.order_type]
+            subtree = (
+                f"SELECT p.name FROM {products} p WHERE p.group_id IN ("
+                f"WITH RECURSIVE sub(id) AS (SELECT ? UNION SELECT g.id FROM {groups} g JOIN sub ON g.parent_id = sub.id) "
+                f"SELECT id FROM sub)"
+            )
+            if self.order_type == "mkl":
+                where.append(f"o.product IN ({subtree})")
+            else:
+                where.append(f"EXISTS (SELECT 1 FROM meridian_items i WHERE i.order_id = o.id AND i.product IN ({subtree}))")
+            params.append(int(self.group_id))
+        if self.client:
+            like = f"%{self.client}%"
+            if self.order_type == "mkl":
+                where.append("(o.fio LIKE ? OR o.phone LIKE ?)")
+                params += [like, like]
+            else:
+                where.append("o.title LIKE ?")
+                params.append(like)
+        return " AND ".join(where), params
+
+
+def builtin_rules(settings: dict) -> dict[str, NotifyRule]:
+    """Два исходных напоминания из прежних настроек: Меридиан «Не заказан» и просроченные МКЛ."""
+    return {
+        "meridian": NotifyRule({
+            "id": "meridian", "name": "Заказы Меридиан «Не заказан»", "order_type": "meridian",
+            "status": "Не заказан", "min_age_days": 0,
+        }),
+        "mkl": NotifyRule({
+            "id": "mkl", "name": "Просроченные заказы МКЛ", "order_type": "mkl",
+            "status": "Не заказан", "min_age_days": int(settings.get("mkl_notify_after_days", 3)),
+        }),
+    }
+
+
+def custom_rules(settings: dict) -> list[NotifyRule]:
+    """Пользовательские правила из настройки notify_rules."""
+    rules = []
+    for data in settings.get("notify_rules") or []:
+        try:
+            rules.append(NotifyRule(data))
+        except Exception:
+            continue
+    return rules
+
+
+class RuleEngine:
+    """
+    Вычисление правил уведомлений SQL-запросом по индексу (status, дата заказа).
+
+    Результат правила кэшируется и пересчитывается, только если изменились
+    нужные таблицы (версии из TEMP-триггеров AppDB и PRAGMA data_version для
+    записей других процессов) или наступил момент, когда следующий заказ
+    перешагнёт порог возраста.
+    """
+
+    def __init__(self, db: AppDB):
+        self.db = db
+        self.conn = db.conn
+        self._cache: dict[str, tuple[tuple, datetime | None, list[dict]]] = {}
+        self._ensure_indexes()
+
+    def _ensure_indexes(self):
+        for table in _TABLES.values():
+            self.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table}_status_date ON {table}(status, {_date_key('date')});"
+            )
+        self.conn.commit()
+
+    def _version(self, rule: NotifyRule) -> tuple:
+        external = self.conn.execute("PRAGMA data_version;").fetchone()[0]
+        return (repr(rule.to_dict()), external) + tuple(self.db.catalog_version(k) for k in rule.watched())
+
+    def matches(self, rule: NotifyRule, now: datetime | None = None) -> list[dict]:
+        """Заказы, подходящие под правило на момент now (строки таблицы заказов)."""
+        now = now or datetime.now()
+        version = self._version(rule)
+        cached = self._cache.get(rule.id)
+        if cached and cached[0] == version and (cached[1] is None or now < cached[1]):
+            return cached[2]
+        table = _TABLES[rule.order_type]
+        where, params = rule.compile()
+        key = _date_key("o.date")
+        age_where, age_params = "", []
+        threshold = None
+        if rule.min_age_days:
+            threshold = (now - timedelta(days=rule.min_age_days)).strftime("%Y-%m-%d %H:%M")
+            age_where, age_params = f" AND {key} <= ? AND {key} GLOB '[0-9][0-9][0-9][0-9]-*'", [threshold]
+        rows = self.conn.execute(
+            f"SELECT o.* FROM {table} o WHERE {where}{age_where} ORDER BY {key} DESC, o.id DESC;",
+            params + age_params,
+        ).fetchall()
+        result = [dict(r) for r in rows]
+        valid_until = None
+        if threshold is not None:
+            # Ближайший заказ, который ещё «молод»: когда он перешагнёт порог, набор изменится
+            row = self.conn.execute(
+                f"SELECT MIN({key}) AS k FROM {table} o WHERE {where} AND {key} > ?;",
+                params + [threshold],
+            ).fetchone()
+            nxt = _parse_key(row["k"]) if row and row["k"] else None
+            if nxt is not None:
+                valid_until = nxt + timedelta(days=rule.min_age_days)
+        self._cache[rule.id] = (version, valid_until, result)
+        return result
+
+    def next_change(self, rule: NotifyRule) -> datetime | None:
+        """Когда результат правила изменится сам по себе (без записи в БД); None — не изменится."""
+        cached = self._cache.get(rule.id)
+        return cached[1] if cached else None
+
+    def invalidate(self, rule_id: str | None = None):
+        if rule_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(rule_id, None)
+
+
+def rule_engine(root) -> RuleEngine:
+    """Общий RuleEngine окна (создаётся при первом обращении)."""
+    engine = getattr(root, "rule_engine", None)
+    if engine is None or engine.db is not root.db:
+        engine = RuleEngine(root.db)
+        root.rule_engine = engine
+    return engine
@@ -0,0 +1,243 @@
+import heapq
+from datetime import datetime, timedelta
+
+from app.db import AppDB
+
+
+_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_hhmm(s: str, default: tuple[int, int] = (9, 0)) -> tuple[int, int]:
+    """«9:30» -> (9, 30); при ошибке — default."""
+    try:
+        parts = (s or "").strip().split(":")
+        hh = int(parts[0])
+        mm = int(parts[1]) if len(parts) > 1 else 0
+        return max(0, min(23, hh)), max(0, min(59, mm))
+    except Exception:
+        return default
+
+
+def next_daily(after: datetime, hh: int, mm: int, weekdays=None) -> datetime | None:
+    """Ближайший момент hh:mm строго позже after; weekdays — допустимые дни (Пн=0), None — любые."""
+    days = set(range(7)) if weekdays is None else {int(d) for d in weekdays}
+    if not days:
+        return None
+    moment = after.replace(hour=hh, minute=mm, second=0, microsecond=0)
+    if moment <= after:
+        moment += timedelta(days=1)
+    while moment.weekday() not in days:
+        moment += timedelta(days=1)
+    return moment
+
+
+class Job:
+    """
+    Задача планировщика. next_after(moment) — следующий запуск позже moment
+    (None — задача выключена), run(now) — сама работа.
+
+    catch_up=True: запуск, пропущенный пока приложение было закрыто или ПК
+    спал, выполняется сразу после старта (один раз, а не за каждый пропуск).
+    persist=False: время запуска не хранится в БД (служебные частые задачи).
+    """
+
+    name = ""
+    catch_up = True
+    persist = True
+    scheduler: "Scheduler | None" = None  # выставляется в Scheduler.add()
+
+    def next_after(self, moment: datetime) -> datetime | None:
+        raise NotImplementedError
+
+    def run(self, now: datetime):
+        raise NotImplementedError
+
+
+class IntervalJob(Job):
+    """Задача с постоянным интервалом: func() каждые interval."""
+
+    def __init__(self, name: str, interval: timedelta, func, catch_up: bool = True, persist: bool = True):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.catch_up = catch_up
+        self.persist = persist
+
+    def next_after(self, moment: datetime) -> datetime | None:
+        return moment + self.interval
+
+    def run(self, now: datetime):
+        self.func()
+
+
+class Scheduler:
+    """
+    Планировщик задач на таймере Tk.
+
+    Время следующего и последнего запуска каждой задачи хранится в таблице
+    jobs, поэтому отложенные напоминания и пропущенные запуски переживают
+    перезапуск. Вместо опроса раз в минуту таймер взводится до ближайшего
+    срока из кучи (но не дольше MAX_SLEEP_MS — чтобы заметить сон ПК или
+    перевод часов, после которых after() опаздывает).
+    """
+
+    MAX_SLEEP_MS = 5 * 60_000
+    GRACE = timedelta(minutes=2)  # опоздание, которое не считается пропуском
+
+    def __init__(self, root, db: AppDB):
+        self.root = root
+        self.db = db
+        self.conn = db.conn
+        self.jobs: dict[str, Job] = {}
+        self._next: dict[str, datetime | None] = {}
+        self._heap: list[tuple[datetime, str]] = []
+        self._after_id = None
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                name TEXT PRIMARY KEY,
+                next_run_at TEXT,
+                last_run_at TEXT,
+                snoozed INTEGER NOT NULL DEFAULT 0
+            );
+            """
+        )
+        self.conn.commit()
+
+    # --- Registration ---
+    def add(self, job: Job):
+        """Зарегистрировать задачу; срок берётся из БД, для новой — job.next_after(сейчас)."""
+        self.jobs[job.name] = job
+        job.scheduler = self
+        now = datetime.now()
+        row = None
+        if job.persist:
+            row = self.conn.execute("SELECT next_run_at FROM jobs WHERE name=?;", (job.name,)).fetchone()
+        due = self._parse(row["next_run_at"]) if row is not None else None
+        if due is None:
+            due = job.next_after(now)
+            self._save(job, due)
+        self._set(job.name, due)
+
+    def remove(self, name: str):
+        """Снять задачу (например, удалённое правило уведомления) вместе с её записью в БД."""
+        self.jobs.pop(name, None)
+        self._next.pop(name, None)
+        self.conn.execute("DELETE FROM jobs WHERE name=?;", (name,))
+        self.conn.commit()
+
+    def start(self, delay_ms: int = 3_000):
+        """Первая проверка через delay_ms: пропущенные запуски догоняются в ней."""
+        self._arm(delay_ms)
+
+    def reschedule(self, name: str | None = None):
+        """Пересчитать сроки после смены настроек (отложенные пользователем задачи не трогаются)."""
+        now = datetime.now()
+        snoozed = {r["name"] for r in self.conn.execute("SELECT name FROM jobs WHERE snoozed=1;").fetchall()}
+        for job in ([self.jobs[name]] if name else list(self.jobs.values())):
+            if job.name in snoozed and (self._next.get(job.name) or now) > now:
+                continue
+            due = job.next_after(now)
+            self._save(job, due)
+            self._set(job.name, due)
+        self._arm()
+
+    def snooze(self, name: str, until: datetime):
+        """Отложить задачу до until (сохраняется в БД)."""
+        job = self.jobs.get(name)
+        if job is None:
+            return
+        self._save(job, until, snoozed=True)
+        self._set(name, until)
+        self._arm()
+
+    def next_run(self, name: str) -> datetime | None:
+        return self._next.get(name)
+
+    # --- Timer ---
+    def _arm(self, delay_ms: int | None = None):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        if delay_ms is None:
+            due = self._peek()
+            if due is None:
+                return
+            delay_ms = int((due - datetime.now()).total_seconds() * 1000)
+        delay_ms = max(0, min(self.MAX_SLEEP_MS, delay_ms))
+        try:
+            self._after_id = self.root.after(delay_ms, self._tick)
+        except Exception:
+            self._after_id = None
+
+    def _peek(self) -> datetime | None:
+        # Ленивое удаление: запись в куче актуальна, только если совпадает с _next
+        while self._heap:
+            due, name = self._heap[0]
+            if self._next.get(name) == due:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    def _tick(self):
+        self._after_id = None
+        now = datetime.now()
+        while True:
+            due = self._peek()
+            if due is None or due > now:
+                break
+            _, name = heapq.heappop(self._heap)
+            job = self.jobs[name]
+            if job.catch_up or now - due <= self.GRACE:
+                try:
+                    job.run(now)
+                except Exception:
+                    pass
+            # run() мог сам отложить задачу (snooze) — тогда её срок уже в будущем
+            current = self._next.get(name)
+            if current is not None and current != due and current > now:
+                self._save_last(job, now)
+                continue
+            nxt = job.next_after(now)
+            self._save(job, nxt, last=now)
+            self._set(name, nxt)
+        self._arm()
+
+    # --- Storage ---
+    def _set(self, name: str, due: datetime | None):
+        self._next[name] = due
+        if due is not None:
+            heapq.heappush(self._heap, (due, name))
+
+    def _save(self, job: Job, due: datetime | None, last: datetime | None = None, snoozed: bool = False):
+        if not job.persist:
+            return
+        self.conn.execute(
+            "INSERT INTO jobs (name, next_run_at, last_run_at, snoozed) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET next_run_at = excluded.next_run_at, "
+            "last_run_at = COALESCE(excluded.last_run_at, jobs.last_run_at), snoozed = excluded.snoozed;",
+            (job.name, self._fmt(due), self._fmt(last), 1 if snoozed else 0),
+        )
+        self.conn.commit()
+
+    def _save_last(self, job: Job, last: datetime):
+        if job.persist:
+            self.conn.execute("UPDATE jobs SET last_run_at=? WHERE name=?;", (self._fmt(last), job.name))
+            self.conn.commit()
+
+    @staticmethod
+    def _fmt(dt: datetime | None) -> str | None:
+        return dt.strftime(_FMT) if dt else None
+
+    @staticmethod
+    def _parse(s: str | None) -> datetime | None:
+        try:
+            return datetime.strptime(s, _FMT) if s else None
+        except Exception:
+            return None
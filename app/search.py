@@ -0,0 +1,571 @@
+import gc
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+from app.db import AppDB
+from app.catalog import CATALOG_KINDS, catalog_index
+
+
+# --- Нормализация ---
+_RU_TO_LAT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "h", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "sch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya",
+}
+# Раскладки ЙЦУКЕН <-> QWERTY (по клавишам)
+_EN_KEYS = "qwertyuiop[]asdfghjkl;'zxcvbnm,.`"
+_RU_KEYS = "йцукенгшщзхъфывапролджэячсмитьбюё"
+_EN_TO_RU = str.maketrans(_EN_KEYS, _RU_KEYS)
+_RU_TO_EN = str.maketrans(_RU_KEYS, _EN_KEYS)
+# Упрощение латиницы, чтобы «блю блокер» и «blue blocker» давали один скелет
+_SKELETON = (
+    ("ck", "k"), ("ph", "f"), ("yu", "u"), ("ue", "u"), ("ee", "i"), ("kh", "h"),
+    ("c", "k"), ("q", "k"), ("w", "v"), ("x", "ks"), ("y", "i"),
+)
+_TOKEN_RE = re.compile(r"[0-9a-zа-яё]+(?:[.,][0-9]+)*")
+_COMPOUND_RE = re.compile(r"[0-9a-zа-яё]+(?:-[0-9a-zа-яё]+)+")
+
+
+def _skeleton(token: str) -> str:
+    token = token.replace(",", ".")
+    token = "".join(_RU_TO_LAT.get(ch, ch) for ch in token)
+    for src, dst in _SKELETON:
+        token = token.replace(src, dst)
+    # Удвоенные буквы: «bloccker», «коллекция» -> одна буква
+    return re.sub(r"([a-z])\1+", r"\1", token)
+
+
+def normalize_tokens(text: str, cache: dict[str, str] | None = None) -> list[str]:
+    """
+    Токены названия в общей латинской «скелетной» форме (транслитерация + упрощение).
+    cache — словарь «слово -> скелет» для пакетной обработки (слова в названиях повторяются).
+    """
+    tokens = []
+    for tok in _TOKEN_RE.findall((text or "").lower()):
+        if cache is None:
+            sk = _skeleton(tok)
+        else:
+            sk = cache.get(tok)
+            if sk is None:
+                sk = cache[tok] = _skeleton(tok)
+        if sk:
+            tokens.append(sk)
+    return tokens
+
+
+def compound_tokens(text: str, cache: dict[str, str] | None = None) -> list[str]:
+    """Слитные формы слов через дефис: «MR-8» -> «mr8», «X-Pro» -> «xpro» (в запросе их пишут и так, и так)."""
+    joined = " ".join(m.replace("-", "") for m in _COMPOUND_RE.findall((text or "").lower()))
+    return normalize_tokens(joined, cache) if joined else []
+
+
+def query_terms(text: str) -> list[list[str]]:
+    """
+    Слова запроса с альтернативами: [[как введено, в другой раскладке], ...].
+    Раскладка подменяется только для слов с буквами, которые в обоих вариантах дают
+    одно слово («,kjrth» -> «блокер»), чтобы «mr-8» не превращалось в однобуквенный мусор.
+    """
+    terms: list[list[str]] = []
+    for word in (text or "").lower().split():
+        tokens = normalize_tokens(word)
+        if len(tokens) != 1 or not any(ch.isalpha() for ch in word):
+            terms.extend([t] for t in tokens if [t] not in terms)
+            continue
+        forms = list(tokens)
+        letters = sum(ch.isalpha() for ch in word)
+        for table in (_EN_TO_RU, _RU_TO_EN):
+            remapped = word.translate(table)
+            other = normalize_tokens(remapped)
+            # «,kj.» -> «блю» добавляет буквы, а «блю» -> «,k.» теряет их — такой вариант не нужен
+            if len(other) == 1 and other[0] not in forms and sum(ch.isalpha() for ch in remapped) >= letters:
+                forms.append(other[0])
+        if forms and forms not in terms:
+            terms.append(forms)
+    return terms
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Расстояние Дамерау–Левенштейна (с перестановкой соседних букв); > limit — досрочный выход."""
+    prev2: list[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            d = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d = min(d, prev2[j - 2] + 1)
+            cur[j] = d
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def _trigrams(token: str) -> set[str]:
+    padded = f"${token}$"
+    if len(padded) <= 3:
+        return {padded}
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ProductSearchIndex:
+    """
+    Нечёткий поиск по названиям товаров одного каталога.
+
+    Названия разбиваются на слова в латинской скелетной форме; словарь слов
+    (он намного меньше числа товаров) индексируется триграммами. Слово запроса
+    сопоставляется со словами словаря по сходству триграмм (Dice) или префиксу,
+    затем товары набираются через списки «слово -> товары». Слова через дефис
+    индексируются и по частям, и слитно: «mr8» и «mr 8» находят «MR-8». Порядок
+    слов в запросе не важен; запрос дополнительно проверяется в другой раскладке
+    клавиатуры. Ранжирование — BM25: idf слова × сходство, нормировка на длину
+    названия.
+
+    Совпадения слов запроса кэшируются: при наборе пересчитывается только
+    последнее слово, а оценки считаются лишь для товаров, которые ещё могут
+    набрать нужное покрытие.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    MIN_SIMILARITY = 0.4  # минимальное сходство слова запроса со словом названия
+    MIN_COVERAGE = 0.6  # средняя доля совпадения слов запроса, которую должен набрать товар
+    MAX_TERMS = 16  # сколько похожих слов словаря учитывать на одно слово запроса
+    MAX_TYPOS = 2  # опечатки, которые прощаются словам от 4 букв (по одной на каждые 4 буквы)
+    CACHE_SIZE = 32  # слов запроса с готовыми совпадениями
+
+    def __init__(self, names: list[str]):
+        self.size = len(names)
+        token_docs: dict[str, list[int]] = {}
+        lengths = []
+        skeletons: dict[str, str] = {}
+        for doc, name in enumerate(names):
+            tokens = set(normalize_tokens(name, skeletons))
+            # Длина для BM25 — по словам названия, слитные формы её не меняют
+            lengths.append(max(1, len(tokens)))
+            tokens.update(compound_tokens(name, skeletons))
+            for tok in tokens:
+                token_docs.setdefault(tok, []).append(doc)
+        self.vocabulary = sorted(token_docs)
+        self.token_docs = [token_docs[t] for t in self.vocabulary]
+        self.token_grams = [len(_trigrams(t)) for t in self.vocabulary]
+        self.idf = [
+            math.log(1.0 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            for docs in self.token_docs
+        ]
+        postings: dict[str, list[int]] = {}
+        for vid, tok in enumerate(self.vocabulary):
+            for g in _trigrams(tok):
+                postings.setdefault(g, []).append(vid)
+        self.postings = postings
+        avg = (sum(lengths) / len(lengths)) if lengths else 1.0
+        k1, b = self.K1, self.B
+        self.norm = [(k1 + 1.0) / (1.0 + k1 * (1.0 - b + b * n / avg)) for n in lengths]
+        self._terms: OrderedDict[tuple[str, ...], tuple[dict[int, float], dict[int, float]]] = OrderedDict()
+
+    def similar_terms(self, token: str) -> list[tuple[int, float]]:
+        """Слова словаря, похожие на token: [(номер слова, сходство 0..1)]."""
+        grams = _trigrams(token)
+        shared: dict[int, int] = {}
+        for g in grams:
+            for vid in self.postings.get(g, ()):
+                shared[vid] = shared.get(vid, 0) + 1
+        sims: dict[int, float] = {}
+        vocab = self.vocabulary
+        # Цифры опечаток не прощают: 1.61 и 1.81 — разные товары
+        typos = 0 if any(ch.isdigit() for ch in token) else min(self.MAX_TYPOS, len(token) // 4)
+        for vid, n in shared.items():
+            sim = 2.0 * n / (len(grams) + self.token_grams[vid])
+            if sim < 0.8 and typos:
+                # Короткие слова с опечаткой («adira», «blokr») делят мало триграмм — проверяем правкой
+                word = vocab[vid]
+                if abs(len(word) - len(token)) <= typos:
+                    d = _edit_distance(token, word, typos)
+                    if d <= typos:
+                        sim = max(sim, 1.0 - d / max(len(word), len(token)))
+            if sim >= self.MIN_SIMILARITY:
+                sims[vid] = sim
+        # Начало слова (печать ещё не закончена) — полное совпадение
+        i = bisect_left(vocab, token)
+        while i < len(vocab) and vocab[i].startswith(token):
+            sims[i] = 1.0
+            i += 1
+            if len(sims) > 4 * self.MAX_TERMS:
+                break
+        ranked = sorted(sims.items(), key=lambda kv: -(kv[1] * self.idf[kv[0]]))
+        return ranked[:self.MAX_TERMS]
+
+    def _term_matches(self, forms: list[str]) -> list[tuple[float, float, int]]:
+        """[(вес, сходство, номер слова)] по убыванию веса для всех форм одного слова запроса."""
+        best: dict[int, float] = {}
+        for form in forms:
+            for vid, sim in self.similar_terms(form):
+                if sim > best.get(vid, 0.0):
+                    best[vid] = sim
+        # Квадрат сходства: точное частое слово важнее похожего редкого
+        return sorted(((sim * sim * self.idf[vid], sim, vid) for vid, sim in best.items()), reverse=True)
+
+    def _term_docs(self, forms: list[str]) -> tuple[dict[int, float], dict[int, float]]:
+        """({товар: вес}, {товар: сходство}) для одного слова запроса; кэшируется между нажатиями."""
+        key = tuple(forms)
+        cached = self._terms.get(key)
+        if cached is not None:
+            self._terms.move_to_end(key)
+            return cached
+        # Слова по убыванию веса: первое попадание товара — лучшее, остальные
+        # его не перезаписывают (dict.update выполняется на стороне C)
+        weights: dict[int, float] = {}
+        sims: dict[int, float] = {}
+        for w, sim, vid in self._term_matches(forms):
+            docs = self.token_docs[vid]
+            fresh = dict.fromkeys(docs, w)
+            fresh.update(weights)
+            weights = fresh
+            fresh = dict.fromkeys(docs, sim)
+            fresh.update(sims)
+            sims = fresh
+        self._terms[key] = (weights, sims)
+        if len(self._terms) > self.CACHE_SIZE:
+            self._terms.popitem(last=False)
+        return weights, sims
+
+    def _score_terms(self, terms: list[list[str]]) -> dict[int, float]:
+        per_term = [self._term_docs(forms) for forms in terms]
+        if not per_term:
+            return {}
+        need = self.MIN_COVERAGE * len(per_term)
+        # Сходство не больше 1: товар должен встретиться хотя бы в ceil(need) словах,
+        # значит — хотя бы в одном из (n - ceil(need) + 1) самых редких
+        spare = len(per_term) - math.ceil(need - 1e-9)
+        rare = sorted((w.keys() for w, _ in per_term), key=len)[:spare + 1]
+        result = {}
+        norm = self.norm
+        for doc in set().union(*rare):
+            coverage = 0.0
+            score = 0.0
+            for weights, sims in per_term:
+                coverage += sims.get(doc, 0.0)
+                score += weights.get(doc, 0.0)
+            if coverage >= need:
+                result[doc] = score * norm[doc]
+        return result
+
+    def search(self, text: str, limit: int | None = 50) -> list[tuple[int, float]]:
+        """[(номер товара, score)] по убыванию score."""
+        scores = self._score_terms(query_terms(text))
+        if limit:
+            return heapq.nlargest(limit, scores.items(), key=lambda kv: (kv[1], -kv[0]))
+        return sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+
+
+def product_search_index(db: AppDB, kind: str) -> ProductSearchIndex:
+    """Поисковый индекс каталога; живёт вместе с CatalogIndex и перестраивается вместе с ним."""
+    catalog = catalog_index(db, kind)
+    index = catalog.__dict__.get("_search")
+    if index is None:
+        index = ProductSearchIndex([p.get("name", "") or "" for p in catalog.products])
+        catalog._search = index
+    return index
+
+
+def search_products(db: AppDB, text: str, kinds=CATALOG_KINDS, limit: int = 50) -> list[dict]:
+    """Лучшие совпадения по каталогам: [{"kind", "product", "score"}] по убыванию score."""
+    hits = []
+    for kind in kinds:
+        products = catalog_index(db, kind).products
+        for pos, score in product_search_index(db, kind).search(text, limit):
+            hits.append({"kind": kind, "product": products[pos], "score": score})
+    hits.sort(key=lambda h: -h["score"])
+    return hits[:limit] if limit else hits
+
+
+def rank_products(db: AppDB, kind: str, text: str, limit: int = 200) -> list[int]:
+    """
+    Номера товаров каталога для окна выбора по релевантности: сначала нечёткие
+    совпадения, содержащие текст как подстроку, затем остальные нечёткие, затем
+    прочие точные совпадения подстроки, не попавшие в первые limit.
+    """
+    catalog = catalog_index(db, kind)
+    exact = catalog.match(text)
+    if len((text or "").strip()) < 2:
+        return exact
+    found = set(exact)
+    ranked = [pos for pos, _ in product_search_index(db, kind).search(text, limit)]
+    ranked.sort(key=lambda pos: pos not in found)  # sort устойчив: порядок score сохраняется
+    seen = set(ranked)
+    return ranked + [pos for pos in exact if pos not in seen]
+
+
+# --- Клиенты ---
+_WORD_RE = re.compile(r"[a-zа-я]+")
+# Фонетический ключ фамилии: гласные по звучанию, звонкие -> глухие
+_PHONETIC = str.maketrans("оыяеэийюбвгджз", "аааииииупфктшс")
+_FEMALE_ENDINGS = (("ская", "ский"), ("цкая", "цкий"), ("ова", "ов"), ("ева", "ев"), ("ина", "ин"), ("ына", "ын"))
+
+
+def fold_text(text: str) -> str:
+    """Нижний регистр, ё -> е."""
+    return (text or "").lower().replace("ё", "е")
+
+
+def surname_key(word: str) -> str:
+    """
+    Фонетический ключ русской фамилии (упрощённый «русский метафон»): женские
+    окончания приводятся к мужским, гласные и звонкие согласные — к опорным
+    звукам, повторы схлопываются. «Иванова», «Ивонов», «Иваннов» -> «ифанаф».
+    """
+    word = fold_text(word).replace("ь", "").replace("ъ", "")
+    for src, dst in _FEMALE_ENDINGS:
+        if word.endswith(src) and len(word) > len(src) + 1:
+            word = word[: -len(src)] + dst
+            break
+    word = word.replace("тс", "ц").replace("дс", "ц").translate(_PHONETIC)
+    return re.sub(r"(.)\1+", r"\1", word)
+
+
+class ClientSearchIndex:
+    """
+    Поиск клиентов по ФИО и телефону.
+
+    Слова ФИО (ё = е) лежат в отсортированных словарях по позиции слова
+    (фамилия, имя, отчество): префикс слова ищется двоичным поиском. Для
+    слов от трёх букв есть фонетические ключи — опечатки в фамилиях
+    («Ивонов»). Каждое слово запроса должно совпасть со своим, отдельным
+    словом ФИО; короткое (1–2 буквы) слово после первого — инициал, оно
+    ищется только в имени и отчестве: «Иванов И» — это «Иванов Игорь», а не
+    любой Иванов. Цифры запроса сверяются с концом номера и с его началом
+    (с кодом страны и без) по отсортированным спискам.
+
+    Совпадения собираются множествами (операции над ними выполняются на стороне C).
+    Небольшой результат ранжируется по сумме оценок слов: точное слово > начало
+    слова > фонетика, плюс надбавка, если слово запроса стоит на том же месте,
+    что и в ФИО («Иванов П» — сначала Пётр, потом отчество на П); большой —
+    по уровням «все слова точно и по порядку», «все слова точно», «все слова
+    буквально», «остальные», внутри уровня — в исходном порядке.
+    """
+
+    EXACT, PREFIX, PHONETIC, PHONETIC_PREFIX = 4.0, 3.0, 2.0, 1.5
+    IN_ORDER = 0.5
+    PHONE_SUFFIX, PHONE_PREFIX = 3.0, 2.5
+    MIN_PHONETIC = 3  # фонетика включается со стольких букв слова запроса
+    MAX_INITIAL = 2  # слово запроса не длиннее — инициал (кроме первого слова)
+    MIN_DIGITS = 2
+    RANK_LIMIT = 1000  # до стольких результатов — точное ранжирование по оценкам
+    CACHE_MIN = 2000  # объединения префиксов от такого размера кэшируются
+    CACHE_SIZE = 64
+
+    def __init__(self, clients: list[dict]):
+        self.clients = clients
+        slot_words: list[dict[str, list[int]]] = []  # позиция слова в ФИО -> слово -> клиенты
+        phones = []
+        for pos, c in enumerate(clients):
+            for slot, word in enumerate(_WORD_RE.findall(fold_text(c.get("fio", "")))):
+                if slot == len(slot_words):
+                    slot_words.append({})
+                slot_words[slot].setdefault(word, []).append(pos)
+            digits = re.sub(r"\D", "", c.get("phone", "") or "")
+            if digits:
+                phones.append((digits, pos))
+        phonetic: dict[str, str] = {}
+        self.slots = []  # [(слова, их клиенты, фонетические ключи, их клиенты)] по позиции слова
+        for words in slot_words:
+            sorted_words = sorted(words)
+            keys: dict[str, list[int]] = {}
+            for word in sorted_words:
+                if len(word) >= self.MIN_PHONETIC:
+                    key = phonetic.get(word)
+                    if key is None:
+                        key = phonetic[word] = surname_key(word)
+                    keys.setdefault(key, []).extend(words[word])
+            sorted_keys = sorted(keys)
+            # Множества, а не списки: точное слово отдаётся без копирования
+            self.slots.append((
+                sorted_words, [set(words[w]) for w in sorted_words], sorted_keys, [set(keys[k]) for k in sorted_keys],
+            ))
+        self._suffixes = sorted((d[::-1], pos) for d, pos in phones)
+        # Начало номера: как записан и без кода страны (последние 10 цифр)
+        self._prefixes = sorted({*phones, *((d[-10:], pos) for d, pos in phones)})
+        self._unions: OrderedDict[tuple[int, str], set[int]] = OrderedDict()
+        # Однобуквенные префиксы (первая буква фамилии, инициалы) считаются заранее:
+        # иначе первый же запрос «Иванов И» объединял бы тысячи списков
+        self._pinned: dict[tuple[int, str], set[int]] = {}
+        for sorted_words, lists, _, _ in self.slots:
+            for letter in {w[0] for w in sorted_words}:
+                rng = self._prefix_range(sorted_words, letter)
+                if len(rng) > 1:
+                    every = set().union(*(lists[i] for i in rng))
+                    if len(every) >= self.CACHE_MIN:
+                        self._pinned[(id(sorted_words), letter)] = every
+
+    @staticmethod
+    def _prefix_range(sorted_words: list[str], prefix: str) -> range:
+        lo = bisect_left(sorted_words, prefix)
+        hi = bisect_left(sorted_words, prefix + "\uffff", lo)
+        return range(lo, hi)
+
+    @staticmethod
+    def _phone_range(pairs: list[tuple[str, int]], prefix: str) -> set[int]:
+        lo = bisect_left(pairs, (prefix,))
+        hi = bisect_left(pairs, (prefix + "\uffff",), lo)
+        return {pos for _, pos in pairs[lo:hi]}
+
+    def _prefix_clients(self, sorted_words: list[str], lists: list[set[int]], prefix: str) -> tuple[set[int], set[int]]:
+        """(клиенты с точным словом, клиенты со словом на prefix); множества общие — только для чтения."""
+        rng = self._prefix_range(sorted_words, prefix)
+        exact = lists[rng.start] if rng and sorted_words[rng.start] == prefix else set()
+        if len(rng) <= 1:
+            return exact, lists[rng.start] if rng else set()
+        key = (id(sorted_words), prefix)
+        every = self._pinned.get(key)
+        if every is not None:
+            return exact, every
+        every = self._unions.get(key)
+        if every is None:
+            every = set().union(*(lists[i] for i in rng))
+            # Короткие префиксы («и», «пе») объединяют тысячи списков — держим их под рукой
+            if len(every) >= self.CACHE_MIN:
+                self._unions[key] = every
+                if len(self._unions) > self.CACHE_SIZE:
+                    self._unions.popitem(last=False)
+        else:
+            self._unions.move_to_end(key)
+        return exact, every
+
+    def _match_word(self, word: str, first_slot: int = 0):
+        """
+        Совпадения одного слова запроса со словами ФИО с позиции first_slot:
+        ([(оценка, [клиенты по позициям])] от лучшей к худшей, совпавшие
+        буквально (точно или началом слова), {позиция: совпавшие любым способом}).
+        Объединения по позициям не строятся — большинству запросов они не нужны.
+        """
+        key = surname_key(word) if len(word) >= self.MIN_PHONETIC else None
+        tiers = [[], [], [], []]
+        slots = {}
+        for slot in range(first_slot, len(self.slots)):
+            sorted_words, lists, keys, key_lists = self.slots[slot]
+            found = list(self._prefix_clients(sorted_words, lists, word))
+            if key is not None:
+                found += self._prefix_clients(keys, key_lists, key)
+            for tier, members in zip(tiers, found):
+                if members:
+                    tier.append(members)
+            every = found[1] | found[3] if key is not None and found[3] else found[1]
+            if every:
+                slots[slot] = every
+        values = (self.EXACT, self.PREFIX, self.PHONETIC, self.PHONETIC_PREFIX)
+        return list(zip(values, tiers)), tiers[1], slots
+
+    def _match_digits(self, digits: str):
+        # Полный номер с кодом страны (8…, +7…) — последние 10 цифр, как в find_client_by_phone
+        if len(digits) >= 11 and digits[0] in "78":
+            digits = digits[-10:]
+        suffix = self._phone_range(self._suffixes, digits[::-1])
+        prefix = self._phone_range(self._prefixes, digits)
+        every = suffix | prefix
+        return [(self.PHONE_SUFFIX, [suffix]), (self.PHONE_PREFIX, [prefix])], [every], {None: every}
+
+    @classmethod
+    def _distinct(cls, terms, used: frozenset = frozenset(), within: set[int] | None = None) -> set[int]:
+        """Клиенты, у которых каждому слову запроса нашлось своё слово ФИО (телефону — номер)."""
+        if not terms:
+            return within if within is not None else set()
+        found = set()
+        for slot, members in terms[0][2].items():
+            if slot in used:
+                continue
+            part = members if within is None else within & members
+            if part:
+                found |= cls._distinct(terms[1:], used | {slot}, part)
+        return found
+
+    def search(self, text: str, limit: int | None = None) -> list[int]:
+        """Номера клиентов по убыванию релевантности; пустой запрос — все в исходном порядке."""
+        text = fold_text(text)
+        terms = [
+            self._match_word(w, 1 if i and len(w) <= self.MAX_INITIAL else 0)
+            for i, w in enumerate(_WORD_RE.findall(text))
+        ]
+        # Надбавка за порядок: i-е слово запроса совпало с i-м словом ФИО
+        ordered = [t[2].get(i, set()) for i, t in enumerate(terms)]
+        digits = re.sub(r"\D", "", text)
+        if len(digits) >= self.MIN_DIGITS:
+            terms.append(self._match_digits(digits))
+            ordered.append(terms[-1][2][None])
+        if not terms:
+            return list(range(len(self.clients)))[:limit] if limit else list(range(len(self.clients)))
+
+        # Сначала самые редкие слова: пересечения сразу становятся маленькими
+        terms_by_size = sorted(terms, key=lambda t: sum(map(len, t[2].values())))
+        found = self._distinct(terms_by_size)
+        if len(found) <= self.RANK_LIMIT:
+            scores = {}
+            for pos in found:
+                score = 0.0
+                for (tiers, _, _), order in zip(terms, ordered):
+                    for value, parts in tiers:
+                        if any(pos in members for members in parts):
+                            score += value
+                            break
+                    if pos in order:
+                        score += self.IN_ORDER
+                scores[pos] = score
+            ranked = sorted(found, key=lambda pos: (-scores[pos], pos))
+        else:
+            # Уровни: у всех слов лучший способ совпадения (сначала — по порядку), все слова буквально, остальные
+            unions = {}  # лучший способ совпадения часто и есть буквальный — не объединяем дважды
+
+            def within(parts):
+                if id(parts) not in unions:
+                    unions[id(parts)] = set().union(*(found & members for members in parts))
+                return unions[id(parts)]
+
+            best = found.intersection(*(within(next((p for _, p in t[0] if p), [])) for t in terms))
+            first = best.intersection(*ordered)
+            literal = found.intersection(*(within(t[1]) for t in terms)) - best
+            ranked = []
+            for level in (first, best - first, literal, found - best - literal):
+                ranked += heapq.nsmallest(limit - len(ranked), level) if limit else sorted(level)
+                if limit and len(ranked) >= limit:
+                    break
+        return ranked[:limit] if limit else ranked
+
+
+class ClientIndexTask:
+    """
+    ClientSearchIndex, который строится в фоновом потоке сразу после загрузки
+    клиентов: на 100 тыс. клиентов это около секунды, и первая буква в поле
+    поиска не должна её ждать. clients — список или функция, которая его
+    читает (вызывается в том же фоновом потоке). index() дожидается окончания
+    построения.
+    """
+
+    def __init__(self, clients):
+        self.clients = clients
+        self._index: ClientSearchIndex | None = None
+        self._thread = threading.Thread(target=self._build, name="client-index", daemon=True)
+        self._thread.start()
+
+    def _build(self):
+        try:
+            if callable(self.clients):
+                self.clients = self.clients()
+            self._index = ClientSearchIndex(self.clients)
+        except Exception:
+            return  # index() повторит построение и покажет ошибку вызывающему
+        # Полная сборка мусора сейчас, а не посреди первого поиска по свежему индексу
+        gc.collect()
+
+    def index(self) -> ClientSearchIndex:
+        self._thread.join()
+        if self._index is None:
+            if callable(self.clients):
+                self.clients = self.clients()
+            self._index = ClientSearchIndex(self.clients)
+        return self._index
@@ -0,0 +1,182 @@
+import builtins
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+
+PROFILE_ENV = "USSUR_STARTUP_PROFILE"
+PROFILE_FLAGS = ("cpu", "cprofile", "imports")
+LOG_MAX_BYTES = 256 * 1024
+LOG_KEEP = 3  # startup.log.1 … startup.log.3
+PROFILE_KEEP = 5  # последних дампов cProfile
+
+
+def profile_flags(settings_path: str | None = None) -> frozenset[str]:
+    """
+    Режим профилирования запуска: переменная окружения USSUR_STARTUP_PROFILE или
+    настройка "startup_profile" — список флагов через запятую: cpu (время CPU по
+    фазам), cprofile (дамп cProfile), imports (время импорта модулей); "1" — cpu.
+    Пустое множество — только итоговая строка с фазами.
+    """
+    raw = os.environ.get(PROFILE_ENV)
+    if raw is None and settings_path:
+        try:
+            with open(settings_path, "r", encoding="utf-8") as f:
+                raw = json.load(f).get("startup_profile")
+        except Exception:
+            raw = None
+    raw = (raw or "").strip().lower()
+    if raw in ("", "0", "off"):
+        return frozenset()
+    if raw in ("1", "on"):
+        return frozenset({"cpu"})
+    flags = {f.strip() for f in raw.split(",")} & set(PROFILE_FLAGS)
+    return frozenset(flags | {"cpu"}) if flags else frozenset()
+
+
+# --- Import timing ---
+_import_times: dict[str, float] = {}
+_original_import = None
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    t = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        # Время включает вложенные импорты (как cumulative в -X importtime)
+        _import_times[name] = _import_times.get(name, 0.0) + (time.perf_counter() - t) * 1000.0
+
+
+def install_import_timer():
+    """Засекать время первых импортов модулей (до uninstall_import_timer)."""
+    global _original_import
+    if _original_import is None:
+        _original_import = builtins.__import__
+        builtins.__import__ = _timed_import
+
+
+def uninstall_import_timer() -> list[tuple[str, float]]:
+    """Снять перехват импорта; вернуть [(модуль, мс)] по убыванию времени."""
+    global _original_import
+    if _original_import is not None:
+        builtins.__import__ = _original_import
+        _original_import = None
+    report = sorted(_import_times.items(), key=lambda kv: -kv[1])
+    _import_times.clear()
+    return report
+
+
+def _rotate(path: str, max_bytes: int = LOG_MAX_BYTES, keep: int = LOG_KEEP):
+    try:
+        if os.path.getsize(path) < max_bytes:
+            return
+    except OSError:
+        return
+    for i in range(keep - 1, 0, -1):
+        src, dst = f"{path}.{i}", f"{path}.{i + 1}"
+        if os.path.exists(src):
+            os.replace(src, dst)
+    os.replace(path, f"{path}.1")
+
+
+class StartupTimer:
+    """
+    Замер фаз запуска: mark(name) закрывает фазу, начатую предыдущим mark
+    (или созданием таймера), и запоминает её длительность. write() дописывает
+    одну строку с итогом в журнал запусков.
+
+    С флагами profile_flags() дополнительно пишутся время CPU по фазам,
+    сводка cProfile (дамп .prof — в папку startup_profiles рядом с журналом)
+    и самые медленные импорты.
+    """
+
+    def __init__(self, mode: str, started: float | None = None, cpu_started: float | None = None,
+                 flags: frozenset[str] = frozenset()):
+        self.mode = mode
+        self.flags = flags
+        self.started = started if started is not None else time.perf_counter()
+        self.cpu_started = cpu_started if cpu_started is not None else time.process_time()
+        self._last = self.started
+        self._cpu_last = self.cpu_started
+        self.phases: list[tuple[str, float, float]] = []
+        self._profiler = None
+        if "cprofile" in flags:
+            try:
+                import cProfile
+                self._profiler = cProfile.Profile()
+                self._profiler.enable()
+            except Exception:
+                self._profiler = None
+
+    def mark(self, name: str) -> float:
+        now, cpu = time.perf_counter(), time.process_time()
+        ms = (now - self._last) * 1000.0
+        self.phases.append((name, ms, (cpu - self._cpu_last) * 1000.0))
+        self._last, self._cpu_last = now, cpu
+        return ms
+
+    def total_ms(self) -> float:
+        return (self._last - self.started) * 1000.0
+
+    def summary(self) -> str:
+        if "cpu" in self.flags:
+            cpu = (self._cpu_last - self.cpu_started) * 1000.0
+            parts = [f"{name} {ms:.0f}/{cpu_ms:.0f}" for name, ms, cpu_ms in self.phases]
+            return f"{self.mode}: {self.total_ms():.0f} ms (CPU {cpu:.0f}) | " + " | ".join(parts)
+        parts = [f"{name} {ms:.0f}" for name, ms, _ in self.phases]
+        return f"{self.mode}: {self.total_ms():.0f} ms | " + " | ".join(parts)
+
+    def _profile_lines(self, path: str, stamp: str) -> list[str]:
+        self._profiler.disable()
+        import io
+        import pstats
+
+        lines: list[str] = []
+        folder = os.path.join(os.path.dirname(path) or ".", "startup_profiles")
+        try:
+            os.makedirs(folder, exist_ok=True)
+            dump = os.path.join(folder, f"{self.mode}_{stamp.replace(':', '').replace(' ', '_')}.prof")
+            self._profiler.dump_stats(dump)
+            lines.append(f"  cProfile: {dump}")
+            dumps = sorted(f for f in os.listdir(folder) if f.endswith(".prof"))
+            for old in dumps[:max(0, len(dumps) - PROFILE_KEEP)]:
+                os.remove(os.path.join(folder, old))
+        except Exception:
+            pass
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(15)
+        lines.extend("  " + ln for ln in out.getvalue().splitlines() if ln.strip())
+        self._profiler = None
+        return lines
+
+    def write(self, path: str):
+        """Дописать строку «дата режим: итог | фаза мс | …» в журнал (ошибки записи не мешают запуску)."""
+        try:
+            stamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            lines = [f"{stamp} {self.summary()}"]
+            if self._profiler is not None:
+                lines.extend(self._profile_lines(path, stamp))
+            if "imports" in self.flags and _original_import is not None:
+                lines.append("  импорт (мс, с вложенными):")
+                lines.extend(f"    {ms:8.1f}  {name}" for name, ms in uninstall_import_timer()[:20])
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            _rotate(path)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except Exception:
+            pass
+
+
+def read_log(path: str, max_lines: int = 400) -> str:
+    """Последние строки журнала запусков (для экрана настроек)."""
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.readlines()
+    except OSError:
+        return ""
+    return "".join(lines[-max_lines:])
@@ -0,0 +1,171 @@
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+
+def storage_dir() -> str:
+    """Папка данных (settings.json, data.db, копии БД): рядом с exe или рядом с main.py."""
+    if getattr(sys, "frozen", False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+BACKUP_FOLDER = "Копия БД"
+BACKUP_KEEP = 7
+
+
+def _copy_db(db_path: str, target: str):
+    # Онлайн-копия SQLite: согласованный снимок, даже если GUI в этот момент пишет в базу
+    tmp = target + ".tmp"
+    src = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        dst = sqlite3.connect(tmp)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    os.replace(tmp, target)
+
+
+# --- DB backup (one copy per day, keep last 7) ---
+def backup_db_weekly(db_path: str, base_dir: str, force: bool = False) -> str | None:
+    """
+    Копия базы в «Копия БД/data.db_ГГГГ-ММ-ДД.db» (одна в день; force — перезаписать
+    сегодняшнюю) и ротация: остаются BACKUP_KEEP последних по дате. Возвращает путь
+    копии или None при ошибке. Используется GUI (планировщик) и python -m app.cli backup.
+    """
+    try:
+        if not os.path.isfile(db_path):
+            return None
+        backup_dir = os.path.join(base_dir, BACKUP_FOLDER)
+        os.makedirs(backup_dir, exist_ok=True)
+        today = datetime.now().strftime("%Y-%m-%d")
+        backup_path = os.path.join(backup_dir, f"data.db_{today}.db")
+        if force or not os.path.isfile(backup_path):
+            _copy_db(db_path, backup_path)
+        # Rotation: keep last BACKUP_KEEP files by date in name
+        files = []
+        for fn in os.listdir(backup_dir):
+            if fn.startswith("data.db_") and fn.endswith(".db"):
+                try:
+                    dt = datetime.strptime(fn[len("data.db_"):-len(".db")], "%Y-%m-%d")
+                except Exception:
+                    dt = None
+                files.append((dt, fn))
+        # Sort by date descending, undated names go last
+        files.sort(key=lambda x: (x[0] is not None, x[0] or datetime.min), reverse=True)
+        for dt, fn in files[BACKUP_KEEP:]:
+            try:
+                os.remove(os.path.join(backup_dir, fn))
+            except Exception:
+                pass
+        return backup_path
+    except Exception:
+        return None
+
+
+def ensure_settings(path: str):
+    if not os.path.exists(path):
+        # Defaults: UI scale, font size, export path and tray/autostart
+        desktop = os.path.join(os.path.expanduser("~"), "Desktop")
+        export_path = desktop if os.path.isdir(desktop) else os.getcwd()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": 1,
+                    "ui_scale": 1.25,
+                    "ui_font_size": 15,
+                    "export_path": export_path,
+                    "tray_enabled": True,
+                    "minimize_to_tray": True,
+                    "start_in_tray": True,
+                    "autostart_enabled": False,
+                    "tray_logo_path": "app/assets/logo.png",
+                    # Meridian notifications
+                    "notify_enabled": False,
+                    "notify_days": [],
+                    "notify_time": "09:00",
+                    # MKL notifications
+                    "mkl_notify_enabled": False,
+                    "mkl_notify_after_days": 3,
+                    "mkl_notify_time": "09:00",
+                    # MKL re-order reminders (lenses running out)
+                    "reorder_notify_enabled": False,
+                    "reorder_notify_time": "10:00",
+                    "reorder_notify_before_days": 7,
+                    # Sound
+                    "notify_sound_enabled": True,
+                    "notify_sound_alias": "SystemAsterisk",
+                    "notify_sound_mode": "alias",
+                    "notify_sound_file": "",
+                    # Single instance behavior
+                    "single_instance_enabled": True,
+                    "single_instance_port": 46465,
+                    # User-defined notification rules (app/rules.py NotifyRule.to_dict())
+                    "notify_rules": [],
+                    # Startup diagnostics: "", "cpu", "cpu,cprofile", "cpu,cprofile,imports"
+                    "startup_profile": "",
+                },
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+
+def load_settings(path: str) -> dict:
+    ensure_settings(path)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+            if not isinstance(data, dict):
+                return {}
+            # Fill missing keys with defaults
+            defaults = {
+                "ui_scale": 1.25,
+                "ui_font_size": 15,
+                "tray_enabled": True,
+                "minimize_to_tray": True,
+                "start_in_tray": True,
+                "autostart_enabled": False,
+                "tray_logo_path": "app/assets/logo.png",
+                # Meridian notifications
+                "notify_enabled": False,
+                "notify_days": [],
+                "notify_time": "09:00",
+                # MKL notifications
+                "mkl_notify_enabled": False,
+                "mkl_notify_after_days": 3,
+                "mkl_notify_time": "09:00",
+                # MKL re-order reminders (lenses running out)
+                "reorder_notify_enabled": False,
+                "reorder_notify_time": "10:00",
+                "reorder_notify_before_days": 7,
+                # Sound
+                "notify_sound_enabled": True,
+                "notify_sound_alias": "SystemAsterisk",
+                "notify_sound_mode": "alias",  # 'alias' or 'file'
+                "notify_sound_file": "",
+                # Single instance
+                "single_instance_enabled": True,
+                "single_instance_port": 46465,
+                "startup_profile": "",
+                "notify_rules": [],
+            }
+            for k, v in defaults.items():
+                data.setdefault(k, v)
+            return data
+    except Exception:
+        return {}
+
+
+def save_settings(path: str, data: dict):
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    except Exception:
+        pass
@@ -0,0 +1,294 @@
+from datetime import datetime
+
+from app.db import AppDB
+
+
+PENDING = "Не заказан"
+ORDERED = "Заказан"
+PARAMS = ("sph", "cyl", "ax", "add", "bc")
+
+
+def _col(name: str, alias: str = "") -> str:
+    col = '"add"' if name == "add" else name
+    return f"{alias}.{col}" if alias else col
+
+
+def num_sql(col: str) -> str:
+    """
+    Параметр как число: «-1,25», «-1.25» и «-1.250» совпадают, пустое — NULL.
+    Нечисловое значение остаётся текстом (CAST превратил бы «abc» в 0).
+    """
+    text = f"REPLACE(TRIM(COALESCE({col}, '')), ',', '.')"
+    digits = f"LTRIM({text}, '+-')"
+    return (
+        f"(CASE WHEN {text} = '' THEN NULL "
+        f"WHEN {digits} GLOB '*[0-9]*' AND {digits} NOT GLOB '*[^0-9.]*' AND {digits} NOT GLOB '*.*.*' "
+        f"AND LENGTH({text}) - LENGTH({digits}) <= 1 "
+        f"THEN ROUND(CAST({text} AS REAL), 2) ELSE casefold(TRIM({col})) END)"
+    )
+
+
+def qty_sql(col: str) -> str:
+    """Количество TEXT как целое; пустое или нечисловое — 1."""
+    return f"COALESCE(NULLIF(CAST(TRIM(COALESCE({col}, '')) AS INTEGER), 0), 1)"
+
+
+def line_key_sql(alias: str = "") -> list[str]:
+    """
+    Выражения ключа строки поставщику: товар без регистра и типизированные
+    параметры. casefold — функция соединения AppDB (LOWER не знает кириллицу).
+    """
+    product = _col("product", alias)
+    return [f"casefold(TRIM({product}))"] + [num_sql(_col(p, alias)) for p in PARAMS]
+
+
+def comment_key_sql(alias: str = "") -> str:
+    col = _col("comment", alias)
+    return f"casefold(TRIM(COALESCE({col}, '')))"
+
+
+def pending_lines(conn, status: str = PENDING) -> list[dict]:
+    """
+    Строки заказов МКЛ в статусе status, сведённые GROUP BY по товару,
+    параметрам и комментарию: одинаковые линзы разных клиентов — одна строка
+    с суммой количества; заказ с комментарием (цвет, пометки) сводится только
+    с таким же комментарием. order_ids — заказы клиентов, из которых собрана строка.
+    """
+    key = line_key_sql() + [comment_key_sql()]
+    shown = ", ".join(f"COALESCE(MIN(NULLIF(TRIM({_col(p)}), '')), '') AS \"{p}\"" for p in PARAMS)
+    rows = conn.execute(
+        f"""
+        SELECT MIN(TRIM(product)) AS product, {shown}, COALESCE(MIN(TRIM(comment)), '') AS comment,
+               SUM({qty_sql('qty')}) AS qty, COUNT(*) AS orders, GROUP_CONCAT(id) AS order_ids
+        FROM mkl_orders
+        WHERE status = ?
+        GROUP BY {", ".join(key)}
+        ORDER BY {", ".join(key)};
+        """,
+        (status,),
+    ).fetchall()
+    lines = []
+    for r in rows:
+        line = dict(r)
+        line["order_ids"] = [int(x) for x in (r["order_ids"] or "").split(",") if x]
+        lines.append(line)
+    return lines
+
+
+def lines_text(lines: list[dict]) -> str:
+    """Сводный заказ в формате TXT для поставщика (как экспорт, но без повторов)."""
+    from app.export import SOURCES, format_txt_line
+
+    source = SOURCES["mkl"]
+    out, product = [], None
+    for line in lines:
+        name = (line.get("product") or "").strip() or "(Без названия)"
+        if name.casefold() != product:
+            if product is not None:
+                out.append("")
+            out.append(name)
+            product = name.casefold()
+        text = format_txt_line(line, source)
+        if text:
+            out.append(text)
+    return "\n".join(out) + "\n" if out else ""
+
+
+MKL_MIRROR_GROUP = "Контактные Линзы МКЛ"
+
+
+def meridian_mirror_names(conn) -> dict[str, str]:
+    """Товары зеркала МКЛ в каталоге Меридиан: название без регистра → название в каталоге."""
+    rows = conn.execute(
+        """
+        WITH RECURSIVE sub(id) AS (
+            SELECT id FROM product_groups_meridian WHERE name = ? AND parent_id IS NULL
+            UNION ALL
+            SELECT g.id FROM product_groups_meridian g JOIN sub s ON g.parent_id = s.id
+        )
+        SELECT name FROM products_meridian WHERE group_id IN (SELECT id FROM sub);
+        """,
+        (MKL_MIRROR_GROUP,),
+    ).fetchall()
+    return {(r["name"] or "").strip().casefold(): r["name"] for r in rows}
+
+
+def meridian_product(line: dict, mirror: dict[str, str]) -> str:
+    """
+    Название позиции Меридиан: товар из зеркала МКЛ, плюс BC и комментарий —
+    в позициях Меридиан для них нет полей, а без них линзы с разной BC
+    выглядели бы одинаковыми позициями.
+    """
+    name = (line.get("product") or "").strip()
+    name = mirror.get(name.casefold(), name)
+    bc = (line.get("bc") or "").strip()
+    if bc:
+        name = f"{name} BC {bc}"
+    comment = (line.get("comment") or "").strip()
+    if comment:
+        name = f"{name} ({comment})"
+    return name
+
+
+def transfer_to_meridian(db: AppDB, title: str = "", lines: list[dict] | None = None) -> tuple[int, int] | None:
+    """
+    Перенести заказы МКЛ «Не заказан» в новый заказ Меридиан.
+
+    Одинаковые линзы сводятся в одну позицию (pending_lines), товар
+    сопоставляется с зеркалом МКЛ в каталоге Меридиан. Заказ, его позиции
+    (executemany) и перевод заказов МКЛ в «Заказан» — одна транзакция.
+    BC и комментарий дописываются к названию (meridian_product). Вернуть (id заказа Меридиан, изменено заказов МКЛ) или None.
+    """
+    conn = db.conn
+    lines = pending_lines(conn) if lines is None else lines
+    if not lines:
+        return None
+    mirror = meridian_mirror_names(conn)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M")
+    title = title.strip() or f"МКЛ от {datetime.now().strftime('%d.%m.%y')}"
+    with conn:
+        order_id = conn.execute(
+            "INSERT INTO meridian_orders (title, status, date) VALUES (?, ?, ?);",
+            (title, PENDING, now),
+        ).lastrowid
+        conn.executemany(
+            'INSERT INTO meridian_items (order_id, product, sph, cyl, ax, "add", d, qty) VALUES (?, ?, ?, ?, ?, ?, ?, ?);',
+            [
+                (
+                    order_id,
+                    meridian_product(line, mirror),
+                    line.get("sph", ""), line.get("cyl", ""), line.get("ax", ""), line.get("add", ""),
+                    "", str(int(line["qty"])),
+                )
+                for line in lines
+            ],
+        )
+        cur = conn.executemany(
+            "UPDATE mkl_orders SET status = ?, date = ? WHERE id = ? AND status = ?;",
+            [(ORDERED, now, oid, PENDING) for line in lines for oid in line["order_ids"]],
+        )
+    return order_id, cur.rowcount
+
+
+class SupplierBatches:
+    """
+    Сводные заказы поставщику МКЛ.
+
+    create() сохраняет строки вместе со связью «строка — заказы клиентов»
+    (supplier_batch_orders), confirm() одной транзакцией переводит эти заказы
+    в «Заказан» — только те, что всё ещё «Не заказан».
+    """
+
+    def __init__(self, db: AppDB):
+        self.db = db
+        self.conn = db.conn
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS supplier_batches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL,
+                confirmed_at TEXT
+            );
+            """
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS supplier_batch_lines (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                batch_id INTEGER NOT NULL,
+                product TEXT NOT NULL,
+                sph TEXT, cyl TEXT, ax TEXT, "add" TEXT, bc TEXT,
+                qty INTEGER NOT NULL,
+                comment TEXT,
+                FOREIGN KEY(batch_id) REFERENCES supplier_batches(id) ON DELETE CASCADE
+            );
+            """
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS supplier_batch_orders (
+                line_id INTEGER NOT NULL,
+                order_id INTEGER NOT NULL,
+                PRIMARY KEY (line_id, order_id),
+                FOREIGN KEY(line_id) REFERENCES supplier_batch_lines(id) ON DELETE CASCADE
+            );
+            """
+        )
+        cols = {r["name"] for r in cur.execute("PRAGMA table_info(supplier_batch_lines);").fetchall()}
+        if "comment" not in cols:
+            cur.execute("ALTER TABLE supplier_batch_lines ADD COLUMN comment TEXT;")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_supplier_batch_lines_batch ON supplier_batch_lines(batch_id);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_supplier_batch_orders_order ON supplier_batch_orders(order_id);")
+        self.conn.commit()
+
+    def create(self, lines: list[dict] | None = None) -> int | None:
+        """Сохранить сводный заказ (по умолчанию — из текущих «Не заказан»); None — нечего заказывать."""
+        lines = pending_lines(self.conn) if lines is None else lines
+        if not lines:
+            return None
+        with self.conn:
+            batch_id = self.conn.execute(
+                "INSERT INTO supplier_batches (created_at) VALUES (?);",
+                (datetime.now().strftime("%Y-%m-%d %H:%M"),),
+            ).lastrowid
+            links = []
+            for line in lines:
+                line_id = self.conn.execute(
+                    'INSERT INTO supplier_batch_lines (batch_id, product, sph, cyl, ax, "add", bc, qty, comment) '
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);",
+                    (batch_id, line["product"], *(line.get(p, "") for p in PARAMS), int(line["qty"]), line.get("comment", "")),
+                ).lastrowid
+                links.extend((line_id, order_id) for order_id in line["order_ids"])
+            self.conn.executemany("INSERT INTO supplier_batch_orders (line_id, order_id) VALUES (?, ?);", links)
+        return batch_id
+
+    def lines(self, batch_id: int) -> list[dict]:
+        rows = self.conn.execute(
+            """
+            SELECT l.id, l.product, l.sph, l.cyl, l.ax, l."add", l.bc, l.qty, COALESCE(l.comment, '') AS comment,
+                   COUNT(o.order_id) AS orders, GROUP_CONCAT(o.order_id) AS order_ids
+            FROM supplier_batch_lines l LEFT JOIN supplier_batch_orders o ON o.line_id = l.id
+            WHERE l.batch_id = ?
+            GROUP BY l.id ORDER BY l.id;
+            """,
+            (batch_id,),
+        ).fetchall()
+        result = []
+        for r in rows:
+            line = dict(r)
+            line["order_ids"] = [int(x) for x in (r["order_ids"] or "").split(",") if x]
+            result.append(line)
+        return result
+
+    def confirm(self, batch_id: int) -> int:
+        """Отметить заказы клиентов из сводного заказа «Заказан» (одна транзакция); вернуть число изменённых."""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M")
+        with self.conn:
+            cur = self.conn.execute(
+                """
+                UPDATE mkl_orders SET status = ?, date = ?
+                WHERE status = ? AND id IN (
+                    SELECT o.order_id FROM supplier_batch_orders o
+                    JOIN supplier_batch_lines l ON l.id = o.line_id
+                    WHERE l.batch_id = ?
+                );
+                """,
+                (ORDERED, now, PENDING, batch_id),
+            )
+            self.conn.execute("UPDATE supplier_batches SET confirmed_at = ? WHERE id = ?;", (now, batch_id))
+        return cur.rowcount
+
+    def batches(self, limit: int = 50) -> list[dict]:
+        rows = self.conn.execute(
+            """
+            SELECT b.id, b.created_at, b.confirmed_at, COUNT(l.id) AS lines, COALESCE(SUM(l.qty), 0) AS qty
+            FROM supplier_batches b LEFT JOIN supplier_batch_lines l ON l.batch_id = b.id
+            GROUP BY b.id ORDER BY b.id DESC LIMIT ?;
+            """,
+            (limit,),
+        ).fetchall()
+        return [dict(r) for r in rows]
@@ -0,0 +1,557 @@
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import ttk
+from tkinter import font as tkfont
+
+
+class KeyedTreeSync:
+    """
+    Ключевая сверка строк верхнего уровня Treeview со списком данных.
+
+    iid элемента — str(key(row)) (обычно id в БД). apply() удаляет исчезнувшие
+    строки, вставляет новые и вызывает item(..., values=...) только для строк,
+    у которых изменились значения или теги; порядок выравнивается одним
+    set_children. Выделение остаётся на тех же элементах, верхняя видимая строка
+    сохраняется.
+    """
+
+    def __init__(self, tree: ttk.Treeview, key, values, tags=None):
+        self.tree = tree
+        self.key = key
+        self.values = values
+        self.tags = tags
+        self._state: dict[str, tuple] = {}
+
+    def apply(self, rows) -> list[str]:
+        """Привести дерево к rows. Возвращает iid в порядке строк."""
+        tree = self.tree
+        current = tree.get_children("")
+        top_iid = None
+        if current:
+            try:
+                top = int(round(float(tree.yview()[0]) * len(current)))
+                top_iid = current[top] if 0 <= top < len(current) else None
+            except Exception:
+                top_iid = None
+
+        desired: list[tuple[str, tuple]] = []
+        seen: set[str] = set()
+        for row in rows:
+            iid = str(self.key(row))
+            if iid in seen:
+                continue
+            seen.add(iid)
+            state = (tuple(self.values(row)), tuple(self.tags(row)) if self.tags else ())
+            desired.append((iid, state))
+
+        stale = [iid for iid in current if iid not in seen]
+        if stale:
+            tree.delete(*stale)
+            for iid in stale:
+                self._state.pop(iid, None)
+        for iid, state in desired:
+            old = self._state.get(iid)
+            if old is None and not tree.exists(iid):
+                tree.insert("", "end", iid=iid, values=state[0], tags=state[1])
+            elif old != state:
+                tree.item(iid, values=state[0], tags=state[1])
+            self._state[iid] = state
+
+        order = [iid for iid, _ in desired]
+        if list(tree.get_children("")) != order:
+            tree.set_children("", *order)
+        if top_iid in seen and order:
+            try:
+                tree.yview_moveto(order.index(top_iid) / len(order))
+            except Exception:
+                pass
+        return order
+
+    def reset(self):
+        """Забыть закэшированные значения (например, после ручной очистки дерева)."""
+        self._state.clear()
+
+
+class VirtualTable(ttk.Frame):
+    """
+    Таблица с виртуальной прокруткой на базе ttk.Treeview.
+
+    В дереве существуют только строки видимого окна; данные читаются страницами
+    (page_size строк) через fetch_page(offset, limit) по мере прокрутки, последние
+    страницы кэшируются. Если задан key(row) (id в БД), iid элемента — этот ключ,
+    а окно обновляется через KeyedTreeSync: при прокрутке и обновлении данных
+    перерисовываются только изменившиеся строки. Без key iid — индекс строки.
+    Индекс выделенной строки — selected_index().
+
+    Дерево доступно как .tree: заголовки, теги статусов, контекстное меню и
+    двойной щелчок настраиваются на нём так же, как на обычном Treeview.
+    """
+
+    PAGE_CACHE = 16
+    WHEEL_ROWS = 3
+    INITIAL_ROWS = 40
+
+    def __init__(self, master, columns, row_values, row_tags=None, key=None, style: str = "Data.Treeview", page_size: int = 200, xscroll: bool = False):
+        super().__init__(master, style="Card.TFrame")
+        self.row_values = row_values
+        self.row_tags = row_tags
+        self.key = key
+        self.page_size = max(1, int(page_size))
+
+        self._count = 0
+        self._fetch = None
+        self._pages: OrderedDict[int, list] = OrderedDict()
+        self._offset = 0
+        self._visible = self.INITIAL_ROWS
+        self._selected: int | None = None
+        self._metrics: tuple[int, int] | None = None  # (высота строки, высота заголовка)
+        self._window: dict[str, int] = {}  # iid -> индекс строки для видимого окна
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", style=style, selectmode="browse")
+        self._sync = KeyedTreeSync(
+            self.tree,
+            key=lambda item: self._iid(*item),
+            values=lambda item: self.row_values(item[1]),
+            tags=(lambda item: self.row_tags(item[1])) if row_tags else None,
+        )
+        self.y_scroll = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.y_scroll.grid(row=0, column=1, sticky="ns")
+        if xscroll:
+            x_scroll = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+            self.tree.configure(xscroll=x_scroll.set)
+            x_scroll.grid(row=1, column=0, sticky="ew")
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        self.tree.bind("<Configure>", self._on_configure, add="+")
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_rows(-self.WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_rows(self.WHEEL_ROWS))
+        self.tree.bind("<Up>", lambda e: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self._move_selection(-max(1, self._visible - 1)))
+        self.tree.bind("<Next>", lambda e: self._move_selection(max(1, self._visible - 1)))
+        self.tree.bind("<Home>", lambda e: self._move_selection(-self._count))
+        self.tree.bind("<End>", lambda e: self._move_selection(self._count))
+
+    # --- Data source ---
+    def set_rows(self, rows: list, keep_state: bool = False, page_loader=None):
+        """
+        Источник — список в памяти (страницы — срезы списка). page_loader(срез)
+        может дополнить строки страницы (например, одним запросом к БД).
+        keep_state=True — сохранить выделенную и верхнюю строку по ключу.
+        """
+        positions: dict | None = None
+
+        def locate(key):
+            nonlocal positions
+            if positions is None:
+                positions = {self.key(r): i for i, r in enumerate(rows)}
+            return positions.get(key)
+
+        def fetch(offset, limit):
+            page = rows[offset:offset + limit]
+            return page_loader(page) if page_loader else page
+
+        self.set_source(len(rows), fetch, keep_state=keep_state, locate=locate if self.key else None)
+
+    def set_source(self, count: int, fetch_page, keep_state: bool = False, locate=None):
+        """
+        Источник из count строк; fetch_page(offset, limit) возвращает список строк.
+        По умолчанию выделение сбрасывается, окно возвращается к началу.
+        keep_state=True — выделенная и верхняя строки ищутся по ключу через
+        locate(key) -> индекс (или остаются на прежних индексах, если locate нет).
+        """
+        sel_key = top_key = None
+        if keep_state and locate is not None:
+            sel_key = self._key_of(self._selected)
+            top_key = self._key_of(self._offset)
+        old_selected, old_offset = self._selected, self._offset
+
+        self._count = max(0, int(count))
+        self._fetch = fetch_page
+        self._pages.clear()
+
+        if not keep_state:
+            self._selected = None
+            self._offset = 0
+        else:
+            selected, offset = old_selected, old_offset
+            if locate is not None:
+                if sel_key is not None:
+                    found = locate(sel_key)
+                    # Строка удалена — выделяем ту, что встала на её место
+                    selected = found if found is not None else old_selected
+                if top_key is not None:
+                    found = locate(top_key)
+                    offset = found if found is not None else old_offset
+            if selected is not None and self._count:
+                selected = max(0, min(self._count - 1, selected))
+            self._selected = selected if self._count else None
+            self._offset = self._clamp_offset(offset)
+        self._render()
+
+    def _key_of(self, index: int | None):
+        if index is None or self.key is None:
+            return None
+        row = self.row(index)
+        return self.key(row) if row is not None else None
+
+    def _iid(self, index: int, row) -> str:
+        return str(self.key(row)) if self.key else str(index)
+
+    def refresh(self):
+        """Сбросить кэш страниц и перерисовать окно (после изменения данных источника)."""
+        self._pages.clear()
+        self._render()
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def row(self, index: int):
+        if index < 0 or index >= self._count or self._fetch is None:
+            return None
+        page_no, pos = divmod(index, self.page_size)
+        page = self._pages.get(page_no)
+        if page is None:
+            page = list(self._fetch(page_no * self.page_size, self.page_size) or [])
+            self._pages[page_no] = page
+            if len(self._pages) > self.PAGE_CACHE:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page_no)
+        return page[pos] if pos < len(page) else None
+
+    # --- Selection ---
+    def selected_index(self) -> int | None:
+        return self._selected
+
+    def selected_row(self):
+        return self.row(self._selected) if self._selected is not None else None
+
+    def select_index(self, index: int | None, see: bool = True):
+        if index is None or self._count == 0:
+            self._selected = None
+            self._render()
+            return
+        index = max(0, min(self._count - 1, int(index)))
+        self._selected = index
+        if see:
+            if index < self._offset:
+                self._offset = index
+            elif index >= self._offset + self._visible:
+                self._offset = index - self._visible + 1
+            self._offset = self._clamp_offset(self._offset)
+        self._render()
+
+    def index_at(self, y: int) -> int | None:
+        iid = self.tree.identify_row(y)
+        return self._window.get(iid) if iid else None
+
+    def _on_select(self, event=None):
+        sel = self.tree.selection()
+        if sel and sel[0] in self._window:
+            self._selected = self._window[sel[0]]
+
+    def _move_selection(self, delta: int):
+        if self._count == 0:
+            return "break"
+        current = self._selected if self._selected is not None else self._offset - (1 if delta > 0 else 0)
+        self.select_index(current + delta)
+        return "break"
+
+    # --- Scrolling ---
+    def _clamp_offset(self, offset: int) -> int:
+        return max(0, min(int(offset), max(0, self._count - self._visible)))
+
+    def scroll_to(self, offset: int):
+        offset = self._clamp_offset(offset)
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+
+    def _scroll_rows(self, delta: int):
+        self.scroll_to(self._offset + delta)
+        return "break"
+
+    def _on_mousewheel(self, event):
+        delta = getattr(event, "delta", 0) or 0
+        notches = int(delta / 120) if abs(delta) >= 120 else (1 if delta > 0 else -1 if delta < 0 else 0)
+        return self._scroll_rows(-notches * self.WHEEL_ROWS)
+
+    def _on_scrollbar(self, *args):
+        if not args:
+            return
+        if args[0] == "moveto":
+            try:
+                self.scroll_to(int(round(float(args[1]) * self._count)))
+            except Exception:
+                pass
+        elif args[0] == "scroll":
+            try:
+                step = int(args[1])
+            except Exception:
+                return
+            if len(args) > 2 and args[2] == "pages":
+                step *= max(1, self._visible - 1)
+            self.scroll_to(self._offset + step)
+
+    def _update_scrollbar(self):
+        if self._count <= 0:
+            self.y_scroll.set(0.0, 1.0)
+            return
+        first = self._offset / self._count
+        last = min(1.0, (self._offset + self._visible) / self._count)
+        self.y_scroll.set(first, last)
+
+    # --- Geometry ---
+    def _measure(self) -> tuple[int, int]:
+        """Высота строки и заголовка: по bbox первой строки, иначе из стиля/шрифта."""
+        if self._metrics:
+            return self._metrics
+        children = self.tree.get_children("")
+        if children:
+            try:
+                bbox = self.tree.bbox(children[0])
+                if bbox and bbox[3] > 0:
+                    self._metrics = (int(bbox[3]), int(bbox[1]))
+                    return self._metrics
+            except Exception:
+                pass
+        row_h = 0
+        try:
+            row_h = int(float(ttk.Style(self).lookup(str(self.tree.cget("style")), "rowheight") or 0))
+        except Exception:
+            row_h = 0
+        if row_h <= 0:
+            try:
+                row_h = tkfont.nametofont("TkDefaultFont").metrics("linespace") + 4
+            except Exception:
+                row_h = 20
+        return row_h, row_h + 4
+
+    def _visible_rows(self) -> int:
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return self.INITIAL_ROWS
+        row_h, heading_h = self._measure()
+        # Только полностью видимые строки: иначе Treeview сам прокрутит частично видимую при щелчке
+        return max(1, (height - heading_h) // max(1, row_h))
+
+    def _on_configure(self, event=None):
+        try:
+            visible = self._visible_rows()
+        except tk.TclError:
+            return  # виджет уже уничтожен (отложенный вызов after_idle)
+        if visible != self._visible:
+            self._visible = visible
+            self._offset = self._clamp_offset(self._offset)
+            self._render()
+
+    # --- Rendering ---
+    def _render(self):
+        tree = self.tree
+        end = min(self._count, self._offset + self._visible)
+        items = []
+        for index in range(self._offset, end):
+            row = self.row(index)
+            if row is not None:
+                items.append((index, row))
+        self._sync.apply(items)
+        self._window = {}
+        for index, row in items:
+            self._window.setdefault(self._iid(index, row), index)
+        selected_iid = next((iid for iid, index in self._window.items() if index == self._selected), None)
+        if selected_iid is not None:
+            if tuple(tree.selection()) != (selected_iid,):
+                tree.selection_set(selected_iid)
+            tree.focus(selected_iid)
+        elif tree.selection():
+            tree.selection_remove(*tree.selection())
+        try:
+            tree.yview_moveto(0)
+        except Exception:
+            pass
+        if self._metrics is None and end > self._offset:
+            # Первые точные размеры строк становятся известны после отрисовки
+            self.after_idle(self._on_configure)
+        self._update_scrollbar()
+
+
+# Кэш ширин текста: (шрифт) -> {строка: пиксели}
+_TEXT_WIDTHS: dict[tuple, dict[str, int]] = {}
+_TEXT_WIDTHS_LIMIT = 50000
+
+
+def text_measurer(font: tkfont.Font):
+    """Функция measure(text) с кэшем по (шрифт, строка); шрифт определяется по имени и параметрам."""
+    try:
+        key = (font.name, font.cget("family"), font.cget("size"), font.cget("weight"), font.cget("slant"))
+    except Exception:
+        key = (str(font),)
+    cache = _TEXT_WIDTHS.setdefault(key, {})
+    if len(cache) > _TEXT_WIDTHS_LIMIT:
+        cache.clear()
+
+    def measure(text: str) -> int:
+        width = cache.get(text)
+        if width is None:
+            width = font.measure(text)
+            cache[text] = width
+        return width
+
+    return measure
+
+
+class ColumnAutosizer:
+    """
+    Автоподбор ширины колонок Treeview по содержимому и доступной ширине.
+
+    Ширины строк берутся из кэша text_measurer; большие таблицы измеряются по
+    равномерной выборке из sample строк. Измерения выполняются только после
+    invalidate()/rows_added(); всплески <Configure> сглаживаются задержкой и
+    лишь масштабируют уже известные ширины под окно.
+
+    rows() — последовательность строк (по умолчанию значения элементов дерева),
+    row_values(row) — кортеж ячеек по колонкам. Ячейка может быть парой
+    (текст, доп. пиксели), например для отступа вложенных узлов.
+    """
+
+    def __init__(
+        self,
+        tree: ttk.Treeview,
+        columns,
+        headers: dict,
+        rows=None,
+        row_values=None,
+        padding: int = 28,
+        min_width: int = 60,
+        fit: bool = True,
+        stretch: bool = True,
+        lock_min: bool = False,
+        sample: int = 400,
+        delay: int = 80,
+        font_name: str = "TkDefaultFont",
+        on_apply=None,
+    ):
+        self.tree = tree
+        self.columns = tuple(columns)
+        self.headers = headers
+        self.rows = rows
+        self.row_values = row_values
+        self.padding = padding
+        self.min_width = min_width
+        self.fit = fit
+        self.stretch = stretch
+        self.lock_min = lock_min
+        self.sample = max(1, int(sample))
+        self.delay = delay
+        self.font_name = font_name
+        self.on_apply = on_apply
+
+        self._font: tkfont.Font | None = None
+        self._content: dict[str, int] | None = None
+        self._applied: dict[str, int] = {}
+        self._after = None
+        self._last_width = None
+        if fit:
+            tree.bind("<Configure>", self._on_configure, add="+")
+
+    # --- Measuring ---
+    def _measurer(self):
+        if self._font is None:
+            try:
+                self._font = tkfont.nametofont(self.font_name)
+            except Exception:
+                self._font = tkfont.Font()
+        return text_measurer(self._font)
+
+    def _collect(self):
+        if self.rows is not None:
+            return self.rows()
+        return [self.tree.item(iid, "values") or () for iid in self.tree.get_children("")]
+
+    def _sampled(self, rows):
+        n = len(rows)
+        if n <= self.sample:
+            return rows
+        step = n / self.sample
+        return [rows[int(i * step)] for i in range(self.sample)]
+
+    def _measure_rows(self, rows, widths: dict[str, int], measure):
+        for row in rows:
+            cells = self.row_values(row) if self.row_values else row
+            for i, col in enumerate(self.columns):
+                if i >= len(cells):
+                    break
+                cell, extra = cells[i], 0
+                if isinstance(cell, tuple):
+                    cell, extra = cell
+                w = measure(str(cell)) + extra
+                if w > widths[col]:
+                    widths[col] = w
+
+    def remeasure(self):
+        measure = self._measurer()
+        widths = {c: measure(str(self.headers.get(c, c))) for c in self.columns}
+        self._measure_rows(self._sampled(list(self._collect())), widths, measure)
+        self._content = widths
+
+    # --- Updates ---
+    def invalidate(self):
+        """Данные изменились: пересчитать ширины (отложенно)."""
+        self._content = None
+        self.schedule()
+
+    def rows_added(self, rows):
+        """Новые строки: расширить колонки без полного пересчёта."""
+        if self._content is None:
+            self.schedule()
+            return
+        self._measure_rows(rows, self._content, self._measurer())
+        self.schedule()
+
+    def schedule(self):
+        if self._after is not None:
+            try:
+                self.tree.after_cancel(self._after)
+            except Exception:
+                pass
+        try:
+            self._after = self.tree.after(self.delay, self.apply)
+        except Exception:
+            self._after = None
+
+    def _on_configure(self, event=None):
+        width = getattr(event, "width", None)
+        if width == self._last_width:
+            return
+        self._last_width = width
+        self.schedule()
+
+    def apply(self):
+        self._after = None
+        try:
+            if not self.tree.winfo_exists():
+                return
+            if self._content is None:
+                self.remeasure()
+            widths = {c: max(self.min_width, self._content[c] + self.padding) for c in self.columns}
+            if self.fit:
+                avail = self.tree.winfo_width()
+                total = sum(widths.values())
+                if avail > 1 and total > avail:
+                    # Не помещается — пропорционально сжать под ширину окна
+                    ratio = max(200, avail) / total
+                    widths = {c: max(self.min_width, int(w * ratio)) for c, w in widths.items()}
+            for c, w in widths.items():
+                if self._applied.get(c) != w:
+                    self.tree.column(c, width=w, minwidth=(w if self.lock_min else self.min_width), stretch=self.stretch)
+            self._applied = widths
+            if callable(self.on_apply):
+                self.on_apply(widths)
+        except tk.TclError:
+            pass
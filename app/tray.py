@@ -2,13 +2,28 @@ import os
 import threading
 from typing import Optional
 
-try:
-    import pystray
-    from PIL import Image, ImageDraw
-except Exception:
-    pystray = None
-    Image = None
-    ImageDraw = None
+from app.dispatch import CMD_EXIT, CMD_SHOW, PRIORITY_HIGH, call_ui, post_ui
+
+_TRAY_UNAVAILABLE = False  # pystray/Pillow уже пытались импортировать — их нет
+
+
+def _tray_modules():
+    """
+    (pystray, PIL.Image, PIL.ImageDraw) или None, если их нет.
+
+    app.tray импортируют main.py и главное окно при каждом запуске, поэтому
+    pystray и Pillow грузятся только при первом показе иконки.
+    """
+    global _TRAY_UNAVAILABLE
+    if _TRAY_UNAVAILABLE:
+        return None
+    try:
+        import pystray
+        from PIL import Image, ImageDraw
+    except Exception:
+        _TRAY_UNAVAILABLE = True
+        return None
+    return pystray, Image, ImageDraw
 
 
 def _get_exec_command() -> str:
@@ -79,117 +94,26 @@ def _windows_autostart_get() -> bool:
         return False
 
 
-def _create_tray_image(settings: dict) -> Optional["Image.Image"]:
-    """Create tray image from the best-suited asset.
-
-    Heuristic:
-    - Prefer square PNG with alpha and size >= 128 (closest to 192 ideal)
-    - Fall back to ICO/other sizes
-    - Finally, generate a simple placeholder if nothing found
+def _create_tray_image(settings: dict, cache_dir: str | None = None) -> Optional["PIL.Image.Image"]:
+    """Create tray image from the prepared 128 px icon (app.icons cache).
 
-    Also supports PyInstaller onefile by checking sys._MEIPASS.
+    The source is scored and resampled only when the logo files change;
+    otherwise the cached PNG is just opened. Finally, generate a simple
+    placeholder if nothing found.
     """
-    if Image is None:
+    modules = _tray_modules()
+    if modules is None:
         return None
+    _, Image, ImageDraw = modules
 
-    # Candidate paths (explicit first)
-    configured = (settings or {}).get("tray_logo_path") or ""
-    rel_candidates = [
-        configured,
-        os.path.join("app", "assets", "logo.png"),
-        os.path.join("app", "assets", "android-chrome-192x192.png"),
-        os.path.join("app", "assets", "apple-touch-icon.png"),
-        os.path.join("app", "assets", "favicon-32x32.png"),
-        os.path.join("app", "assets", "favicon-16x16.png"),
-        os.path.join("app", "assets", "favicon.ico"),
-    ]
-
-    # Resolve candidates against common bases (for PyInstaller onefile support)
-    bases: list[str] = []
     try:
-        import sys
-        bases.extend([
-            os.getcwd(),
-            os.path.dirname(__file__),
-            os.path.dirname(sys.executable) if getattr(sys, "frozen", False) else os.getcwd(),
-            getattr(sys, "_MEIPASS", None),
-        ])
+        from app.icons import prepared_icons
+        path = prepared_icons(settings, cache_dir).get(128)
+        if path:
+            with Image.open(path) as im:
+                return im.convert("RGBA")
     except Exception:
         pass
-    bases = [b for b in bases if b]
-
-    def _resolve(path_like: str) -> list[str]:
-        if not path_like:
-            return []
-        if os.path.isabs(path_like) and os.path.isfile(path_like):
-            return [path_like]
-        paths = []
-        for b in bases:
-            p = os.path.normpath(os.path.join(b, path_like))
-            try:
-                if os.path.isfile(p):
-                    paths.append(p)
-            except Exception:
-                continue
-        return paths
-
-    existing: list[str] = []
-    for rel in rel_candidates:
-        existing.extend(_resolve(rel))
-
-    def _score(path: str) -> float:
-        # Higher is better
-        try:
-            with Image.open(path) as im:
-                w, h = im.size
-                ext = os.path.splitext(path)[1].lower()
-                score = 0.0
-                # Format preference: PNG > ICO > others
-                if ext == ".png":
-                    score += 3.0
-                elif ext == ".ico":
-                    score += 1.5
-                else:
-                    score += 0.5
-                # Prefer square
-                if w == h:
-                    score += 2.0
-                else:
-                    score -= 0.5
-                # Prefer alpha channel (RGBA/LA)
-                try:
-                    if im.mode in ("RGBA", "LA") or ("transparency" in im.info):
-                        score += 1.0
-                except Exception:
-                    pass
-                # Prefer size >= 128, and around 128..256 (ideal 192)
-                ideal = 192
-                long_side = max(w, h)
-                if long_side >= 128:
-                    score += 2.0
-                # penalize distance from ideal
-                score -= abs(long_side - ideal) / 256.0
-                return score
-        except Exception:
-            # If cannot open, but file exists — very low score
-            return -10.0
-
-    best_path = None
-    best_score = -1e9
-    for p in existing:
-        s = _score(p)
-        if s > best_score:
-            best_score = s
-            best_path = p
-
-    if best_path:
-        try:
-            img = Image.open(best_path)
-            img = img.convert("RGBA")
-            img = img.resize((128, 128), Image.LANCZOS)
-            return img
-        except Exception:
-            pass
 
     # Fallback: generate simple icon with text 'УО'
     img = Image.new("RGBA", (128, 128), (248, 250, 252, 255))  # bg #f8fafc
@@ -202,80 +126,52 @@ def _create_tray_image(settings: dict) -> Optional["Image.Image"]:
     return img
 
 
+def _tray_title(master) -> str:
+    """Подсказка иконки трея: название + счётчики незаказанных (O(1) из order_status_counts)."""
+    title = "УссурОЧки.рф"
+    try:
+        from app.utils import status_badge_lines
+        db = getattr(master, "db", None)
+        lines = status_badge_lines(db.status_counts()) if db else []
+        if lines:
+            title += "\n" + "\n".join(lines)
+    except Exception:
+        pass
+    return title
+
+
+def _update_tray_title(master):
+    """Обновить подсказку иконки трея, если трей запущен."""
+    try:
+        icon = getattr(master, "tray_icon", None)
+        if icon:
+            icon.title = _tray_title(master)
+    except Exception:
+        pass
+
+
 def _start_tray(master):
     """Start system tray icon if pystray is available."""
-    if pystray is None or Image is None:
+    modules = _tray_modules()
+    if modules is None:
         return
+    pystray = modules[0]
     # Avoid duplicates
     if getattr(master, "tray_icon", None):
         return
 
     settings = getattr(master, "app_settings", {})
-    image = _create_tray_image(settings) or None
-
-    def _ensure_main():
-        try:
-            from app.views.main import MainWindow
-            # Initialize main window if not yet built
-            if not getattr(master, "main_initialized", False):
-                MainWindow(master)
-                master.main_initialized = True
-        except Exception:
-            pass
+    image = _create_tray_image(settings, getattr(master, "icon_cache_dir", None)) or None
 
+    # pystray calls these from its own thread: only post commands to the Tk thread (app/dispatch.py)
     def on_open(icon, item=None):
-        try:
-            master.after(0, lambda: (_ensure_main(), _show_main_window(master), _stop_tray(master)))
-        except Exception:
-            pass
+        post_ui(master, CMD_SHOW, priority=PRIORITY_HIGH)
 
     def on_exit(icon, item=None):
-        try:
-            def _exit():
-                # Save main window geometry before exit
-                try:
-                    geom = master.geometry()
-                    settings = getattr(master, "app_settings", {}) or {}
-                    settings["main_geometry"] = geom
-                    # Persist geometry to the resolved settings path (next to exe or source), not CWD
-                    try:
-                        import json
-                        settings_path = getattr(master, "app_settings_path", os.path.abspath("settings.json"))
-                        if os.path.isfile(settings_path):
-                            with open(settings_path, "r", encoding="utf-8") as f:
-                                data = json.load(f)
-                        else:
-                            data = {}
-                        if isinstance(data, dict):
-                            data["main_geometry"] = geom
-                            with open(settings_path, "w", encoding="utf-8") as f:
-                                json.dump(data, f, ensure_ascii=False, indent=2)
-                    except Exception:
-                        pass
-                except Exception:
-                    pass
-                _stop_tray(master)
-                try:
-                    master.quit()
-                except Exception:
-                    pass
-                try:
-                    master.destroy()
-                except Exception:
-                    pass
-            master.after(0, _exit)
-        except Exception:
-            pass
+        post_ui(master, CMD_EXIT, priority=PRIORITY_HIGH)
 
     def on_toggle_autostart(icon, item=None):
-        try:
-            cur = _windows_autostart_get()
-            _windows_autostart_set(not cur)
-            master.app_settings["autostart_enabled"] = not cur
-            _stop_tray(master)
-            _start_tray(master)
-        except Exception:
-            pass
+        call_ui(master, _toggle_autostart, master)
 
     autostart_label = "Автозапуск: " + ("Вкл" if _windows_autostart_get() else "Выкл")
     menu = pystray.Menu(
@@ -285,7 +181,7 @@ def _start_tray(master):
         pystray.MenuItem("Выход", on_exit),
     )
 
-    icon = pystray.Icon("ussurochki_rf", image, title="УссурОЧки.рф", menu=menu)
+    icon = pystray.Icon("ussurochki_rf", image, title=_tray_title(master), menu=menu)
     master.tray_icon = icon
 
     def run_icon():
@@ -299,6 +195,60 @@ def _start_tray(master):
     t.start()
 
 
+def _toggle_autostart(master):
+    try:
+        cur = _windows_autostart_get()
+        _windows_autostart_set(not cur)
+        master.app_settings["autostart_enabled"] = not cur
+        # Rebuild the tray menu so the label reflects the new state
+        _stop_tray(master)
+        _start_tray(master)
+    except Exception:
+        pass
+
+
+def _save_geometry(master):
+    """Запомнить геометрию главного окна в settings.json."""
+    # Окно ещё не открывалось (запуск в трей): geometry() скрытого root — «1x1+0+0»
+    if not getattr(master, "main_initialized", False):
+        return
+    try:
+        geom = master.geometry()
+        settings = getattr(master, "app_settings", {}) or {}
+        settings["main_geometry"] = geom
+        # Persist geometry to the resolved settings path (next to exe or source), not CWD
+        try:
+            import json
+            settings_path = getattr(master, "app_settings_path", os.path.abspath("settings.json"))
+            if os.path.isfile(settings_path):
+                with open(settings_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            else:
+                data = {}
+            if isinstance(data, dict):
+                data["main_geometry"] = geom
+                with open(settings_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+        except Exception:
+            pass
+    except Exception:
+        pass
+
+
+def _exit_app(master):
+    """Выход из трея (поток Tk): сохранить геометрию окна, остановить трей, закрыть приложение."""
+    _save_geometry(master)
+    _stop_tray(master)
+    try:
+        master.quit()
+    except Exception:
+        pass
+    try:
+        master.destroy()
+    except Exception:
+        pass
+
+
 def _stop_tray(master):
     try:
         icon = getattr(master, "tray_icon", None)
@@ -311,6 +261,12 @@ def _stop_tray(master):
 
 
 def _show_main_window(master):
+    try:
+        ensure_ui = getattr(master, "ensure_ui", None)
+        if callable(ensure_ui):
+            ensure_ui()
+    except Exception:
+        pass
     try:
         master.deiconify()
         # Maximize when restoring from tray
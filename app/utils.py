@@ -431,3 +431,98 @@ def create_tooltip(widget: tk.Widget, text: str, delay_ms: int = 500, wraplength
         return None  # type: ignore
 
 
+def debounce(widget: tk.Misc, delay_ms: int, func):
+    """
+    Обёртка над func для частых событий (ввод в поле поиска): вызов откладывается
+    на delay_ms, и каждый новый вызов в этот промежуток переносит его заново.
+    """
+    job = None
+
+    def run():
+        nonlocal job
+        job = None
+        try:
+            alive = bool(widget.winfo_exists())
+        except Exception:
+            alive = False
+        if alive:  # окно могли закрыть, пока вызов ждал
+            func()
+
+    def schedule(*_args):
+        nonlocal job
+        try:
+            if job is not None:
+                widget.after_cancel(job)
+            job = widget.after(delay_ms, run)
+        except Exception:
+            job = None
+
+    return schedule
+
+
+def status_badge_lines(counts: dict) -> list[str]:
+    """
+    Строки-бейджи вида «МКЛ: 12 не заказано» по результату AppDB.status_counts().
+    Пустые счётчики не выводятся.
+    """
+    lines = []
+    for order_type, label in (("mkl", "МКЛ"), ("meridian", "Меридиан")):
+        try:
+            n = int((counts.get(order_type) or {}).get("Не заказан", 0))
+        except Exception:
+            n = 0
+        if n > 0:
+            lines.append(f"{label}: {n} не заказано")
+    return lines
+
+
+def show_export_menu(view: tk.Misc, anchor: tk.Widget, order_type: str, status_label=None):
+    """
+    Меню «Экспорт» экранов заказов: TXT для поставщика (заказы «Не заказан»)
+    и выгрузка всех заказов в CSV / JSON Lines / XLSX. Выгрузка идёт в рабочем
+    потоке (app/export.py ExportTask); ход — в status_label, итог — сообщением.
+    """
+    from tkinter import messagebox
+    from app.export import PENDING, WRITERS, ExportTask, default_export_dir
+
+    root = view.winfo_toplevel()
+
+    def run(fmt: str, status):
+        task = getattr(view, "_export_task", None)
+        if task is not None and task._thread is not None and task._thread.is_alive():
+            messagebox.showinfo("Экспорт", "Предыдущая выгрузка ещё выполняется.")
+            return
+
+        def set_status(text: str):
+            try:
+                if status_label is not None:
+                    status_label.configure(text=text)
+            except Exception:
+                pass
+
+        def on_progress(done: int, total: int):
+            set_status(f"Экспорт: {done} из {total}")
+
+        def on_done(path, error):
+            set_status("")
+            if error is not None:
+                messagebox.showerror("Экспорт", f"Ошибка записи файла:\n{error}")
+            elif path is None:
+                messagebox.showinfo("Экспорт", "Нет заказов со статусом 'Не заказан' для экспорта." if status else "Нет заказов для экспорта.")
+            else:
+                messagebox.showinfo("Экспорт", f"Экспорт выполнен:\n{path}")
+
+        set_status("Экспорт…")
+        folder = default_export_dir(getattr(root, "app_settings", None))
+        view._export_task = ExportTask(root, order_type, fmt, folder, status, on_progress=on_progress, on_done=on_done).start()
+
+    menu = tk.Menu(view, tearoff=0)
+    menu.add_command(label=f"{WRITERS['txt'].title} («{PENDING}»)", command=lambda: run("txt", PENDING))
+    menu.add_separator()
+    for fmt, writer in WRITERS.items():
+        if fmt != "txt":
+            menu.add_command(label=f"{writer.title} — все заказы", command=lambda f=fmt: run(f, None))
+    try:
+        menu.tk_popup(anchor.winfo_rootx(), anchor.winfo_rooty() + anchor.winfo_height())
+    finally:
+        menu.grab_release()
@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 
 from app.utils import set_initial_geometry
+from app.navigation import view_pool
 
 
 def _frange(start: float, stop: float, step: float):
@@ -167,7 +168,8 @@ class AstigCalcView(ttk.Frame):
 
     def _go_back(self):
         try:
-            self.destroy()
+            if not view_pool(self.master).owns(self):
+                self.destroy()
         finally:
             if callable(self.on_back):
                 self.on_back()
\ No newline at end of file
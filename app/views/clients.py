@@ -2,8 +2,10 @@ import re
 import tkinter as tk
 from tkinter import ttk, messagebox
 
-from app.utils import format_phone_mask
-from app.db import AppDB  # type hint only
+from app.utils import debounce, format_phone_mask
+from app.search import ClientIndexTask
+from app.table import VirtualTable
+from app.db import AppDB
 
 
 class ClientsView(ttk.Frame):
@@ -18,8 +20,8 @@ class ClientsView(ttk.Frame):
         self.master.rowconfigure(0, weight=1)
         self.grid(sticky="nsew")
 
-        self._dataset: list[dict] = []
-        self._filtered: list[dict] = []
+        self._dataset: list[dict] = []  # клиенты в памяти, только без БД
+        self._index: ClientIndexTask | None = None  # строится в фоне сразу после загрузки
 
         self._build_ui()
         self._reload()
@@ -36,7 +38,7 @@ class ClientsView(ttk.Frame):
         self.search_var = tk.StringVar()
         entry = ttk.Entry(search_card, textvariable=self.search_var, width=40)
         entry.grid(row=1, column=0, sticky="w")
-        entry.bind("<KeyRelease>", lambda e: self._apply_filter())
+        entry.bind("<KeyRelease>", debounce(self, 150, self._apply_filter))
 
         btns = ttk.Frame(search_card, style="Card.TFrame")
         btns.grid(row=1, column=1, sticky="w", padx=(12, 0))
@@ -48,23 +50,23 @@ class ClientsView(ttk.Frame):
         table_card.pack(fill="both", expand=True)
 
         columns = ("fio", "phone")
-        self.tree = ttk.Treeview(table_card, columns=columns, show="headings", style="Data.Treeview")
+        self.table = VirtualTable(
+            table_card,
+            columns,
+            row_values=lambda c: (c.get("fio", ""), format_phone_mask(c.get("phone", ""))),
+            key=lambda c: c.get("id") if c.get("id") is not None else id(c),
+        )
+        self.tree = self.table.tree
         self.tree.heading("fio", text="ФИО", anchor="w")
         self.tree.heading("phone", text="Телефон", anchor="w")
         self.tree.column("fio", width=380, anchor="w")
         self.tree.column("phone", width=220, anchor="w")
 
-        y_scroll = ttk.Scrollbar(table_card, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscroll=y_scroll.set)
-
-        self.tree.grid(row=0, column=0, sticky="nsew")
-        y_scroll.grid(row=0, column=1, sticky="ns")
+        self.table.grid(row=0, column=0, sticky="nsew")
 
         table_card.columnconfigure(0, weight=1)
         table_card.rowconfigure(0, weight=1)
 
-        self._refresh_view()
-
     def _go_back(self):
         try:
             self.destroy()
@@ -73,34 +75,44 @@ class ClientsView(ttk.Frame):
                 self.on_back()
 
     def _reload(self):
-        try:
-            self._dataset = self.db.list_clients() if self.db else []
-        except Exception as e:
-            messagebox.showerror("База данных", f"Не удалось загрузить клиентов:\n{e}")
-            self._dataset = []
+        # Весь список клиентов читается только для индекса поиска — в фоне, своим соединением
+        if self.db:
+            self._index = ClientIndexTask(lambda path=self.db.db_path: AppDB.read_clients(path))
+        else:
+            self._index = ClientIndexTask(self._dataset)
         self._apply_filter()
 
     def _apply_filter(self):
-        term = self.search_var.get().strip().lower()
-        if not term:
-            self._filtered = list(self._dataset)
+        # Keyed update: the selected client stays selected while filtering or after edits
+        term = self.search_var.get().strip()
+        if term:
+            try:
+                index = self._index.index()
+            except Exception as e:
+                messagebox.showerror("База данных", f"Не удалось загрузить клиентов:\n{e}")
+                return
+            self.table.set_rows([index.clients[i] for i in index.search(term)], keep_state=True)
+        elif self.db:
+            # Без поиска таблица читает из БД только видимые страницы
+            try:
+                count = self.db.count_clients()
+            except Exception as e:
+                messagebox.showerror("База данных", f"Не удалось загрузить клиентов:\n{e}")
+                count = 0
+            self.table.set_source(
+                count,
+                lambda offset, limit: self.db.list_clients(limit=limit, offset=offset),
+                keep_state=True,
+                locate=self.db.client_position,
+            )
         else:
-            self._filtered = [c for c in self._dataset if term in c.get("fio", "").lower() or term in c.get("phone", "").lower()]
-        self._refresh_view()
-
-    def _refresh_view(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for idx, item in enumerate(self._filtered):
-            masked_phone = format_phone_mask(item.get("phone", ""))
-            self.tree.insert("", "end", iid=str(idx), values=(item.get("fio", ""), masked_phone))
-
-    def _selected_index(self):
-        sel = self.tree.selection()
-        if not sel:
+            self.table.set_rows(self._dataset, keep_state=True)
+
+    def _selected_client(self) -> dict | None:
+        item = self.table.selected_row()
+        if item is None:
             messagebox.showinfo("Выбор", "Пожалуйста, выберите запись.")
-            return None
-        return int(sel[0])
+        return item
 
     def _add(self):
         ClientForm(self, on_save=self._on_add_save)
@@ -116,10 +128,9 @@ class ClientsView(ttk.Frame):
         self._reload()
 
     def _edit(self):
-        idx = self._selected_index()
-        if idx is None:
+        item = self._selected_client()
+        if item is None:
             return
-        item = self._filtered[idx]
         ClientForm(self, initial=item.copy(), on_save=lambda d: self._on_edit_save(item, d))
 
     def _on_edit_save(self, original_item: dict, data: dict):
@@ -133,10 +144,9 @@ class ClientsView(ttk.Frame):
         self._reload()
 
     def _delete(self):
-        idx = self._selected_index()
-        if idx is None:
+        item = self._selected_client()
+        if item is None:
             return
-        item = self._filtered[idx]
         if messagebox.askyesno("Удалить", "Удалить выбранного клиента?"):
             try:
                 if self.db and item.get("id") is not None:
@@ -0,0 +1,101 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from app.utils import center_on_screen
+
+
+class ConfirmImportDialog(tk.Toplevel):
+    """
+    Сверка подтверждения/накладной поставщика с заказами МКЛ (app/confirm.py):
+    по каждой строке файла — сколько покрыто заказами и какими. «Применить»
+    переводит все совпавшие заказы в выбранный статус одной транзакцией.
+    """
+
+    COLUMNS = ("lineno", "product", "sph", "cyl", "ax", "add", "bc", "qty", "matched", "orders")
+    HEADERS = {
+        "lineno": "Строка", "product": "Товар", "sph": "Sph", "cyl": "Cyl", "ax": "Ax", "add": "ADD", "bc": "BC",
+        "qty": "В файле", "matched": "Покрыто", "orders": "Заказов",
+    }
+
+    def __init__(self, master, db, path: str, statuses, on_applied=None):
+        from app.confirm import ConfirmationImport, iter_confirmation
+        from app.supplier import ORDERED
+
+        # Файл читается до создания окна: ошибка чтения не оставит пустой диалог
+        importer = ConfirmationImport(db)
+        lines = importer.reconcile(iter_confirmation(path))
+        super().__init__(master)
+        self.db = db
+        self.on_applied = on_applied
+        self.importer = importer
+        self.lines = lines
+        self.status_var = tk.StringVar(value=ORDERED)
+        self.statuses = list(statuses)
+
+        self.title("Подтверждение поставщика")
+        self.configure(bg="#f8fafc")
+        self.geometry("960x560")
+        try:
+            center_on_screen(self)
+        except Exception:
+            pass
+        self.transient(master)
+        self._build_ui(path)
+
+    def _order_ids(self) -> list[int]:
+        return [oid for line in self.lines for oid in line["order_ids"]]
+
+    def _build_ui(self, path: str):
+        import os
+
+        unmatched = sum(1 for l in self.lines if l["matched"] < l["qty"])
+        ttk.Label(
+            self,
+            text=f"{os.path.basename(path)}: строк {len(self.lines)} • совпало заказов {len(self._order_ids())} • "
+                 f"строк без полного совпадения {unmatched}",
+            style="Subtitle.TLabel",
+        ).pack(anchor="w", padx=12, pady=(12, 8))
+
+        frame = ttk.Frame(self, style="Card.TFrame")
+        frame.pack(fill="both", expand=True, padx=12)
+        tree = ttk.Treeview(frame, columns=self.COLUMNS, show="headings")
+        for col in self.COLUMNS:
+            tree.heading(col, text=self.HEADERS[col], anchor="w" if col == "product" else "center")
+            tree.column(col, width=260 if col == "product" else 70, anchor="w" if col == "product" else "center")
+        tree.tag_configure("partial", background="#fef3c7")
+        tree.tag_configure("none", background="#fee2e2")
+        for line in self.lines:
+            values = [line.get(c, "") for c in self.COLUMNS[:-1]] + [len(line["order_ids"])]
+            tag = () if line["matched"] >= line["qty"] else ("partial",) if line["matched"] else ("none",)
+            tree.insert("", "end", values=values, tags=tag)
+        ys = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=ys.set)
+        tree.grid(row=0, column=0, sticky="nsew")
+        ys.grid(row=0, column=1, sticky="ns")
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(0, weight=1)
+
+        btns = ttk.Frame(self, style="Card.TFrame")
+        btns.pack(fill="x", padx=12, pady=12)
+        ttk.Label(btns, text="Новый статус:", style="Subtitle.TLabel").pack(side="left")
+        ttk.Combobox(btns, textvariable=self.status_var, values=self.statuses, state="readonly", width=14).pack(side="left", padx=(8, 0))
+        ttk.Button(btns, text="Закрыть", style="Menu.TButton", command=self.destroy).pack(side="right")
+        state = "normal" if self._order_ids() else "disabled"
+        ttk.Button(btns, text="Применить", style="Menu.TButton", command=self._apply, state=state).pack(side="right", padx=(0, 8))
+
+    def _apply(self):
+        from datetime import datetime
+
+        ids = self._order_ids()
+        status = self.status_var.get()
+        if not messagebox.askyesno("Подтверждение поставщика", f"Перевести {len(ids)} заказ(ов) в «{status}»?", parent=self):
+            return
+        try:
+            changed = self.importer.apply(ids, status, datetime.now().strftime("%Y-%m-%d %H:%M"))
+        except Exception as e:
+            messagebox.showerror("База данных", f"Не удалось обновить статусы:\n{e}", parent=self)
+            return
+        messagebox.showinfo("Подтверждение поставщика", f"Изменено заказов: {changed}", parent=self)
+        self.destroy()
+        if callable(self.on_applied):
+            self.on_applied()
@@ -1,10 +1,12 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from tkinter import font as tkfont
 from datetime import datetime
 
 from app.utils import set_initial_geometry
 from app.utils import create_tooltip
+from app.table import ColumnAutosizer
+from app.catalog import catalog_index
+from app.search import rank_products
 
 
 class MeridianProductPickerInline(ttk.Frame):
@@ -81,11 +83,20 @@ class MeridianProductPickerInline(ttk.Frame):
         y_scroll.grid(row=1, column=0, rowspan=3, sticky="nse")
         x_scroll.grid(row=4, column=0, sticky="ew", padx=(0, 8))
         self.tree.bind("<Double-1>", self._on_tree_dbl)
-        try:
-            self.tree.bind("<Configure>", lambda e: self._autosize_tree_column())
-            self.bind("<Configure>", lambda e: self._autosize_tree_column())
-        except Exception:
-            pass
+        # Ширина колонки дерева зависит только от названий: пересчёт после загрузки, не при ресайзе
+        self._tree_sizer = ColumnAutosizer(
+            self.tree,
+            ("#0",),
+            {"#0": "Группы / Товары"},
+            rows=self._tree_rows,
+            row_values=lambda r: ((self.tree.item(r[0], "text") or "", r[1]),),
+            padding=32,
+            min_width=240,
+            fit=False,
+            stretch=False,
+            lock_min=True,
+            on_apply=lambda w: self.columnconfigure(0, minsize=w["#0"] + 16),
+        )
 
         # Right panel params
         right = ttk.Frame(self, style="Card.TFrame")
@@ -209,10 +220,7 @@ class MeridianProductPickerInline(ttk.Frame):
         self.basket.configure(yscroll=y2.set)
         self.basket.grid(row=3, column=1, sticky="nsew")
         y2.grid(row=3, column=1, sticky="nse")
-        try:
-            self.basket.bind("<Configure>", lambda e: self._autosize_basket_columns())
-        except Exception:
-            pass
+        self._basket_sizer = ColumnAutosizer(self.basket, cols, headers, padding=24)
 
         # Footer
         foot = ttk.Frame(self, style="Card.TFrame")
@@ -245,27 +253,23 @@ class MeridianProductPickerInline(ttk.Frame):
         term = (self.search_var.get() or "").strip().lower()
         self.tree.delete(*self.tree.get_children())
 
-        # Fetch groups and build parent->children map
+        # Каталог из индекса в памяти: при вводе в поиск БД не читается
         try:
-            groups = self.db.list_product_groups_meridian()
-        except Exception:
-            groups = []
-        try:
-            all_products = self.db.list_products_meridian()
+            index = catalog_index(self.db, "meridian")
+            if term:
+                # Нечёткий поиск: порядок слов, опечатки, раскладка; лучшие совпадения — выше
+                result = index.filter(term, rank_products(self.db, "meridian", term), ranked=True)
+            else:
+                result = index.filter(term)
         except Exception:
-            all_products = []
+            return
 
-        if not groups:
+        if not index.groups:
             # Fallback: flat list of all products
             root = self.tree.insert("", "end", text="Все товары", open=True, tags=("group", "gid:None"))
-            any_found = False
-            for p in all_products:
-                name = p.get("name", "") or ""
-                if term and term not in name.lower():
-                    continue
-                any_found = True
-                self.tree.insert(root, "end", text=name, tags=("product", f"pid:{p.get('id')}", "gid:None"))
-            if term and not any_found:
+            for p in result["ungrouped"]:
+                self.tree.insert(root, "end", text=p.get("name", "") or "", tags=("product", f"pid:{p.get('id')}", "gid:None"))
+            if term and not result["ungrouped"]:
                 self.tree.insert(root, "end", text="(Ничего не найдено)", tags=("info",))
             try:
                 self._autosize_tree_column()
@@ -273,53 +277,21 @@ class MeridianProductPickerInline(ttk.Frame):
                 pass
             return
 
-        # Build group tree
-        children_map: dict[int | None, list[dict]] = {}
-        for g in groups:
-            children_map.setdefault(g.get("parent_id"), []).append(g)
-        # Sort siblings by sort_order then name
-        for k in list(children_map.keys()):
-            children_map[k].sort(key=lambda x: (x.get("sort_order", 0), (x.get("name", "") or "").lower()))
-
-        # Helper to insert group nodes recursively; returns True if any match added
-        def add_group_node(parent_iid: str, g: dict) -> bool:
+        # Build group tree (when searching, only groups with matches in their subtree)
+        def add_group_node(parent_iid: str, gnode: dict):
+            g = gnode["group"]
             gid = g["id"]
             node_iid = self.tree.insert(parent_iid, "end", text=g["name"], open=bool(term), tags=("group", f"gid:{gid}"))
-            any_added = False
+            # Child groups first, then products of this group
+            for child in gnode["children"]:
+                add_group_node(node_iid, child)
+            for p in gnode["products"]:
+                self.tree.insert(node_iid, "end", text=p.get("name", "") or "", tags=("product", f"pid:{p['id']}", f"gid:{gid}"))
 
-            # Insert child groups first
-            for child in children_map.get(gid, []):
-                if add_group_node(node_iid, child):
-                    any_added = True
+        for gnode in result["groups"]:
+            add_group_node("", gnode)
 
-            # Then insert products of this group
-            try:
-                prods = self.db.list_products_meridian_by_group(gid)
-            except Exception:
-                prods = []
-            for p in prods:
-                name = (p.get("name", "") or "")
-                if term and term not in name.lower():
-                    continue
-                self.tree.insert(node_iid, "end", text=name, tags=("product", f"pid:{p['id']}", f"gid:{gid}"))
-                any_added = True
-
-            # If nothing added and term is set, remove empty branch
-            if term and not any_added:
-                try:
-                    self.tree.delete(node_iid)
-                except Exception:
-                    pass
-                return False
-            return True
-
-        any_found_total = False
-        # Create a virtual root container to hold top-level groups
-        for top in children_map.get(None, []):
-            if add_group_node("", top):
-                any_found_total = True
-
-        if term and not any_found_total:
+        if term and not result["groups"]:
             self.tree.insert("", "end", text="(Ничего не найдено)", tags=("info",))
         try:
             self._autosize_tree_column()
@@ -392,19 +364,19 @@ class MeridianProductPickerInline(ttk.Frame):
                 pass
         qty = self._snap_int(str(self.qty_var.get()), 1, 20, allow_empty=False)
 
-        merged = False
+        changed = None
         for it in self._basket:
             if it["product"] == product and it["sph"] == sph and it["cyl"] == cyl and it["ax"] == ax and (it.get("add","") == add) and it["d"] == d:
                 try:
                     it["qty"] = str(int(it.get("qty", "0")) + int(qty))
                 except Exception:
                     it["qty"] = str(qty)
-                merged = True
+                changed = it
                 break
-        if not merged:
-            item = {"product": product, "sph": sph, "cyl": cyl, "ax": ax, "add": add, "d": d, "qty": qty}
-            self._basket.append(item)
-        self._refresh_basket()
+        if changed is None:
+            changed = {"product": product, "sph": sph, "cyl": cyl, "ax": ax, "add": add, "d": d, "qty": qty}
+            self._basket.append(changed)
+        self._refresh_basket(changed)
 
         # Reset inputs
         try:
@@ -417,13 +389,21 @@ class MeridianProductPickerInline(ttk.Frame):
         except Exception:
             pass
 
-    def _refresh_basket(self):
+    @staticmethod
+    def _basket_values(it: dict) -> tuple:
+        return (it["product"], it["sph"], it["cyl"], it["ax"], it.get("add",""), it["d"], it["qty"])
+
+    def _refresh_basket(self, changed: dict | None = None):
+        """Перерисовать корзину; changed — добавленная/увеличенная позиция (колонки только расширяются)."""
         for i in self.basket.get_children():
             self.basket.delete(i)
         for idx, it in enumerate(self._basket):
-            self.basket.insert("", "end", iid=str(idx), values=(it["product"], it["sph"], it["cyl"], it["ax"], it.get("add",""), it["d"], it["qty"]))
+            self.basket.insert("", "end", iid=str(idx), values=self._basket_values(it))
         try:
-            self._autosize_basket_columns()
+            if changed is not None:
+                self._basket_sizer.rows_added([self._basket_values(changed)])
+            else:
+                self._autosize_basket_columns()
         except Exception:
             pass
 
@@ -449,66 +429,19 @@ class MeridianProductPickerInline(ttk.Frame):
             self._refresh_basket()
 
     # Autosize helpers
+    def _tree_rows(self) -> list[tuple[str, int]]:
+        """Узлы верхнего уровня и их дети (с отступом) для подбора ширины колонки дерева."""
+        rows = []
+        for iid in self.tree.get_children(""):
+            rows.append((iid, 0))
+            rows.extend((child, 24) for child in self.tree.get_children(iid))
+        return rows
+
     def _autosize_tree_column(self):
-        try:
-            f = tkfont.nametofont("TkDefaultFont")
-        except Exception:
-            f = tkfont.Font()
-        padding = 32
-        maxw = f.measure("Группы / Товары") + padding
-        try:
-            for iid in self.tree.get_children(""):
-                text = str(self.tree.item(iid, "text") or "")
-                w = f.measure(text) + padding
-                if w > maxw:
-                    maxw = w
-                for child in self.tree.get_children(iid):
-                    t = str(self.tree.item(child, "text") or "")
-                    w2 = f.measure(t) + padding + 24
-                    if w2 > maxw:
-                        maxw = w2
-        except Exception:
-            pass
-        width = max(240, int(maxw))
-        try:
-            self.tree.column("#0", width=width, minwidth=width, stretch=False)
-        except Exception:
-            pass
-        try:
-            self.columnconfigure(0, minsize=width + 16)
-        except Exception:
-            pass
+        self._tree_sizer.invalidate()
 
     def _autosize_basket_columns(self):
-        try:
-            f = tkfont.nametofont("TkDefaultFont")
-        except Exception:
-            f = tkfont.Font()
-        padding = 24
-        headers = {"product": "Товар", "sph": "SPH", "cyl": "CYL", "ax": "AX", "add": "ADD", "d": "D (мм)", "qty": "Кол-во"}
-        cols = ("product", "sph", "cyl", "ax", "add", "d", "qty")
-        max_px = {}
-        for c in cols:
-            max_px[c] = max(60, f.measure(headers[c]) + padding)
-        for iid in self.basket.get_children(""):
-            vals = self.basket.item(iid, "values") or ()
-            for i, c in enumerate(cols):
-                if i >= len(vals):
-                    continue
-                w = f.measure(str(vals[i])) + padding
-                if w > max_px[c]:
-                    max_px[c] = w
-        try:
-            avail = max(300, self.basket.winfo_width())
-        except Exception:
-            avail = sum(max_px.values())
-        total = sum(max_px.values())
-        if total > avail:
-            ratio = avail / total
-            for c in cols:
-                max_px[c] = max(60, int(max_px[c] * ratio))
-        for c in cols:
-            self.basket.column(c, width=max_px[c], minwidth=60, stretch=True)
+        self._basket_sizer.invalidate()
 
     def _done(self):
         items = list(self._basket)
@@ -7,6 +7,9 @@ from app.utils import create_tooltip
 from app.utils import format_phone_mask
 from app.utils import set_initial_geometry
 from app.utils import center_on_screen
+from app.utils import debounce
+from app.catalog import catalog_index
+from app.search import ClientIndexTask, rank_products
 
 
 class SelectClientDialog(tk.Toplevel):
@@ -22,6 +25,7 @@ class SelectClientDialog(tk.Toplevel):
 
         self._clients = clients[:]
         self._on_select = on_select
+        self._index = ClientIndexTask(self._clients)  # строится в фоне, пока окно открывается
 
         card = ttk.Frame(self, style="Card.TFrame", padding=12)
         card.pack(fill="both", expand=True)
@@ -31,7 +35,7 @@ class SelectClientDialog(tk.Toplevel):
         self.search_var = tk.StringVar()
         ent = ttk.Entry(card, textvariable=self.search_var)
         ent.grid(row=1, column=0, sticky="ew")
-        ent.bind("<KeyRelease>", lambda e: self._filter())
+        ent.bind("<KeyRelease>", debounce(self, 150, self._filter))
 
         self.listbox = tk.Listbox(card)
         self.listbox.grid(row=2, column=0, sticky="nsew", pady=(8, 8))
@@ -59,16 +63,12 @@ class SelectClientDialog(tk.Toplevel):
             self.listbox.insert("end", self._format_item(c))
 
     def _filter(self):
-        term = (self.search_var.get() or "").strip().lower()
+        term = (self.search_var.get() or "").strip()
         if not term:
             self._reload(self._clients)
             return
-        filtered = []
-        for c in self._clients:
-            merged = f"{c.get('fio','')} {c.get('phone','')}".lower()
-            if term in merged:
-                filtered.append(c)
-        self._reload(filtered)
+        # Listbox не виртуальный: показываем лучшие совпадения
+        self._reload([self._clients[i] for i in self._index.index().search(term, limit=500)])
 
     def _ok(self):
         try:
@@ -135,96 +135,44 @@ class SelectProductDialog(tk.Toplevel):
         # Clear
         for iid in self.tree.get_children():
             self.tree.delete(iid)
-        groups = []
-        try:
-            groups = self._db.list_product_groups_mkl()
-        except Exception:
-            groups = []
-        # Ungrouped first
-        ungrouped = []
+        # Каталог из индекса в памяти: при вводе в поиск БД не читается
         try:
-            ungrouped = self._db.list_products_mkl_by_group(None)
+            index = catalog_index(self._db, "mkl")
+            if term:
+                # Нечёткий поиск: порядок слов, опечатки, раскладка; лучшие совпадения — выше
+                result = index.filter(term, rank_products(self._db, "mkl", term), ranked=True)
+            else:
+                result = index.filter(term)
         except Exception:
-            ungrouped = []
+            return
         # If no groups at all, show flat list under a single root
-        if not groups:
+        if not index.groups:
             root = self.tree.insert("", "end", text="Все товары", open=True, tags=("group", "gid:None"))
-            any_found = False
-            for p in ungrouped:
-                name = (p.get("name", "") or "")
-                if term and term not in name.lower():
-                    continue
-                any_found = True
-                self.tree.insert(root, "end", text=name, tags=("product", f"pid:{p.get('id')}", "gid:None"))
-            if term and not any_found:
+            for p in result["ungrouped"]:
+                self.tree.insert(root, "end", text=p.get("name", "") or "", tags=("product", f"pid:{p.get('id')}", "gid:None"))
+            if term and not result["ungrouped"]:
                 self.tree.insert(root, "end", text="(Ничего не найдено)", tags=("info",))
             return
 
         # Ungrouped section
-        if ungrouped:
+        if index.by_group.get(None):
             node = self.tree.insert("", "end", text="Без группы", open=bool(term), tags=("group", "gid:None"))
-            for p in ungrouped:
-                name = (p.get("name", "") or "")
-                if term and term not in name.lower():
-                    continue
-                self.tree.insert(node, "end", text=name, tags=("product", f"pid:{p.get('id')}", "gid:None"))
-
-        # Build hierarchy map
-        children_map = {}
-        for g in groups:
-            pid = g.get("parent_id")
-            children_map.setdefault(pid, []).append(g)
-
-        any_found = False
-
-        def add_group_node(parent_item, gdict):
-            # Filter groups if searching: only include groups that have matching products in subtree
-            try:
-                prods = self._db.list_products_mkl_by_group(gdict["id"])
-            except Exception:
-                prods = []
-            matched_prods = []
-            if term:
-                for p in prods:
-                    n = (p.get("name", "") or "")
-                    if term in n.lower():
-                        matched_prods.append(p)
-            else:
-                matched_prods = prods
-
-            # For searching: if neither products nor child groups match, skip this group
-            has_child_match = False
-            if term:
-                for child in children_map.get(gdict["id"], []):
-                    # naive: include child if any product under it matches term
-                    try:
-                        cps = self._db.list_products_mkl_by_group(child["id"])
-                    except Exception:
-                        cps = []
-                    for p in cps:
-                        if term in ((p.get("name", "") or "").lower()):
-                            has_child_match = True
-                            break
-                    if has_child_match:
-                        break
-
-            if term and not matched_prods and not has_child_match:
-                return
-
-            node = self.tree.insert(parent_item, "end", text=gdict["name"], open=bool(term), tags=("group", f"gid:{gdict['id']}"))
-            for p in matched_prods:
-                name = (p.get("name", "") or "")
-                self.tree.insert(node, "end", text=name, tags=("product", f"pid:{p['id']}", f"gid:{gdict['id']}"))
-                any_found = True
-
-            for child in children_map.get(gdict["id"], []):
+            for p in result["ungrouped"]:
+                self.tree.insert(node, "end", text=p.get("name", "") or "", tags=("product", f"pid:{p.get('id')}", "gid:None"))
+
+        def add_group_node(parent_item, gnode):
+            g = gnode["group"]
+            node = self.tree.insert(parent_item, "end", text=g["name"], open=bool(term), tags=("group", f"gid:{g['id']}"))
+            for p in gnode["products"]:
+                self.tree.insert(node, "end", text=p.get("name", "") or "", tags=("product", f"pid:{p['id']}", f"gid:{g['id']}"))
+            for child in gnode["children"]:
                 add_group_node(node, child)
 
-        # Top-level groups
-        for g in children_map.get(None, []):
-            add_group_node("", g)
+        # Top-level groups (when searching, only groups with matches in their subtree)
+        for gnode in result["groups"]:
+            add_group_node("", gnode)
 
-        if term and not any_found and not ungrouped:
+        if term and not result["groups"] and not index.by_group.get(None):
             self.tree.insert("", "end", text="(Ничего не найдено)", tags=("info",))
 
     def _on_dbl_click(self, event):
@@ -257,7 +205,7 @@ class SelectProductDialog(tk.Toplevel):
 
 class NewMKLOrderView(ttk.Frame):
     """Полноэкранная форма нового заказа МКЛ внутри приложения."""
-    def __init__(self, master: tk.Tk, db, on_back, on_submit):
+    def __init__(self, master: tk.Tk, db, on_back, on_submit, initial: dict | None = None):
         super().__init__(master, style="Card.TFrame", padding=0)
         self.master = master
         self.db = db
@@ -274,8 +222,9 @@ class NewMKLOrderView(ttk.Frame):
         self.products = self.db.list_products_mkl() if self.db else []
 
         # Vars
-        self.fio_var = tk.StringVar()
-        self.phone_var = tk.StringVar()
+        # initial — предзаполнение клиента (например, команда new_mkl_order из app/ipc.py)
+        self.fio_var = tk.StringVar(value=(initial or {}).get("fio", ""))
+        self.phone_var = tk.StringVar(value=format_phone_mask((initial or {}).get("phone", "")))
         # Lens parameters and extras
         self.sph_var = tk.StringVar()
         self.cyl_var = tk.StringVar()
@@ -2,7 +2,9 @@ import tkinter as tk
 from tkinter import ttk, filedialog, font
 
 from app.db import AppDB
-from app.utils import set_initial_geometry, fade_transition
+from app.utils import set_initial_geometry, fade_transition, status_badge_lines
+from app.tray import _update_tray_title
+from app.navigation import view_pool
 
 
 class MainWindow:
@@ -33,6 +35,10 @@ class MainWindow:
 
         container = ttk.Frame(self.root)
         container.grid(row=0, column=0, sticky="nsew")
+        # Меню живёт в пуле экранов: при возврате обновляются только бейджи
+        container.refresh_if_stale = self._refresh_stats
+        container.owner = self  # open_view() переходит на экраны через методы меню
+        self.container = container
 
         # Configure large button style for better visibility
         try:
@@ -44,7 +50,7 @@ class MainWindow:
         except Exception:
             pass
 
-        # Main menu - vertical stack: MKL, Meridian, Prices, Astig Calc, Settings
+        # Main menu - vertical stack: MKL, Meridian, Prices, Reports, Astig Calc, Settings
         menu = ttk.Frame(container)
         menu.grid(row=0, column=0, sticky="nsew", padx=48, pady=48)
         try:
@@ -57,75 +63,103 @@ class MainWindow:
         ttk.Button(menu, text="Заказы МКЛ", command=self._open_mkl, **btn_opts).pack(fill="x", pady=10)
         ttk.Button(menu, text="Заказы Меридиан", command=self._open_meridian, **btn_opts).pack(fill="x", pady=10)
         ttk.Button(menu, text="Прайсы", command=self._open_prices, **btn_opts).pack(fill="x", pady=10)
+        ttk.Button(menu, text="Отчёты", command=self._open_reports, **btn_opts).pack(fill="x", pady=10)
         ttk.Button(menu, text="Пересчёт астигматических линз", command=self._open_astig, **btn_opts).pack(fill="x", pady=10)
         ttk.Button(menu, text="Настройки…", command=self._open_settings, **btn_opts).pack(fill="x", pady=10)
 
+        # Бейджи по статусам (материализованные счётчики, без чтения заказов)
+        self.stats_label = ttk.Label(menu, text="", style="Subtitle.TLabel", justify="left")
+        self.stats_label.pack(anchor="w", pady=(16, 0))
+
     def _refresh_stats(self):
-        # На главном экране счётчики скрыты; оставим заглушку для совместимости.
         try:
-            _ = self.root.db
+            counts = self.root.db.status_counts()
+        except Exception:
+            counts = {}
+        lines = status_badge_lines(counts)
+        try:
+            self.stats_label.configure(text="\n".join(lines) if lines else "Нет незаказанных заказов")
+        except Exception:
+            pass
+        try:
+            _update_tray_title(self.root)
         except Exception:
             pass
 
     # Navigation
     def _open_clients(self):
         def swap():
-            self._clear_root_frames()
+            view_pool(self.root).hide_all()
             from app.views.clients import ClientsView
-            ClientsView(self.root, self.root.db, on_back=lambda: MainWindow(self.root))
+            ClientsView(self.root, self.root.db, on_back=lambda: open_main(self.root))
         fade_transition(self.root, swap)
 
     def _open_products(self):
         def swap():
-            self._clear_root_frames()
+            view_pool(self.root).hide_all()
             from app.views.products import ProductsView
-            ProductsView(self.root, self.root.db, on_back=lambda: MainWindow(self.root))
+            ProductsView(self.root, self.root.db, on_back=lambda: open_main(self.root))
         fade_transition(self.root, swap)
 
     def _open_mkl(self):
-        def swap():
-            self._clear_root_frames()
-            from app.views.orders_mkl import MKLOrdersView
-            MKLOrdersView(self.root, on_back=lambda: MainWindow(self.root))
-        fade_transition(self.root, swap)
+        fade_transition(self.root, lambda: open_mkl(self.root))
 
     def _open_meridian(self):
-        def swap():
-            self._clear_root_frames()
-            from app.views.orders_meridian import MeridianOrdersView
-            MeridianOrdersView(self.root, on_back=lambda: MainWindow(self.root))
-        fade_transition(self.root, swap)
+        fade_transition(self.root, lambda: open_meridian(self.root))
 
     def _open_prices(self):
         def swap():
-            self._clear_root_frames()
             from app.views.prices import PricesView
-            PricesView(self.root, on_back=lambda: MainWindow(self.root))
+            view_pool(self.root).show("prices", lambda: PricesView(self.root, on_back=lambda: open_main(self.root)))
+        fade_transition(self.root, swap)
+
+    def _open_reports(self):
+        def swap():
+            from app.views.reports import ReportsView
+            view_pool(self.root).show("reports", lambda: ReportsView(self.root, on_back=lambda: open_main(self.root)))
         fade_transition(self.root, swap)
 
     def _open_astig(self):
         def swap():
-            self._clear_root_frames()
             from app.views.astig_calc import AstigCalcView
-            AstigCalcView(self.root, on_back=lambda: MainWindow(self.root))
+            view_pool(self.root).show("astig", lambda: AstigCalcView(self.root, on_back=lambda: open_main(self.root)))
         fade_transition(self.root, swap)
 
     def _open_settings(self):
-        # Открывать настройки во встроенном виде (не отдельным окном)
+        # Открывать настройки во встроенном виде (не отдельным окном); форма строится заново со свежими значениями
         def swap():
-            self._clear_root_frames()
+            view_pool(self.root).hide_all()
             from app.views.settings import SettingsView
-            SettingsView(self.root, on_back=lambda: MainWindow(self.root))
+            SettingsView(self.root, on_back=lambda: open_main(self.root))
         fade_transition(self.root, swap)
 
-    def _clear_root_frames(self):
-        try:
-            for child in self.root.winfo_children():
-                try:
-                    child.destroy()
-                except Exception:
-                    pass
-        except Exception:
-            pass
 
-    
\ No newline at end of file
+# Экраны из пула: при возврате показываются готовыми, данные перечитываются только если изменились
+def open_main(root: tk.Tk):
+    return view_pool(root).show("main", lambda: MainWindow(root).container)
+
+
+def open_mkl(root: tk.Tk):
+    from app.views.orders_mkl import MKLOrdersView
+    return view_pool(root).show("mkl", lambda: MKLOrdersView(root, on_back=lambda: open_main(root)))
+
+
+def open_meridian(root: tk.Tk):
+    from app.views.orders_meridian import MeridianOrdersView
+    return view_pool(root).show("meridian", lambda: MeridianOrdersView(root, on_back=lambda: open_main(root)))
+
+
+VIEWS = ("main", "mkl", "meridian", "clients", "products", "prices", "reports", "astig", "settings")
+
+
+def open_view(root: tk.Tk, name: str):
+    """Открыть экран по имени (команда open из app/ipc.py) так же, как кнопкой главного меню."""
+    if name not in VIEWS:
+        raise ValueError(f"неизвестный экран: {name}")
+    if name == "main":
+        return open_main(root)
+    if name == "mkl":
+        return open_mkl(root)
+    if name == "meridian":
+        return open_meridian(root)
+    getattr(open_main(root).owner, f"_open_{name}")()
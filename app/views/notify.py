@@ -172,6 +172,139 @@ def show_mkl_notification(master: tk.Tk, pending_orders: list[dict], on_snooze_d
         except Exception:
             pass
 
+def show_reorder_notification(master: tk.Tk, due_items: list[dict], on_snooze_days, on_dismiss):
+    """Popup reminder: clients whose contact lenses are about to run out (re-order due)."""
+    _play_sound(master)
+    try:
+        win = tk.Toplevel(master)
+        win.title("Уведомление • Повторный заказ МКЛ")
+        win.configure(bg="#f8fafc")
+        win.transient(master)
+        win.grab_set()
+        try:
+            win.attributes("-topmost", True)
+        except Exception:
+            pass
+
+        card = ttk.Frame(win, style="Card.TFrame", padding=16)
+        card.pack(fill="both", expand=True)
+        card.columnconfigure(0, weight=1)
+
+        header = ttk.Label(card, text="У клиентов заканчиваются контактные линзы", style="Title.TLabel")
+        header.grid(row=0, column=0, sticky="w")
+        sub = ttk.Label(card, text=f"Всего: {len(due_items)}. Позвоните клиентам и предложите повторный заказ.", style="Subtitle.TLabel")
+        sub.grid(row=1, column=0, sticky="w", pady=(4, 8))
+
+        # Show sample: fio, phone, product, run-out date
+        try:
+            from app.utils import format_phone_mask
+            cols = ("fio", "phone", "product", "run_out")
+            tree = ttk.Treeview(card, columns=cols, show="headings", height=8, style="Data.Treeview")
+            tree.heading("fio", text="Клиент", anchor="w")
+            tree.heading("phone", text="Телефон", anchor="w")
+            tree.heading("product", text="Товар", anchor="w")
+            tree.heading("run_out", text="Закончатся", anchor="w")
+            tree.column("fio", width=220, anchor="w")
+            tree.column("phone", width=160, anchor="w")
+            tree.column("product", width=280, anchor="w")
+            tree.column("run_out", width=120, anchor="w")
+            for o in due_items[:50]:
+                tree.insert("", "end", values=(o.get("fio",""), format_phone_mask(o.get("phone","")), o.get("product",""), o.get("run_out","")))
+            tree.grid(row=2, column=0, sticky="nsew")
+            card.rowconfigure(2, weight=1)
+        except Exception:
+            pass
+
+        ttk.Separator(card).grid(row=3, column=0, sticky="ew", pady=(8, 8))
+
+        btns = ttk.Frame(card, style="Card.TFrame")
+        btns.grid(row=4, column=0, sticky="e")
+        ttk.Button(btns, text="Отложить 1 день", style="Menu.TButton", command=lambda: (_safe(on_snooze_days, 1), win.destroy())).pack(side="right")
+        ttk.Button(btns, text="Отложить 3 дня", style="Menu.TButton", command=lambda: (_safe(on_snooze_days, 3), win.destroy())).pack(side="right", padx=(8, 0))
+        ttk.Button(btns, text="Больше не напоминать", style="Menu.TButton", command=lambda: (_safe(on_dismiss), win.destroy())).pack(side="right", padx=(8, 0))
+        ttk.Button(btns, text="Закрыть", style="Back.TButton", command=win.destroy).pack(side="right", padx=(8, 0))
+
+        # Center relative to master
+        try:
+            master.update_idletasks()
+            win.update_idletasks()
+            sw = master.winfo_rootx()
+            sh = master.winfo_rooty()
+            mw = master.winfo_width()
+            mh = master.winfo_height()
+            ww = win.winfo_width()
+            wh = win.winfo_height()
+            x = sw + (mw // 2) - (ww // 2)
+            y = sh + (mh // 2) - (wh // 2)
+            win.geometry(f"+{x}+{y}")
+        except Exception:
+            pass
+    except Exception:
+        try:
+            messagebox.showinfo("Уведомление", f"Клиентов для повторного заказа: {len(due_items)}")
+        except Exception:
+            pass
+
+def show_rule_notification(master: tk.Tk, title: str, order_type: str, orders: list[dict], on_snooze_days):
+    """Popup for a user-defined notification rule (app/rules.py): matching MKL or Meridian orders."""
+    _play_sound(master)
+    try:
+        win = tk.Toplevel(master)
+        win.title(f"Уведомление • {title}")
+        win.configure(bg="#f8fafc")
+        win.transient(master)
+        win.grab_set()
+        try:
+            win.attributes("-topmost", True)
+        except Exception:
+            pass
+
+        card = ttk.Frame(win, style="Card.TFrame", padding=16)
+        card.pack(fill="both", expand=True)
+        card.columnconfigure(0, weight=1)
+
+        ttk.Label(card, text=title, style="Title.TLabel").grid(row=0, column=0, sticky="w")
+        ttk.Label(card, text=f"Подходящих заказов: {len(orders)}.", style="Subtitle.TLabel").grid(row=1, column=0, sticky="w", pady=(4, 8))
+
+        try:
+            if order_type == "mkl":
+                cols = (("fio", "Клиент", 240), ("product", "Товар", 240), ("status", "Статус", 120), ("date", "Дата", 160))
+            else:
+                cols = (("title", "Название", 400), ("status", "Статус", 120), ("date", "Дата", 160))
+            tree = ttk.Treeview(card, columns=[c[0] for c in cols], show="headings", height=8, style="Data.Treeview")
+            for key, text, width in cols:
+                tree.heading(key, text=text, anchor="w")
+                tree.column(key, width=width, anchor="w")
+            for o in orders[:50]:
+                tree.insert("", "end", values=[o.get(key, "") for key, _, _ in cols])
+            tree.grid(row=2, column=0, sticky="nsew")
+            card.rowconfigure(2, weight=1)
+        except Exception:
+            pass
+
+        ttk.Separator(card).grid(row=3, column=0, sticky="ew", pady=(8, 8))
+
+        btns = ttk.Frame(card, style="Card.TFrame")
+        btns.grid(row=4, column=0, sticky="e")
+        ttk.Button(btns, text="Отложить 1 день", style="Menu.TButton", command=lambda: (_safe(on_snooze_days, 1), win.destroy())).pack(side="right")
+        ttk.Button(btns, text="Отложить 3 дня", style="Menu.TButton", command=lambda: (_safe(on_snooze_days, 3), win.destroy())).pack(side="right", padx=(8, 0))
+        ttk.Button(btns, text="Закрыть", style="Back.TButton", command=win.destroy).pack(side="right", padx=(8, 0))
+
+        # Center relative to master
+        try:
+            master.update_idletasks()
+            win.update_idletasks()
+            x = master.winfo_rootx() + (master.winfo_width() // 2) - (win.winfo_width() // 2)
+            y = master.winfo_rooty() + (master.winfo_height() // 2) - (win.winfo_height() // 2)
+            win.geometry(f"+{x}+{y}")
+        except Exception:
+            pass
+    except Exception:
+        try:
+            messagebox.showinfo("Уведомление", f"{title}: {len(orders)}")
+        except Exception:
+            pass
+
 def _safe(fn, *args, **kwargs):
     try:
         if callable(fn):
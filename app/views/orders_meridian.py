@@ -1,9 +1,10 @@
-import os
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 
 from app.utils import fade_transition, center_on_screen
+from app.table import VirtualTable
+from app.navigation import view_pool
 from app.db import AppDB  # type hint only
 
 
@@ -28,6 +29,7 @@ class MeridianOrdersView(ttk.Frame):
         self.grid(sticky="nsew")
 
         self.orders: list[dict] = []
+        self._stamp = None  # AppDB.data_stamp("meridian_orders") на момент загрузки заказов
 
         self._build_toolbar()
         self._build_table()
@@ -43,7 +45,8 @@ class MeridianOrdersView(ttk.Frame):
         btn_delete_order = ttk.Button(toolbar, text="Удалить", style="Menu.TButton", command=self._delete_order)
         btn_change_status = ttk.Button(toolbar, text="Сменить статус", style="Menu.TButton", command=self._change_status)
         btn_products = ttk.Button(toolbar, text="Товары", style="Menu.TButton", command=self._open_products)
-        btn_export = ttk.Button(toolbar, text="Экспорт TXT", style="Menu.TButton", command=self._export_txt)
+        self.btn_export = ttk.Button(toolbar, text="Экспорт ▾", style="Menu.TButton", command=self._export)
+        self.export_status = ttk.Label(toolbar, text="", style="Subtitle.TLabel")
 
         btn_back.pack(side="left")
         btn_new_order.pack(side="left", padx=(8, 0))
@@ -51,11 +54,13 @@ class MeridianOrdersView(ttk.Frame):
         btn_delete_order.pack(side="left", padx=(8, 0))
         btn_change_status.pack(side="left", padx=(8, 0))
         btn_products.pack(side="left", padx=(8, 0))
-        btn_export.pack(side="left", padx=(8, 0))
+        self.btn_export.pack(side="left", padx=(8, 0))
+        self.export_status.pack(side="left", padx=(12, 0))
 
     def _go_back(self):
         try:
-            self.destroy()
+            if not view_pool(self.master).owns(self):
+                self.destroy()
         finally:
             cb = getattr(self, "on_back", None)
             if callable(cb):
@@ -75,16 +80,21 @@ class MeridianOrdersView(ttk.Frame):
         table_frame.pack(fill="both", expand=True)
 
         columns = self.COLUMNS
-        self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", style="Data.Treeview")
+        # Виртуальная таблица: число позиций подгружается постранично только для видимых заказов
+        self.table = VirtualTable(
+            table_frame,
+            columns,
+            row_values=lambda o: (o.get("title", ""), o.get("items_count", 0), o.get("status", ""), o.get("date", "")),
+            row_tags=lambda o: (f"status_{o.get('status', 'Не заказан')}",),
+            key=lambda o: o.get("id"),
+        )
+        self.tree = self.table.tree
         for col in columns:
             self.tree.heading(col, text=self.HEADERS[col], anchor="w")
             width = {"title": 360, "items_count": 100, "status": 140, "date": 160}[col]
             self.tree.column(col, width=width, anchor="w", stretch=True)
 
-        y_scroll = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscroll=y_scroll.set)
-        self.tree.grid(row=0, column=0, sticky="nsew")
-        y_scroll.grid(row=0, column=1, sticky="ns")
+        self.table.grid(row=0, column=0, sticky="nsew")
         table_frame.columnconfigure(0, weight=1)
         table_frame.rowconfigure(0, weight=1)
 
@@ -106,43 +116,34 @@ class MeridianOrdersView(ttk.Frame):
 
     def _show_context_menu(self, event):
         try:
-            iid = self.tree.identify_row(event.y)
-            if iid:
-                self.tree.selection_set(iid)
+            idx = self.table.index_at(event.y)
+            if idx is not None:
+                self.table.select_index(idx, see=False)
                 self.menu.tk_popup(event.x_root, event.y_root)
         finally:
             self.menu.grab_release()
 
     def _open_clients(self):
         def swap():
-            try:
-                self.destroy()
-            except Exception:
-                pass
+            view_pool(self.master).hide_all()
             from app.views.clients import ClientsView
-            from app.views.main import MainWindow
-            ClientsView(self.master, getattr(self.master, "db", None), on_back=lambda: MeridianOrdersView(self.master, on_back=lambda: MainWindow(self.master)))
+            from app.views.main import open_meridian
+            ClientsView(self.master, getattr(self.master, "db", None), on_back=lambda: open_meridian(self.master))
         fade_transition(self.master, swap)
 
     def _open_products(self):
         # Откроем без анимации, чтобы исключить проблемы с alpha и событиями
-        try:
-            self.destroy()
-        except Exception:
-            pass
+        view_pool(self.master).hide_all()
         from app.views.products_meridian import ProductsMeridianView
-        from app.views.main import MainWindow
-        ProductsMeridianView(self.master, getattr(self.master, "db", None), on_back=lambda: MeridianOrdersView(self.master, on_back=lambda: MainWindow(self.master)))
+        from app.views.main import open_meridian
+        ProductsMeridianView(self.master, getattr(self.master, "db", None), on_back=lambda: open_meridian(self.master))
 
     def _selected_index(self):
-        sel = self.tree.selection()
-        if not sel:
+        idx = self.table.selected_index()
+        if idx is None or idx >= len(self.orders):
             messagebox.showinfo("Выбор", "Пожалуйста, выберите заказ.")
             return None
-        try:
-            return int(sel[0])
-        except ValueError:
-            return None
+        return idx
 
     def _delete_order(self):
         idx = self._selected_index()
@@ -186,13 +187,10 @@ class MeridianOrdersView(ttk.Frame):
 
     def _new_order(self):
         def swap():
-            try:
-                # Destroy current orders view first to avoid mixed geometry (pack vs grid)
-                self.destroy()
-            except Exception:
-                pass
+            # Список прячется (grid_remove), чтобы форма могла разместиться через pack
+            view_pool(self.master).hide_all()
             from app.views.forms_meridian import MeridianOrderEditorView
-            from app.views.main import MainWindow
+            from app.views.main import open_meridian
 
             def on_save(order: dict):
                 db = getattr(self.master, "db", None)
@@ -213,7 +211,7 @@ class MeridianOrdersView(ttk.Frame):
             MeridianOrderEditorView(
                 self.master,
                 db=getattr(self.master, "db", None),
-                on_back=lambda: MeridianOrdersView(self.master, on_back=lambda: MainWindow(self.master)),
+                on_back=lambda: open_meridian(self.master),
                 on_save=on_save,
                 initial=None,
             )
@@ -236,12 +234,9 @@ class MeridianOrdersView(ttk.Frame):
         initial = {"status": current.get("status", "Не заказан"), "date": current.get("date", ""), "items": items}
 
         def swap():
-            try:
-                self.destroy()
-            except Exception:
-                pass
+            view_pool(self.master).hide_all()
             from app.views.forms_meridian import MeridianOrderEditorView
-            from app.views.main import MainWindow
+            from app.views.main import open_meridian
 
             def on_save(updated: dict):
                 if self.master.db and order_id:
@@ -257,7 +252,7 @@ class MeridianOrdersView(ttk.Frame):
             MeridianOrderEditorView(
                 self.master,
                 db=getattr(self.master, "db", None),
-                on_back=lambda: MeridianOrdersView(self.master, on_back=lambda: MainWindow(self.master)),
+                on_back=lambda: open_meridian(self.master),
                 on_save=on_save,
                 initial=initial,
             )
@@ -296,102 +291,42 @@ class MeridianOrdersView(ttk.Frame):
         except Exception:
             pass
 
+    def refresh_if_stale(self):
+        """Вызывается пулом экранов при возврате: перечитать заказы, только если БД менялась."""
+        db = getattr(self.master, "db", None)
+        if db and db.data_stamp("meridian_orders") != self._stamp:
+            self._refresh_orders_view()
+
     def _refresh_orders_view(self):
         db = getattr(self.master, "db", None)
         if db:
             try:
+                self._stamp = db.data_stamp("meridian_orders")
                 self.orders = db.list_meridian_orders()
             except Exception as e:
                 messagebox.showerror("База данных", f"Не удалось загрузить заказы Меридиан:\n{e}")
                 self.orders = []
         else:
             self.orders = getattr(self, "orders", [])
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for idx, o in enumerate(self.orders):
-            items_count = 0
-            if db and o.get("id") is not None:
-                try:
-                    items_count = len(db.get_meridian_items(o["id"]))
-                except Exception:
-                    items_count = 0
-            values = (o.get("title", ""), items_count, o.get("status", ""), o.get("date", ""))
-            tag = f"status_{o.get('status','Не заказан')}"
-            self.tree.insert("", "end", iid=str(idx), values=values, tags=(tag,))
-        # Auto-select the latest order (first row; list is DESC by id)
-        try:
-            children = self.tree.get_children()
-            if children:
-                self.tree.selection_set(children[0])
-                self.tree.focus(children[0])
-                self.tree.see(children[0])
-        except Exception:
-            pass
-
-    def _export_txt(self):
-        """Экспорт позиций из заказов 'Не заказан' с загрузкой items из БД, сгруппировано по товару."""
+        self.table.set_rows(self.orders, keep_state=True, page_loader=self._with_items_count)
+        # Auto-select the latest order on first load (first row; list is DESC by id)
+        if self.orders and self.table.selected_index() is None:
+            self.table.select_index(0)
+
+    def _with_items_count(self, orders: list[dict]) -> list[dict]:
+        """Страница заказов для таблицы с числом позиций (один запрос на страницу)."""
+        page = [dict(o) for o in orders]
         db = getattr(self.master, "db", None)
-        groups: dict[str, list[dict]] = {}
-        for order in self.orders:
-            if (order.get("status", "") or "").strip() != "Не заказан":
-                continue
-            order_id = order.get("id")
-            items = []
-            if db and order_id is not None:
-                try:
-                    items = db.get_meridian_items(order_id)
-                except Exception:
-                    items = []
-            for it in items:
-                key = (it.get("product", "") or "").strip() or "(Без названия)"
-                groups.setdefault(key, []).append(it)
-
-        if not groups:
-            messagebox.showinfo("Экспорт", "Нет позиций со статусом 'Не заказан' для экспорта.")
-            return
-
-        lines: list[str] = []
-        for product, items in groups.items():
-            lines.append(product)
-            for it in items:
-                parts = []
-                for key, label in (("sph", "Sph"), ("cyl", "Cyl"), ("ax", "Ax"), ("add", "Add")):
-                    val = (it.get(key, "") or "").strip()
-                    if val != "":
-                        parts.append(f"{label}: {val}")
-                dval = (it.get("d", "") or "").strip()
-                if dval != "":
-                    parts.append(f"D:{dval}мм")
-                qty = (it.get("qty", "") or "").strip()
-                if qty != "":
-                    parts.append(f"Количество: {qty}")
-                if parts:
-                    lines.append(" ".join(parts))
-            lines.append("")
-
-        content = "\n".join(lines).strip() + "\n"
-        date_str = datetime.now().strftime("%d.%m.%y")
-        filename = f"MERIDIAN_{date_str}.txt"
-        export_path = getattr(self.master, "app_settings", {}).get("export_path", None)
-        if not export_path:
-            desktop = os.path.join(os.path.expanduser("~"), "Desktop")
-            export_path = desktop if os.path.isdir(desktop) else os.getcwd()
-        filepath = os.path.join(export_path, filename)
-        try:
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(content)
-            messagebox.showinfo("Экспорт", f"Экспорт выполнен:\n{filepath}")
+        counts = {}
+        if db:
             try:
-                import platform, subprocess
-                if hasattr(os, "startfile"):
-                    os.startfile(filepath)
-                else:
-                    sysname = platform.system()
-                    if sysname == "Darwin":
-                        subprocess.run(["open", filepath], check=False)
-                    else:
-                        subprocess.run(["xdg-open", filepath], check=False)
+                counts = db.count_meridian_items([o["id"] for o in page if o.get("id") is not None])
             except Exception:
-                pass
-        except Exception as e:
-            messagebox.showerror("Экспорт", f"Ошибка записи файла:\n{e}")
\ No newline at end of file
+                counts = {}
+        for o in page:
+            o["items_count"] = counts.get(o.get("id"), 0)
+        return page
+
+    def _export(self):
+        from app.utils import show_export_menu
+        show_export_menu(self, self.btn_export, "meridian", self.export_status)
\ No newline at end of file
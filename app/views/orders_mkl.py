@@ -1,10 +1,10 @@
-import os
 import tkinter as tk
 from tkinter import ttk, messagebox
-from tkinter import font as tkfont
 from datetime import datetime
 
 from app.utils import fade_transition, format_phone_mask, center_on_screen
+from app.table import VirtualTable, ColumnAutosizer
+from app.navigation import view_pool
 from app.db import AppDB  # type hint only
 
 
@@ -38,7 +38,7 @@ class MKLOrdersView(ttk.Frame):
         # Явно размещаем представление в (row=0, column=0), чтобы избежать «пустой» верхней области
         self.grid(row=0, column=0, sticky="nsew")
 
-        self.orders: list[dict] = []
+        self._stamp = None  # AppDB.data_stamp("mkl_orders") на момент загрузки заказов
 
         self._build_toolbar()
         self._build_table()
@@ -55,11 +55,18 @@ class MKLOrdersView(ttk.Frame):
         ttk.Button(toolbar, text="Сменить статус", style="Menu.TButton", command=self._change_status).pack(side="left", padx=(8, 0))
         ttk.Button(toolbar, text="Клиенты", style="Menu.TButton", command=self._open_clients).pack(side="left", padx=(8, 0))
         ttk.Button(toolbar, text="Товары", style="Menu.TButton", command=self._open_products).pack(side="left", padx=(8, 0))
-        ttk.Button(toolbar, text="Экспорт TXT", style="Menu.TButton", command=self._export_txt).pack(side="left", padx=(8, 0))
+        ttk.Button(toolbar, text="Заказ поставщику", style="Menu.TButton", command=self._supplier_batch).pack(side="left", padx=(8, 0))
+        ttk.Button(toolbar, text="В заказ Меридиан", style="Menu.TButton", command=self._to_meridian).pack(side="left", padx=(8, 0))
+        ttk.Button(toolbar, text="Подтверждение", style="Menu.TButton", command=self._import_confirmation).pack(side="left", padx=(8, 0))
+        self.btn_export = ttk.Button(toolbar, text="Экспорт ▾", style="Menu.TButton", command=self._export)
+        self.btn_export.pack(side="left", padx=(8, 0))
+        self.export_status = ttk.Label(toolbar, text="", style="Subtitle.TLabel")
+        self.export_status.pack(side="left", padx=(12, 0))
 
     def _go_back(self):
         try:
-            self.destroy()
+            if not view_pool(self.master).owns(self):
+                self.destroy()
         finally:
             cb = getattr(self, "on_back", None)
             if callable(cb):
@@ -80,7 +87,16 @@ class MKLOrdersView(ttk.Frame):
         table_frame.pack(fill="both", expand=True)
 
         columns = self.COLUMNS
-        self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", style="Data.Treeview")
+        # Виртуальная таблица: в Treeview только видимые строки, страницы читаются из БД
+        self.table = VirtualTable(
+            table_frame,
+            columns,
+            row_values=self._row_values,
+            row_tags=lambda o: (f"status_{o.get('status', 'Не заказан')}",),
+            key=lambda o: o.get("id"),
+            xscroll=True,
+        )
+        self.tree = self.table.tree
 
         # Configure anchors: text columns left, numeric centered
         text_cols = {"fio", "phone", "product", "status", "date", "comment_flag"}
@@ -94,14 +110,7 @@ class MKLOrdersView(ttk.Frame):
             self.tree.heading(col, text=self.HEADERS[col], anchor=anchor)
             self.tree.column(col, width=default_widths[col], anchor=anchor, stretch=True)
 
-        y_scroll = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        x_scroll = ttk.Scrollbar(table_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscroll=y_scroll.set, xscroll=x_scroll.set)
-
-        self.tree.grid(row=0, column=0, sticky="nsew")
-        y_scroll.grid(row=0, column=1, sticky="ns")
-        x_scroll.grid(row=1, column=0, sticky="ew")
-
+        self.table.grid(row=0, column=0, sticky="nsew")
         table_frame.columnconfigure(0, weight=1)
         table_frame.rowconfigure(0, weight=1)
 
@@ -120,114 +129,56 @@ class MKLOrdersView(ttk.Frame):
         self.menu.add_cascade(label="Статус", menu=status_menu)
         self.tree.bind("<Button-3>", self._show_context_menu)
         self.tree.bind("<Double-1>", lambda e: self._edit_order())
+        # Auto-size columns to fit content and screen: measures a sample of all orders, not only the visible window
+        self._autosizer = ColumnAutosizer(
+            self.tree,
+            self.COLUMNS,
+            self.HEADERS,
+            rows=lambda: self.db.sample_mkl_orders(self._autosizer.sample) if self.db else [],
+            row_values=self._row_values,
+        )
 
     def _autosize_columns(self):
-        """Auto-size columns to fit content and available width; align by content type."""
-        try:
-            # Measure text width using the current Treeview font
-            f = None
-            try:
-                f = tkfont.nametofont("TkDefaultFont")
-            except Exception:
-                f = tkfont.Font()
-            # Collect max width per column (header + cells)
-            max_px = {}
-            padding = 28  # account for cell padding and sort icon
-            for col in self.COLUMNS:
-                header = self.HEADERS.get(col, col)
-                w = f.measure(header) + padding
-                max_px[col] = max(w, 60)  # minimal width
-
-            # Measure visible rows content
-            for iid in self.tree.get_children(""):
-                vals = self.tree.item(iid, "values") or ()
-                for i, col in enumerate(self.COLUMNS):
-                    if i >= len(vals):
-                        continue
-                    text = str(vals[i])
-                    w = f.measure(text) + padding
-                    if w > max_px[col]:
-                        max_px[col] = w
-
-            # Available width inside the tree widget
-            self.update_idletasks()
-            avail = max(200, self.tree.winfo_width())
-            total = sum(max_px[c] for c in self.COLUMNS)
-
-            # If exceeds, scale down proportionally to fit to screen
-            scaled = dict(max_px)
-            if total > avail:
-                ratio = avail / total
-                for c in self.COLUMNS:
-                    scaled[c] = max(60, int(max_px[c] * ratio))
-
-            # Apply widths
-            text_cols = {"fio", "phone", "product", "status", "date", "comment_flag"}
-            num_cols = {"sph", "cyl", "ax", "add", "bc", "qty"}
-            for c in self.COLUMNS:
-                anchor = "w" if c in text_cols else "center"
-                self.tree.heading(c, anchor=anchor)
-                self.tree.column(c, width=scaled[c], minwidth=60, anchor=anchor, stretch=True)
-        except Exception:
-            # fallback: do nothing
-            pass
-
-        # Auto-size columns to fit content and screen
-        try:
-            self.tree.bind("<Configure>", lambda e: self._autosize_columns())
-        except Exception:
-            pass
+        """Auto-size columns to fit content and available width (measured on a sample, debounced)."""
+        self._autosizer.invalidate()
 
     def _show_context_menu(self, event):
         try:
-            iid = self.tree.identify_row(event.y)
-            if iid:
-                self.tree.selection_set(iid)
+            idx = self.table.index_at(event.y)
+            if idx is not None:
+                self.table.select_index(idx, see=False)
                 self.menu.tk_popup(event.x_root, event.y_root)
         finally:
             self.menu.grab_release()
 
     def _open_clients(self):
         def swap():
-            try:
-                self.destroy()
-            except Exception:
-                pass
+            view_pool(self.master).hide_all()
             from app.views.clients import ClientsView
-            from app.views.main import MainWindow
-            ClientsView(self.master, self.db, on_back=lambda: MKLOrdersView(self.master, on_back=lambda: MainWindow(self.master)))
+            from app.views.main import open_mkl
+            ClientsView(self.master, self.db, on_back=lambda: open_mkl(self.master))
         fade_transition(self.master, swap)
 
     def _open_products(self):
         def swap():
-            try:
-                self.destroy()
-            except Exception:
-                pass
+            view_pool(self.master).hide_all()
             from app.views.products_mkl import ProductsMKLView
-            from app.views.main import MainWindow
-            ProductsMKLView(self.master, self.db, on_back=lambda: MKLOrdersView(self.master, on_back=lambda: MainWindow(self.master)))
+            from app.views.main import open_mkl
+            ProductsMKLView(self.master, self.db, on_back=lambda: open_mkl(self.master))
         fade_transition(self.master, swap)
 
-    def _selected_index(self):
-        sel = self.tree.selection()
-        if not sel:
+    def _selected_order(self) -> dict | None:
+        order = self.table.selected_row()
+        if order is None:
             messagebox.showinfo("Выбор", "Пожалуйста, выберите заказ.")
-            return None
-        try:
-            return int(sel[0])
-        except ValueError:
-            return None
+        return order
 
-    def _new_order(self):
+    def _new_order(self, initial: dict | None = None):
         def swap():
-            try:
-                self.destroy()
-            except Exception:
-                pass
+            view_pool(self.master).hide_all()
             try:
                 from app.views.forms_mkl import NewMKLOrderView
-                from app.views.main import MainWindow
+                from app.views.main import open_mkl
                 def on_submit(client_payload: dict):
                     # Сохранить новый заказ в базу и вернуться к списку
                     try:
@@ -238,12 +189,13 @@ class MKLOrdersView(ttk.Frame):
                             messagebox.showerror("База данных", f"Не удалось добавить заказ МКЛ:\\n{e}")
                         except Exception:
                             pass
-                    MKLOrdersView(self.master, on_back=lambda: MainWindow(self.master))
+                    open_mkl(self.master)
                 NewMKLOrderView(
                     self.master,
                     db=self.db,
-                    on_back=lambda: MKLOrdersView(self.master, on_back=lambda: MainWindow(self.master)),
-                    on_submit=on_submit
+                    on_back=lambda: open_mkl(self.master),
+                    on_submit=on_submit,
+                    initial=initial,
                 )
             except Exception as e:
                 # Покажем ошибку и восстановим список заказов
@@ -251,8 +203,8 @@ class MKLOrdersView(ttk.Frame):
                     messagebox.showerror("Новый заказ", f"Ошибка открытия формы:\n{e}")
                 except Exception:
                     pass
-                from app.views.main import MainWindow
-                MKLOrdersView(self.master, on_back=lambda: MainWindow(self.master))
+                from app.views.main import open_mkl
+                open_mkl(self.master)
         try:
             from app.utils import fade_transition
             fade_transition(self.master, swap)
@@ -261,10 +213,10 @@ class MKLOrdersView(ttk.Frame):
             swap()
 
     def _edit_order(self):
-        idx = self._selected_index()
-        if idx is None:
+        order = self._selected_order()
+        if order is None:
             return
-        current = self.orders[idx].copy()
+        current = order.copy()
         order_id = current.get("id")
 
         clients = self.db.list_clients() if self.db else []
@@ -279,18 +231,17 @@ class MKLOrdersView(ttk.Frame):
                     self.db.update_mkl_order(order_id, updated)
                 except Exception as e:
                     messagebox.showerror("База данных", f"Не удалось обновить заказ МКЛ:\n{e}")
-            self._refresh_orders_view()
+            self._refresh_orders_view(changed_id=order_id)
 
         from app.views.forms_mkl import OrderForm
         OrderForm(self, clients=clients, products=products, on_save=on_save, initial=current, statuses=self.STATUSES, db=self.db)
 
     def _delete_order(self):
-        idx = self._selected_index()
-        if idx is None:
+        order = self._selected_order()
+        if order is None:
             return
         if not messagebox.askyesno("Удалить", "Удалить выбранный заказ?"):
             return
-        order = self.orders[idx]
         order_id = order.get("id")
         if self.db and order_id:
             try:
@@ -300,10 +251,9 @@ class MKLOrdersView(ttk.Frame):
         self._refresh_orders_view()
 
     def _set_status(self, status: str):
-        idx = self._selected_index()
-        if idx is None:
+        order = self._selected_order()
+        if order is None:
             return
-        order = self.orders[idx]
         order_id = order.get("id")
         old_status = order.get("status", "Не заказан")
         if status != old_status:
@@ -312,13 +262,13 @@ class MKLOrdersView(ttk.Frame):
                     self.db.update_mkl_order(order_id, {"status": status, "date": datetime.now().strftime("%Y-%m-%d %H:%M")})
                 except Exception as e:
                     messagebox.showerror("База данных", f"Не удалось обновить статус заказа:\n{e}")
-            self._refresh_orders_view()
+            self._refresh_orders_view(changed_id=order_id)
 
     def _change_status(self):
-        idx = self._selected_index()
-        if idx is None:
+        order = self._selected_order()
+        if order is None:
             return
-        current = self.orders[idx].get("status", "Не заказан")
+        current = order.get("status", "Не заказан")
 
         dialog = tk.Toplevel(self)
         dialog.title("Сменить статус")
@@ -344,108 +294,108 @@ class MKLOrdersView(ttk.Frame):
 
         dialog.columnconfigure(0, weight=1)
 
-    def _export_txt(self):
-        groups: dict[str, list[dict]] = {}
-        for o in self.orders:
-            if (o.get("status", "") or "").strip() == "Не заказан":
-                key = (o.get("product", "") or "").strip() or "(Без названия)"
-                groups.setdefault(key, []).append(o)
+    def _supplier_batch(self):
+        if not self.db:
+            return
+        from app.views.supplier_batch import SupplierBatchDialog
+        SupplierBatchDialog(self, self.db, on_confirmed=self._refresh_orders_view)
 
-        if not groups:
-            messagebox.showinfo("Экспорт", "Нет заказов со статусом 'Не заказан' для экспорта.")
+    def _to_meridian(self):
+        if not self.db:
             return
+        from app.supplier import pending_lines, transfer_to_meridian
 
-        lines: list[str] = []
-        for product, items in groups.items():
-            lines.append(product)
-            for o in items:
-                parts = []
-                # Include parameters in order: Sph, Cyl, Ax, ADD, BC
-                for key, label in (("sph", "Sph"), ("cyl", "Cyl"), ("ax", "Ax"), ("add", "ADD"), ("bc", "BC")):
-                    val = (o.get(key, "") or "").strip()
-                    if val != "":
-                        parts.append(f"{label}: {val}")
-                qty = (o.get("qty", "") or "").strip()
-                if qty != "":
-                    parts.append(f"Количество: {qty}")
-                # Comment should go after quantity if present
-                comment = (o.get("comment", "") or "").strip()
-                if comment:
-                    parts.append(f"Комментарий: {comment}")
-                if parts:
-                    lines.append(" ".join(parts))
-            lines.append("")
-
-        content = "\n".join(lines).strip() + "\n"
-        date_str = datetime.now().strftime("%d.%m.%y")
-        filename = f"MKL_{date_str}.txt"
-        export_path = getattr(self.master, "app_settings", {}).get("export_path", None)
-        if not export_path:
-            desktop = os.path.join(os.path.expanduser("~"), "Desktop")
-            export_path = desktop if os.path.isdir(desktop) else os.getcwd()
-        filepath = os.path.join(export_path, filename)
+        lines = pending_lines(self.db.conn)
+        if not lines:
+            messagebox.showinfo("Заказ Меридиан", "Нет заказов «Не заказан».")
+            return
+        total = sum(int(l["orders"]) for l in lines)
+        if not messagebox.askyesno(
+            "Заказ Меридиан",
+            f"Создать заказ Меридиан из {total} заказ(ов) МКЛ ({len(lines)} позиций)?\n"
+            "Заказы МКЛ будут отмечены «Заказан».",
+        ):
+            return
         try:
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(content)
-            messagebox.showinfo("Экспорт", f"Экспорт выполнен:\n{filepath}")
-            try:
-                import platform, subprocess
-                if hasattr(os, "startfile"):
-                    os.startfile(filepath)
-                else:
-                    sysname = platform.system()
-                    if sysname == "Darwin":
-                        subprocess.run(["open", filepath], check=False)
-                    else:
-                        subprocess.run(["xdg-open", filepath], check=False)
-            except Exception:
-                pass
+            result = transfer_to_meridian(self.db, lines=lines)
+        except Exception as e:
+            messagebox.showerror("База данных", f"Не удалось создать заказ Меридиан:\n{e}")
+            return
+        self._refresh_orders_view()
+        if result:
+            messagebox.showinfo("Заказ Меридиан", f"Заказ Меридиан создан, отмечено «Заказан»: {result[1]}")
+
+    def _import_confirmation(self):
+        if not self.db:
+            return
+        from tkinter import filedialog
+        from app.views.confirm_import import ConfirmImportDialog
+
+        path = filedialog.askopenfilename(
+            title="Подтверждение или накладная поставщика",
+            filetypes=[("TXT/CSV", "*.txt *.csv"), ("Все файлы", "*.*")],
+        )
+        if not path:
+            return
+        try:
+            ConfirmImportDialog(self, self.db, path, self.STATUSES, on_applied=self._refresh_orders_view)
         except Exception as e:
-            messagebox.showerror("Экспорт", f"Ошибка записи файла:\n{e}")
+            messagebox.showerror("Подтверждение поставщика", f"Не удалось прочитать файл:\n{e}")
+
+    def _export(self):
+        from app.utils import show_export_menu
+        show_export_menu(self, self.btn_export, "mkl", self.export_status)
+
+    @staticmethod
+    def _row_values(item: dict) -> tuple:
+        comment_flag = "ЕСТЬ" if (item.get("comment", "") or "").strip() else "НЕТ"
+        return (
+            item.get("fio", ""),
+            format_phone_mask(item.get("phone", "")),
+            item.get("product", ""),
+            item.get("sph", ""),
+            item.get("cyl", ""),
+            item.get("ax", ""),
+            item.get("add", ""),
+            item.get("bc", ""),
+            item.get("qty", ""),
+            item.get("status", ""),
+            item.get("date", ""),
+            comment_flag,
+        )
+
+    def refresh_if_stale(self):
+        """Вызывается пулом экранов при возврате: перечитать заказы, только если БД менялась."""
+        if self.db and self.db.data_stamp("mkl_orders") != self._stamp:
+            self._refresh_orders_view()
 
-    def _refresh_orders_view(self):
-        """Reload orders from DB and render the table."""
-        self.orders = []
+    def _refresh_orders_view(self, changed_id=None):
+        """Re-read the order count and render the table from DB pages; changed_id — the only order edited since the last load."""
+        count = 0
         if self.db:
             try:
-                self.orders = self.db.list_mkl_orders()
+                self._stamp = self.db.data_stamp("mkl_orders")
+                count = self.db.count_mkl_orders()
             except Exception as e:
                 messagebox.showerror("База данных", f"Не удалось загрузить заказы МКЛ:\n{e}")
-                self.orders = []
-        # Clear and render
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for idx, item in enumerate(self.orders):
-            masked_phone = format_phone_mask(item.get("phone", ""))
-            comment_flag = "ЕСТЬ" if (item.get("comment", "") or "").strip() else "НЕТ"
-            values = (
-                item.get("fio", ""),
-                masked_phone,
-                item.get("product", ""),
-                item.get("sph", ""),
-                item.get("cyl", ""),
-                item.get("ax", ""),
-                item.get("add", ""),
-                item.get("bc", ""),
-                item.get("qty", ""),
-                item.get("status", ""),
-                item.get("date", ""),
-                comment_flag,
-            )
-            tag = f"status_{item.get('status','Не заказан')}"
-            self.tree.insert("", "end", iid=str(idx), values=values, tags=(tag,))
-        # Auto-select the latest (first row since orders are DESC by id)
-        try:
-            children = self.tree.get_children()
-            if children:
-                self.tree.selection_set(children[0])
-                self.tree.focus(children[0])
-                self.tree.see(children[0])
-        except Exception:
-            pass
-
-        # Adjust columns to fit content and current tree width
+        # Only the visible window is read (page by page on scroll); selection and scroll survive edits by id.
+        # On first load auto-select the latest (first row since orders are DESC by id)
+        self.table.set_source(
+            count,
+            lambda offset, limit: self.db.list_mkl_orders(limit=limit, offset=offset),
+            keep_state=True,
+            locate=self.db.mkl_order_position if self.db else None,
+        )
+        if count and self.table.selected_index() is None:
+            self.table.select_index(0)
+
+        # Adjust columns to fit content and current tree width: one edited order only widens them
         try:
-            self._autosize_columns()
+            selected = self.table.selected_row()
+            changed = [selected] if changed_id is not None and selected and selected.get("id") == changed_id else []
+            if changed:
+                self._autosizer.rows_added(changed)
+            else:
+                self._autosize_columns()
         except Exception:
             pass
\ No newline at end of file
@@ -1,10 +1,11 @@
 import os
-import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
 from app.utils import set_initial_geometry, fade_transition
+from app.table import KeyedTreeSync
 from app.db import AppDB
+from app.navigation import view_pool
 
 
 class PricesView(ttk.Frame):
@@ -15,10 +16,13 @@ class PricesView(ttk.Frame):
         self.master = master
         self.on_back = on_back
         self.db: AppDB = getattr(self.master, "db", None)
+        self._status: dict[int, dict] = {}
+        self._ingest_task = None
 
         self.pack(fill="both", expand=True)
         self._build_ui()
         self._reload()
+        self._ingest()
 
     def _build_ui(self):
         toolbar = ttk.Frame(self, padding=(16, 12))
@@ -30,16 +34,21 @@ class PricesView(ttk.Frame):
         ttk.Button(toolbar, text="Редактировать", command=self._edit).pack(side="right", padx=(8, 0))
         ttk.Button(toolbar, text="Удалить", command=self._delete).pack(side="right", padx=(8, 0))
         ttk.Button(toolbar, text="Открыть", command=self._open_selected).pack(side="right", padx=(8, 0))
+        ttk.Button(toolbar, text="Перечитать", command=lambda: self._ingest(force=True)).pack(side="right", padx=(8, 0))
+        self.ingest_status = ttk.Label(toolbar, text="", style="Subtitle.TLabel")
+        self.ingest_status.pack(side="left", padx=(12, 0))
 
         container = ttk.Frame(self)
         container.pack(fill="both", expand=True, padx=16, pady=(0, 16))
 
-        columns = ("name", "path")
+        columns = ("name", "path", "rows")
         self.tree = ttk.Treeview(container, columns=columns, show="headings", selectmode="browse")
         self.tree.heading("name", text="Название")
         self.tree.heading("path", text="Путь к файлу")
         self.tree.column("name", width=300, anchor="w")
+        self.tree.heading("rows", text="Позиций")
         self.tree.column("path", width=600, anchor="w")
+        self.tree.column("rows", width=100, anchor="center")
         vsb = ttk.Scrollbar(container, orient="vertical", command=self.tree.yview)
         hsb = ttk.Scrollbar(container, orient="horizontal", command=self.tree.xview)
         self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
@@ -53,15 +62,50 @@ class PricesView(ttk.Frame):
         # Double click opens
         self.tree.bind("<Double-1>", lambda e: self._open_selected())
 
+        # Rows keyed by DB id: reload updates only changed rows, selection stays
+        self._sync = KeyedTreeSync(self.tree, key=lambda it: it["id"], values=lambda it: (it["name"], it["path"], self._rows_label(it["id"])))
+
+    def _rows_label(self, price_id: int) -> str:
+        st = self._status.get(price_id)
+        if not st:
+            return "—"
+        return f"ошибка: {st['error']}" if st.get("error") else str(st.get("rows", 0))
+
     def _reload(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
         try:
             items = self.db.list_prices() if self.db else []
         except Exception:
             items = []
-        for it in items:
-            self.tree.insert("", "end", iid=str(it["id"]), values=(it["name"], it["path"]))
+        try:
+            from app.pricelist import PriceIndex
+            self._status = PriceIndex(self.db).status() if self.db else {}
+        except Exception:
+            self._status = {}
+        self._sync.apply(items)
+
+    def _ingest(self, force: bool = False):
+        """Разобрать изменившиеся файлы прайсов в строки (app/pricelist.py) в фоне."""
+        if not self.db or self._ingest_task is not None:
+            return
+        from app.pricelist import PriceIngestTask
+
+        def on_progress(done, total):
+            if self.winfo_exists():
+                self.ingest_status.configure(text=f"Чтение прайсов: {done}/{total}")
+
+        def on_done(summary):
+            self._ingest_task = None
+            if not self.winfo_exists():
+                return
+            self._reload()
+            text = f"Позиций в прайсах: {summary['rows']}"
+            if summary["errors"]:
+                text += f" • не прочитано файлов: {len(summary['errors'])}"
+            self.ingest_status.configure(text=text)
+
+        self._ingest_task = PriceIngestTask(
+            self.winfo_toplevel(), force=force, on_progress=on_progress, on_done=on_done
+        ).start()
 
     def _selected_id(self):
         sel = self.tree.selection()
@@ -174,6 +218,7 @@ class PricesView(ttk.Frame):
                     pass
                 top.destroy()
                 self._reload()
+                self._ingest()
             except Exception as e:
                 messagebox.showerror("Прайсы", f"Не удалось сохранить:\n{e}", parent=top)
         ttk.Button(btns, text="Сохранить", command=_ok).pack(side="right")
@@ -193,19 +238,16 @@ class PricesView(ttk.Frame):
         path = item.get("path") or ""
         if not path:
             return
-        try:
-            if os.name == "nt":
-                os.startfile(path)  # type: ignore[attr-defined]
-            elif sys.platform == "darwin":
-                os.system(f'open "{path}"')
-            else:
-                os.system(f'xdg-open "{path}"')
-        except Exception as e:
-            messagebox.showerror("Прайсы", f"Не удалось открыть файл:\n{e}")
+        if not os.path.isfile(path):
+            messagebox.showerror("Прайсы", f"Файл не найден:\n{path}")
+            return
+        from app.export import open_file
+        open_file(path)
 
     def _go_back(self):
         try:
-            self.destroy()
+            if not view_pool(self.master).owns(self):
+                self.destroy()
         finally:
             if callable(self.on_back):
                 self.on_back()
\ No newline at end of file
@@ -0,0 +1,234 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import datetime
+
+from app.db import AppDB  # type hint only
+from app.reports import ReportEngine
+from app.navigation import view_pool
+
+
+class ReportsView(ttk.Frame):
+    """Отчёты: объёмы заказов МКЛ/Меридиан по месяцам, брендам, товарам и статусам."""
+    ORDER_TYPES = [("МКЛ", "mkl"), ("Меридиан", "meridian")]
+    GROUPINGS = [
+        ("Месяц × Бренд", ("month", "brand")),
+        ("Месяц × Товар", ("month", "product")),
+        ("Месяц × Статус", ("month", "status")),
+        ("Месяц", ("month",)),
+        ("Бренд", ("brand",)),
+        ("Товар", ("product",)),
+        ("Статус", ("status",)),
+        ("День", ("day",)),
+        ("Год × Бренд", ("year", "brand")),
+    ]
+    HEADERS = {
+        "day": "День",
+        "month": "Месяц",
+        "year": "Год",
+        "product": "Товар",
+        "brand": "Бренд",
+        "status": "Статус",
+        "orders": "Заказов",
+        "qty": "Количество",
+    }
+    FORECAST_COLUMNS = ("product", "sph", "cyl", "ax", "add", "extra", "recommended", "forecast_month", "total")
+    FORECAST_HEADERS = {
+        "product": "Товар",
+        "sph": "Sph",
+        "cyl": "Cyl",
+        "ax": "Ax",
+        "add": "ADD",
+        "extra": "BC / D",
+        "recommended": "Закупить",
+        "forecast_month": "Прогноз/мес",
+        "total": "За год",
+    }
+    ALL_STATUSES = "Все статусы"
+    STATUSES = {
+        "mkl": ["Не заказан", "Заказан", "Прозвонен", "Вручен"],
+        "meridian": ["Не заказан", "Заказан"],
+    }
+
+    def __init__(self, master: tk.Tk, on_back):
+        super().__init__(master, style="Card.TFrame", padding=0)
+        self.master = master
+        self.on_back = on_back
+        self.db: AppDB | None = getattr(self.master, "db", None)
+        self.engine = ReportEngine(self.db) if self.db else None
+
+        self.master.columnconfigure(0, weight=1)
+        self.master.rowconfigure(0, weight=1)
+        self.grid(row=0, column=0, sticky="nsew")
+
+        self._build_ui()
+        self._run()
+
+    def _build_ui(self):
+        toolbar = ttk.Frame(self, style="Card.TFrame", padding=(16, 12))
+        toolbar.pack(fill="x")
+        ttk.Button(toolbar, text="← Главное меню", style="Back.TButton", command=self._go_back).pack(side="left")
+        ttk.Button(toolbar, text="Пересчитать", style="Menu.TButton", command=self._rebuild).pack(side="right")
+        ttk.Button(toolbar, text="Показать", style="Menu.TButton", command=self._run).pack(side="right", padx=(0, 8))
+        ttk.Button(toolbar, text="Прогноз закупки", style="Menu.TButton", command=self._run_forecast).pack(side="right", padx=(0, 8))
+
+        container = ttk.Frame(self, style="Card.TFrame", padding=16)
+        container.pack(fill="both", expand=True)
+
+        ttk.Label(container, text="Отчёты • Объёмы заказов", style="Title.TLabel").pack(anchor="w")
+        ttk.Label(
+            container,
+            text="Количество заказов, перешедших в статус за период (по умолчанию — новые заказы «Не заказан»)",
+            style="Subtitle.TLabel",
+        ).pack(anchor="w", pady=(4, 12))
+
+        filters = ttk.Frame(container, style="Card.TFrame")
+        filters.pack(fill="x")
+
+        date_from, date_to = ReportEngine.default_period()
+
+        ttk.Label(filters, text="Заказы", style="Subtitle.TLabel").grid(row=0, column=0, sticky="w")
+        self.type_var = tk.StringVar(value=self.ORDER_TYPES[0][0])
+        type_combo = ttk.Combobox(filters, textvariable=self.type_var, values=[t[0] for t in self.ORDER_TYPES], state="readonly", width=12)
+        type_combo.grid(row=1, column=0, sticky="w", padx=(0, 12))
+        type_combo.bind("<<ComboboxSelected>>", lambda e: self._on_type_changed())
+
+        ttk.Label(filters, text="С (ГГГГ-ММ-ДД)", style="Subtitle.TLabel").grid(row=0, column=1, sticky="w")
+        self.from_var = tk.StringVar(value=date_from)
+        ttk.Entry(filters, textvariable=self.from_var, width=12).grid(row=1, column=1, sticky="w", padx=(0, 12))
+
+        ttk.Label(filters, text="По (ГГГГ-ММ-ДД)", style="Subtitle.TLabel").grid(row=0, column=2, sticky="w")
+        self.to_var = tk.StringVar(value=date_to)
+        ttk.Entry(filters, textvariable=self.to_var, width=12).grid(row=1, column=2, sticky="w", padx=(0, 12))
+
+        ttk.Label(filters, text="Группировка", style="Subtitle.TLabel").grid(row=0, column=3, sticky="w")
+        self.group_var = tk.StringVar(value=self.GROUPINGS[0][0])
+        ttk.Combobox(filters, textvariable=self.group_var, values=[g[0] for g in self.GROUPINGS], state="readonly", width=18).grid(row=1, column=3, sticky="w", padx=(0, 12))
+
+        ttk.Label(filters, text="Статус", style="Subtitle.TLabel").grid(row=0, column=4, sticky="w")
+        self.status_var = tk.StringVar(value="Не заказан")
+        self.status_combo = ttk.Combobox(filters, textvariable=self.status_var, state="readonly", width=16)
+        self.status_combo.grid(row=1, column=4, sticky="w")
+        self._on_type_changed()
+
+        ttk.Separator(container).pack(fill="x", pady=(12, 12))
+
+        table_frame = ttk.Frame(container, style="Card.TFrame")
+        table_frame.pack(fill="both", expand=True)
+        self.tree = ttk.Treeview(table_frame, show="headings", style="Data.Treeview")
+        y_scroll = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscroll=y_scroll.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        y_scroll.grid(row=0, column=1, sticky="ns")
+        table_frame.columnconfigure(0, weight=1)
+        table_frame.rowconfigure(0, weight=1)
+
+        self.summary_label = ttk.Label(container, text="", style="Subtitle.TLabel")
+        self.summary_label.pack(anchor="w", pady=(8, 0))
+
+    def _on_type_changed(self):
+        statuses = self.STATUSES.get(self._order_type(), [])
+        self.status_combo.configure(values=[self.ALL_STATUSES] + statuses)
+        if self.status_var.get() not in [self.ALL_STATUSES] + statuses:
+            self.status_var.set(statuses[0] if statuses else self.ALL_STATUSES)
+
+    def _order_type(self) -> str:
+        label = self.type_var.get()
+        return next((v for k, v in self.ORDER_TYPES if k == label), "mkl")
+
+    def _group_by(self) -> tuple[str, ...]:
+        label = self.group_var.get()
+        return next((v for k, v in self.GROUPINGS if k == label), self.GROUPINGS[0][1])
+
+    @staticmethod
+    def _valid_date(s: str) -> bool:
+        try:
+            datetime.strptime(s, "%Y-%m-%d")
+            return True
+        except Exception:
+            return False
+
+    def _run(self):
+        if not self.engine:
+            return
+        date_from = (self.from_var.get() or "").strip()
+        date_to = (self.to_var.get() or "").strip()
+        for s in (date_from, date_to):
+            if s and not self._valid_date(s):
+                messagebox.showinfo("Отчёты", f"Неверная дата: {s}\nФормат: ГГГГ-ММ-ДД")
+                return
+        status = self.status_var.get()
+        group_by = self._group_by()
+        try:
+            started = datetime.now()
+            rows = self.engine.query(
+                self._order_type(),
+                date_from or None,
+                date_to or None,
+                group_by=group_by,
+                status=None if status == self.ALL_STATUSES else status,
+            )
+            elapsed_ms = int((datetime.now() - started).total_seconds() * 1000)
+        except Exception as e:
+            messagebox.showerror("Отчёты", f"Не удалось построить отчёт:\n{e}")
+            return
+        self._render(group_by, rows)
+        total_orders = sum(r["orders"] for r in rows)
+        total_qty = sum(r["qty"] for r in rows)
+        self.summary_label.configure(text=f"Строк: {len(rows)} • Заказов: {total_orders} • Количество: {total_qty} • {elapsed_ms} мс")
+
+    def _render(self, group_by: tuple[str, ...], rows: list[dict]):
+        columns = tuple(group_by) + ("orders", "qty")
+        self.tree.delete(*self.tree.get_children())
+        self.tree.configure(columns=columns)
+        widths = {"day": 120, "month": 110, "year": 80, "product": 380, "brand": 260, "status": 140, "orders": 110, "qty": 120}
+        for col in columns:
+            anchor = "center" if col in ("orders", "qty") else "w"
+            self.tree.heading(col, text=self.HEADERS[col], anchor=anchor)
+            self.tree.column(col, width=widths[col], anchor=anchor, stretch=True)
+        for r in rows:
+            self.tree.insert("", "end", values=tuple(r.get(c, "") for c in columns))
+
+    def _run_forecast(self):
+        """Ранжированная таблица «что закупить на следующий месяц» для выбранного типа заказов."""
+        if not self.db:
+            return
+        from app.forecast import DemandForecaster
+        order_type = self._order_type()
+        try:
+            started = datetime.now()
+            rows = [r for r in DemandForecaster(self.db).forecast(top=None) if r["source"] == order_type][:300]
+            elapsed_ms = int((datetime.now() - started).total_seconds() * 1000)
+        except Exception as e:
+            messagebox.showerror("Отчёты", f"Не удалось построить прогноз:\n{e}")
+            return
+        columns = self.FORECAST_COLUMNS
+        self.tree.delete(*self.tree.get_children())
+        self.tree.configure(columns=columns)
+        for col in columns:
+            anchor = "w" if col == "product" else "center"
+            self.tree.heading(col, text=self.FORECAST_HEADERS[col], anchor=anchor)
+            self.tree.column(col, width=(380 if col == "product" else 100), anchor=anchor, stretch=True)
+        for r in rows:
+            self.tree.insert("", "end", values=tuple(r.get(c, "") for c in columns))
+        self.summary_label.configure(
+            text=f"Прогноз на месяц (экспоненциальное сглаживание за 52 недели) • Позиций: {len(rows)} • {elapsed_ms} мс"
+        )
+
+    def _rebuild(self):
+        if not self.engine:
+            return
+        try:
+            self.engine.rebuild()
+        except Exception as e:
+            messagebox.showerror("Отчёты", f"Не удалось пересчитать агрегаты:\n{e}")
+            return
+        self._run()
+
+    def _go_back(self):
+        try:
+            if not view_pool(self.master).owns(self):
+                self.destroy()
+        finally:
+            cb = getattr(self, "on_back", None)
+            if callable(cb):
+                cb()
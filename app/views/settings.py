@@ -2,6 +2,7 @@ import os
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 
+from app.rules import NotifyRule, ORDER_TYPES, STATUSES, custom_rules
 from app.utils import set_initial_geometry
 
 
@@ -216,9 +217,64 @@ class SettingsView(ttk.Frame):
 
         ttk.Separator(card).grid(row=22, column=0, columnspan=2, sticky="ew", pady=(16, 16))
 
+        # MKL re-order reminders (lenses running out)
+        ttk.Label(card, text="Напоминания о повторном заказе МКЛ", style="Title.TLabel").grid(row=23, column=0, sticky="w")
+        self.reorder_notify_enabled_var = tk.BooleanVar(value=bool(self.settings.get("reorder_notify_enabled", False)))
+        ttk.Checkbutton(card, text="Включить напоминания", variable=self.reorder_notify_enabled_var).grid(row=23, column=1, sticky="w")
+
+        ttk.Label(card, text="За сколько дней до окончания линз", style="Subtitle.TLabel").grid(row=24, column=0, sticky="w", pady=(8, 0))
+        self.reorder_before_days_var = tk.IntVar(value=int(self.settings.get("reorder_notify_before_days", 7)))
+        ttk.Spinbox(card, from_=0, to=60, textvariable=self.reorder_before_days_var, width=10).grid(row=24, column=1, sticky="w")
+
+        ttk.Label(card, text="Время (чч:мм)", style="Subtitle.TLabel").grid(row=25, column=0, sticky="w", pady=(8, 0))
+        self.reorder_notify_time_var = tk.StringVar(value=(self.settings.get("reorder_notify_time") or "10:00"))
+        ttk.Entry(card, textvariable=self.reorder_notify_time_var, width=10).grid(row=25, column=1, sticky="w")
+
+        ttk.Separator(card).grid(row=26, column=0, columnspan=2, sticky="ew", pady=(16, 16))
+
+        # User-defined notification rules (app/rules.py)
+        ttk.Label(card, text="Дополнительные правила уведомлений", style="Title.TLabel").grid(row=27, column=0, columnspan=2, sticky="w")
+        self._rules = custom_rules(self.settings)
+        rules_box = ttk.Frame(card, style="Card.TFrame")
+        rules_box.grid(row=28, column=0, columnspan=2, sticky="ew", pady=(8, 0))
+        rules_box.columnconfigure(0, weight=1)
+        self._rules_tree = ttk.Treeview(rules_box, columns=("name", "rule", "time", "on"), show="headings", height=4, style="Data.Treeview")
+        for key, text, width in (("name", "Название", 220), ("rule", "Условие", 420), ("time", "Время", 80), ("on", "Вкл", 60)):
+            self._rules_tree.heading(key, text=text, anchor="w")
+            self._rules_tree.column(key, width=width, anchor="w", stretch=(key == "rule"))
+        self._rules_tree.grid(row=0, column=0, sticky="ew")
+        self._rules_tree.bind("<Double-1>", lambda e: self._edit_rule(self._selected_rule()))
+        rules_btns = ttk.Frame(rules_box, style="Card.TFrame")
+        rules_btns.grid(row=1, column=0, sticky="w", pady=(8, 0))
+        ttk.Button(rules_btns, text="Добавить…", command=lambda: self._edit_rule(None)).pack(side="left")
+        ttk.Button(rules_btns, text="Изменить…", command=lambda: self._edit_rule(self._selected_rule())).pack(side="left", padx=(8, 0))
+        ttk.Button(rules_btns, text="Удалить", command=self._delete_rule).pack(side="left", padx=(8, 0))
+        ttk.Button(rules_btns, text="Проверить", command=self._test_rule).pack(side="left", padx=(8, 0))
+        self._refresh_rules()
+
+        ttk.Separator(card).grid(row=29, column=0, columnspan=2, sticky="ew", pady=(16, 16))
+
+        # Startup profiling (USSUR_STARTUP_PROFILE overrides this setting)
+        ttk.Label(card, text="Диагностика запуска", style="Title.TLabel").grid(row=30, column=0, sticky="w")
+        self._profile_options = [
+            ("Выкл (только итог по фазам)", ""),
+            ("Фазы: время и CPU", "cpu"),
+            ("Фазы + cProfile", "cpu,cprofile"),
+            ("Фазы + cProfile + импорты", "cpu,cprofile,imports"),
+        ]
+        profile_row = ttk.Frame(card, style="Card.TFrame")
+        profile_row.grid(row=30, column=1, sticky="w")
+        self._profile_combo = ttk.Combobox(profile_row, values=[o[0] for o in self._profile_options], state="readonly", width=30)
+        current = (self.settings.get("startup_profile") or "").strip().lower()
+        self._profile_combo.current(next((i for i, (_, v) in enumerate(self._profile_options) if v == current), 0))
+        self._profile_combo.pack(side="left")
+        ttk.Button(profile_row, text="Журнал запуска…", command=self._show_startup_log).pack(side="left", padx=(8, 0))
+
+        ttk.Separator(card).grid(row=31, column=0, columnspan=2, sticky="ew", pady=(16, 16))
+
         # Actions
         actions = ttk.Frame(card, style="Card.TFrame")
-        actions.grid(row=23, column=0, columnspan=2, sticky="ew")
+        actions.grid(row=32, column=0, columnspan=2, sticky="ew")
         # Test buttons on the left
         left_actions = ttk.Frame(actions, style="Card.TFrame")
         left_actions.pack(side="left")
@@ -261,6 +317,10 @@ class SettingsView(ttk.Frame):
         data["mkl_notify_enabled"] = bool(self.mkl_notify_enabled_var.get())
         data["mkl_notify_after_days"] = int(self.mkl_notify_days_var.get())
         data["mkl_notify_time"] = (self.mkl_notify_time_var.get() or "09:00").strip()
+        # MKL re-order reminders
+        data["reorder_notify_enabled"] = bool(self.reorder_notify_enabled_var.get())
+        data["reorder_notify_before_days"] = int(self.reorder_before_days_var.get())
+        data["reorder_notify_time"] = (self.reorder_notify_time_var.get() or "10:00").strip()
         # Sound
         data["notify_sound_enabled"] = bool(self.notify_sound_enabled_var.get())
         data["notify_sound_mode"] = (self.notify_sound_mode_var.get() or "alias")
@@ -277,6 +337,9 @@ class SettingsView(ttk.Frame):
         except Exception:
             data["notify_sound_alias"] = (self.settings.get("notify_sound_alias") or "SystemAsterisk")
 
+        data["startup_profile"] = self._selected_profile()
+        data["notify_rules"] = [r.to_dict() for r in self._rules]
+
         # Persist to settings.json at project root
         try:
             import json
@@ -293,6 +356,7 @@ class SettingsView(ttk.Frame):
                     _windows_autostart_set(bool(self.autostart_var.get()))
             except Exception:
                 pass
+            self._reschedule_jobs()
 
             messagebox.showinfo("Настройки", "Сохранено.")
         except Exception as e:
@@ -346,6 +410,10 @@ class SettingsView(ttk.Frame):
             self.settings["mkl_notify_enabled"] = bool(self.mkl_notify_enabled_var.get())
             self.settings["mkl_notify_after_days"] = int(self.mkl_notify_days_var.get())
             self.settings["mkl_notify_time"] = (self.mkl_notify_time_var.get() or "09:00").strip()
+            # MKL re-order reminders
+            self.settings["reorder_notify_enabled"] = bool(self.reorder_notify_enabled_var.get())
+            self.settings["reorder_notify_before_days"] = int(self.reorder_before_days_var.get())
+            self.settings["reorder_notify_time"] = (self.reorder_notify_time_var.get() or "10:00").strip()
             # Sound
             self.settings["notify_sound_enabled"] = bool(self.notify_sound_enabled_var.get())
             self.settings["notify_sound_mode"] = (self.notify_sound_mode_var.get() or "alias")
@@ -362,6 +430,9 @@ class SettingsView(ttk.Frame):
             except Exception:
                 self.settings["notify_sound_alias"] = (self.settings.get("notify_sound_alias") or "SystemAsterisk")
 
+            self.settings["startup_profile"] = self._selected_profile()
+            self.settings["notify_rules"] = [r.to_dict() for r in self._rules]
+
             # Apply autostart immediately (Windows)
             try:
                 from app.tray import _windows_autostart_set
@@ -369,11 +440,195 @@ class SettingsView(ttk.Frame):
                     _windows_autostart_set(bool(self.autostart_var.get()))
             except Exception:
                 pass
+            self._reschedule_jobs()
 
             messagebox.showinfo("Настройки", "Изменения применены.")
         except Exception as e:
             messagebox.showerror("Настройки", f"Не удалось применить:\n{e}")
 
+    def _reschedule_jobs(self):
+        # Reminder times/days and rules may have changed: recompute next runs (app/jobs.py)
+        try:
+            from app.jobs import sync_rule_jobs
+            sync_rule_jobs(self.master)
+        except Exception:
+            pass
+
+    # --- Notification rules ---
+    def _refresh_rules(self):
+        tree = self._rules_tree
+        tree.delete(*tree.get_children())
+        for r in self._rules:
+            tree.insert("", "end", iid=r.id, values=(r.name, r.describe(), r.time, "да" if r.enabled else "нет"))
+
+    def _selected_rule(self):
+        sel = self._rules_tree.selection()
+        return next((r for r in self._rules if sel and r.id == sel[0]), None)
+
+    def _delete_rule(self):
+        rule = self._selected_rule()
+        if rule and messagebox.askyesno("Правила уведомлений", f"Удалить правило «{rule.name}»?"):
+            self._rules = [r for r in self._rules if r.id != rule.id]
+            self._refresh_rules()
+
+    def _test_rule(self):
+        rule = self._selected_rule()
+        if rule is None:
+            return
+        try:
+            from app.rules import rule_engine
+            orders = rule_engine(self.master).matches(rule)
+            if not orders:
+                messagebox.showinfo("Правила уведомлений", f"Под правило «{rule.name}» сейчас не подходит ни один заказ.")
+                return
+            from app.views.notify import show_rule_notification
+            show_rule_notification(self.master, rule.name, rule.order_type, orders,
+                                   on_snooze_days=lambda d: messagebox.showinfo("Правила уведомлений", f"Отложено на {d} дн."))
+        except Exception as e:
+            messagebox.showerror("Правила уведомлений", f"Ошибка проверки:\n{e}")
+
+    def _edit_rule(self, rule: NotifyRule | None):
+        """Диалог правила: тип заказов, статус, возраст, группа товаров, клиент, время и дни."""
+        rule = rule or NotifyRule({"name": "Новое правило"})
+        db = getattr(self.master, "db", None)
+        top = tk.Toplevel(self.master)
+        top.title("Правило уведомления")
+        try:
+            top.transient(self.master)
+            top.grab_set()
+        except Exception:
+            pass
+        set_initial_geometry(top, 560, 460, center_to=self.master)
+        frm = ttk.Frame(top, padding=16)
+        frm.pack(fill="both", expand=True)
+        frm.columnconfigure(1, weight=1)
+
+        type_labels = list(ORDER_TYPES.values())
+        name_var = tk.StringVar(value=rule.name)
+        type_var = tk.StringVar(value=ORDER_TYPES[rule.order_type])
+        status_var = tk.StringVar(value=rule.status)
+        age_var = tk.IntVar(value=rule.min_age_days)
+        group_var = tk.StringVar()
+        client_var = tk.StringVar(value=rule.client)
+        time_var = tk.StringVar(value=rule.time)
+        enabled_var = tk.BooleanVar(value=rule.enabled)
+        groups: list[tuple[int | None, str]] = []
+
+        ttk.Label(frm, text="Название").grid(row=0, column=0, sticky="w")
+        ttk.Entry(frm, textvariable=name_var).grid(row=0, column=1, sticky="ew", padx=(8, 0))
+        ttk.Label(frm, text="Заказы").grid(row=1, column=0, sticky="w", pady=(8, 0))
+        type_combo = ttk.Combobox(frm, textvariable=type_var, values=type_labels, state="readonly", width=16)
+        type_combo.grid(row=1, column=1, sticky="w", padx=(8, 0), pady=(8, 0))
+        ttk.Label(frm, text="Статус").grid(row=2, column=0, sticky="w", pady=(8, 0))
+        status_combo = ttk.Combobox(frm, textvariable=status_var, state="readonly", width=16)
+        status_combo.grid(row=2, column=1, sticky="w", padx=(8, 0), pady=(8, 0))
+        ttk.Label(frm, text="В статусе не меньше (дней)").grid(row=3, column=0, sticky="w", pady=(8, 0))
+        ttk.Spinbox(frm, from_=0, to=365, textvariable=age_var, width=10).grid(row=3, column=1, sticky="w", padx=(8, 0), pady=(8, 0))
+        ttk.Label(frm, text="Группа товаров").grid(row=4, column=0, sticky="w", pady=(8, 0))
+        group_combo = ttk.Combobox(frm, textvariable=group_var, state="readonly")
+        group_combo.grid(row=4, column=1, sticky="ew", padx=(8, 0), pady=(8, 0))
+        ttk.Label(frm, text="Клиент / название содержит").grid(row=5, column=0, sticky="w", pady=(8, 0))
+        ttk.Entry(frm, textvariable=client_var).grid(row=5, column=1, sticky="ew", padx=(8, 0), pady=(8, 0))
+        ttk.Label(frm, text="Время (чч:мм)").grid(row=6, column=0, sticky="w", pady=(8, 0))
+        ttk.Entry(frm, textvariable=time_var, width=10).grid(row=6, column=1, sticky="w", padx=(8, 0), pady=(8, 0))
+        ttk.Label(frm, text="Дни недели (пусто — каждый день)").grid(row=7, column=0, sticky="w", pady=(8, 0))
+        days_row = ttk.Frame(frm)
+        days_row.grid(row=7, column=1, sticky="w", padx=(8, 0), pady=(8, 0))
+        day_vars = []
+        for i, lbl in enumerate(["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]):
+            var = tk.BooleanVar(value=(i in rule.days))
+            day_vars.append(var)
+            ttk.Checkbutton(days_row, text=lbl, variable=var).pack(side="left", padx=(0, 6))
+        ttk.Checkbutton(frm, text="Правило включено", variable=enabled_var).grid(row=8, column=1, sticky="w", padx=(8, 0), pady=(8, 0))
+
+        def current_type() -> str:
+            return next((k for k, v in ORDER_TYPES.items() if v == type_var.get()), "mkl")
+
+        def on_type(_event=None, keep_group=False):
+            kind = current_type()
+            statuses = STATUSES[kind]
+            status_combo.configure(values=statuses)
+            if status_var.get() not in statuses:
+                status_var.set(statuses[0])
+            groups.clear()
+            groups.append((None, "Любая"))
+            try:
+                rows = db.list_product_groups_mkl() if kind == "mkl" else db.list_product_groups_meridian()
+                groups.extend((g["id"], g.get("name", "")) for g in rows)
+            except Exception:
+                pass
+            group_combo.configure(values=[name for _, name in groups])
+            chosen = rule.group_id if keep_group else None
+            group_var.set(next((name for gid, name in groups if gid == chosen), "Любая"))
+
+        type_combo.bind("<<ComboboxSelected>>", on_type)
+        on_type(keep_group=True)
+
+        def on_save():
+            idx = group_combo.current()
+            gid, gname = groups[idx] if 0 <= idx < len(groups) else (None, "")
+            try:
+                age = int(age_var.get())
+            except Exception:
+                age = 0
+            updated = NotifyRule({
+                "id": rule.id, "name": name_var.get(), "order_type": current_type(), "status": status_var.get(),
+                "min_age_days": age, "group_id": gid, "group_name": gname if gid else "",
+                "client": client_var.get(), "time": time_var.get(),
+                "days": [i for i, v in enumerate(day_vars) if v.get()], "enabled": enabled_var.get(),
+            })
+            self._rules = [updated if r.id == rule.id else r for r in self._rules]
+            if not any(r.id == rule.id for r in self._rules):
+                self._rules.append(updated)
+            self._refresh_rules()
+            top.destroy()
+
+        btns = ttk.Frame(frm)
+        btns.grid(row=9, column=0, columnspan=2, sticky="e", pady=(16, 0))
+        ttk.Button(btns, text="Отмена", command=top.destroy).pack(side="right")
+        ttk.Button(btns, text="OK", command=on_save).pack(side="right", padx=(0, 8))
+
+    def _selected_profile(self) -> str:
+        sel = self._profile_combo.get()
+        return next((v for label, v in self._profile_options if label == sel), "")
+
+    def _show_startup_log(self):
+        from app.startup import read_log
+
+        path = getattr(self.master, "startup_log_path", None) or "startup.log"
+        top = tk.Toplevel(self.master)
+        top.title("Журнал запуска")
+        try:
+            top.transient(self.master)
+        except Exception:
+            pass
+        set_initial_geometry(top, 720, 420, center_to=self.master)
+        frm = ttk.Frame(top, padding=12)
+        frm.pack(fill="both", expand=True)
+        ttk.Label(frm, text=path, style="Subtitle.TLabel").pack(anchor="w", pady=(0, 6))
+        body = ttk.Frame(frm)
+        body.pack(fill="both", expand=True)
+        text = tk.Text(body, wrap="none", font=("Consolas", 10))
+        ybar = ttk.Scrollbar(body, orient="vertical", command=text.yview)
+        xbar = ttk.Scrollbar(body, orient="horizontal", command=text.xview)
+        text.configure(yscrollcommand=ybar.set, xscrollcommand=xbar.set)
+        ybar.pack(side="right", fill="y")
+        xbar.pack(side="bottom", fill="x")
+        text.pack(side="left", fill="both", expand=True)
+
+        def _load():
+            text.configure(state="normal")
+            text.delete("1.0", "end")
+            text.insert("1.0", read_log(path) or "Журнал пуст: приложение ещё не запускалось с этой папкой данных.")
+            text.configure(state="disabled")
+            text.see("end")
+
+        btns = ttk.Frame(frm)
+        btns.pack(fill="x", pady=(8, 0))
+        ttk.Button(btns, text="Закрыть", command=top.destroy).pack(side="right")
+        ttk.Button(btns, text="Обновить", command=_load).pack(side="right", padx=(0, 8))
+        _load()
+
     def _test_notify(self):
         try:
             # Collect pending meridian 'Не заказан' orders
@@ -399,34 +654,15 @@ class SettingsView(ttk.Frame):
 
     def _test_notify_mkl(self):
         try:
-            from datetime import datetime, timedelta
+            from app.rules import builtin_rules, rule_engine
             db = getattr(self.master, "db", None)
-            orders = db.list_mkl_orders() if db else []
             # Use current settings values (may be unsaved)
             try:
                 days = int(self.mkl_notify_days_var.get())
             except Exception:
                 days = 3
-            threshold = datetime.now() - timedelta(days=max(0, days))
-            aged_pending = []
-            for o in orders:
-                try:
-                    if (o.get("status", "") or "").strip() != "Не заказан":
-                        continue
-                    ds = (o.get("date", "") or "").strip()
-                    dt = None
-                    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d", "%d.%m.%Y %H:%M", "%d.%m.%Y"):
-                        try:
-                            dt = datetime.strptime(ds, fmt)
-                            break
-                        except Exception:
-                            continue
-                    if dt is None:
-                        continue
-                    if dt <= threshold:
-                        aged_pending.append(o)
-                except Exception:
-                    continue
+            rule = builtin_rules({"mkl_notify_after_days": days})["mkl"]
+            aged_pending = rule_engine(self.master).matches(rule)
             if not aged_pending:
                 messagebox.showinfo("Уведомление МКЛ", "Нет просроченных заказов МКЛ со статусом 'Не заказан'.")
                 return
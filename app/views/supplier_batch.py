@@ -0,0 +1,123 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from app.utils import center_on_screen
+
+
+class SupplierBatchDialog(tk.Toplevel):
+    """
+    Сводный заказ поставщику МКЛ: одинаковые позиции заказов «Не заказан»
+    сведены в одну строку с суммарным количеством (app/supplier.py).
+    «Сохранить TXT» записывает заказ поставщику, «Отметить «Заказан»» —
+    переводит все вошедшие заказы клиентов в «Заказан» одной транзакцией.
+    """
+
+    COLUMNS = ("product", "sph", "cyl", "ax", "add", "bc", "qty", "orders", "comment")
+    HEADERS = {
+        "product": "Товар", "sph": "Sph", "cyl": "Cyl", "ax": "Ax", "add": "ADD", "bc": "BC",
+        "qty": "Количество", "orders": "Заказов", "comment": "Комментарий",
+    }
+
+    def __init__(self, master, db, on_confirmed=None):
+        super().__init__(master)
+        from app.supplier import SupplierBatches, pending_lines
+
+        self.db = db
+        self.on_confirmed = on_confirmed
+        self.batches = SupplierBatches(db)
+        self.lines = pending_lines(db.conn)
+        self.batch_id: int | None = None
+
+        self.title("Заказ поставщику МКЛ")
+        self.configure(bg="#f8fafc")
+        self.geometry("880x520")
+        try:
+            center_on_screen(self)
+        except Exception:
+            pass
+        self.transient(master)
+        self._build_ui()
+
+    def _build_ui(self):
+        total_qty = sum(int(l["qty"]) for l in self.lines)
+        total_orders = sum(int(l["orders"]) for l in self.lines)
+        ttk.Label(
+            self,
+            text=f"Позиций: {len(self.lines)} • линз: {total_qty} • из заказов клиентов: {total_orders}",
+            style="Subtitle.TLabel",
+        ).pack(anchor="w", padx=12, pady=(12, 8))
+
+        frame = ttk.Frame(self, style="Card.TFrame")
+        frame.pack(fill="both", expand=True, padx=12)
+        tree = ttk.Treeview(frame, columns=self.COLUMNS, show="headings")
+        for col in self.COLUMNS:
+            tree.heading(col, text=self.HEADERS[col], anchor="w" if col in ("product", "comment") else "center")
+            wide = col in ("product", "comment")
+            tree.column(col, width=220 if wide else 70, anchor="w" if wide else "center")
+        for line in self.lines:
+            tree.insert("", "end", values=tuple(line.get(c, "") for c in self.COLUMNS))
+        ys = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=ys.set)
+        tree.grid(row=0, column=0, sticky="nsew")
+        ys.grid(row=0, column=1, sticky="ns")
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(0, weight=1)
+
+        btns = ttk.Frame(self, style="Card.TFrame")
+        btns.pack(fill="x", padx=12, pady=12)
+        ttk.Button(btns, text="Закрыть", style="Menu.TButton", command=self.destroy).pack(side="right")
+        state = "normal" if self.lines else "disabled"
+        ttk.Button(btns, text="Отметить «Заказан»", style="Menu.TButton", command=self._confirm, state=state).pack(side="right", padx=(0, 8))
+        ttk.Button(btns, text="Копировать", style="Menu.TButton", command=self._copy, state=state).pack(side="right", padx=(0, 8))
+        ttk.Button(btns, text="Сохранить TXT", style="Menu.TButton", command=self._save_txt, state=state).pack(side="right", padx=(0, 8))
+
+    def _ensure_batch(self) -> int | None:
+        # Состав заказа фиксируется при первом действии: подтверждение коснётся именно этих заказов клиентов
+        if self.batch_id is None:
+            self.batch_id = self.batches.create(self.lines)
+        return self.batch_id
+
+    def _text(self) -> str:
+        from app.supplier import lines_text
+
+        return lines_text(self.lines)
+
+    def _save_txt(self):
+        import os
+        from datetime import datetime
+        from app.export import default_export_dir, open_file
+
+        self._ensure_batch()
+        folder = default_export_dir(getattr(self.master.winfo_toplevel(), "app_settings", None))
+        filepath = os.path.join(folder, f"MKL_supplier_{datetime.now().strftime('%d.%m.%y')}.txt")
+        try:
+            with open(filepath, "w", encoding="utf-8") as f:
+                f.write(self._text())
+        except Exception as e:
+            messagebox.showerror("Экспорт", f"Ошибка записи файла:\n{e}", parent=self)
+            return
+        messagebox.showinfo("Экспорт", f"Экспорт выполнен:\n{filepath}", parent=self)
+        open_file(filepath)
+
+    def _copy(self):
+        self._ensure_batch()
+        try:
+            self.clipboard_clear()
+            self.clipboard_append(self._text())
+        except Exception:
+            pass
+
+    def _confirm(self):
+        total = sum(int(l["orders"]) for l in self.lines)
+        if not messagebox.askyesno("Заказ поставщику", f"Отметить {total} заказ(ов) клиентов как «Заказан»?", parent=self):
+            return
+        try:
+            batch_id = self._ensure_batch()
+            changed = self.batches.confirm(batch_id) if batch_id else 0
+        except Exception as e:
+            messagebox.showerror("База данных", f"Не удалось обновить статусы:\n{e}", parent=self)
+            return
+        messagebox.showinfo("Заказ поставщику", f"Отмечено «Заказан»: {changed}", parent=self)
+        self.destroy()
+        if callable(self.on_confirmed):
+            self.on_confirmed()
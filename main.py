@@ -1,18 +1,48 @@
-import atexit
-import json
+import time
+
+_PROCESS_STARTED = time.perf_counter()  # до импорта tkinter и модулей приложения
+_PROCESS_CPU = time.process_time()
+
 import os
-import shutil
+import sys
+
+from app.startup import StartupTimer, install_import_timer, profile_flags
+
+_EARLY_SETTINGS = os.path.join(
+    os.path.dirname(sys.executable) if getattr(sys, "frozen", False) else os.path.dirname(os.path.abspath(__file__)),
+    "settings.json",
+)
+# Профилирование запуска: USSUR_STARTUP_PROFILE или "startup_profile" в settings.json рядом с программой
+_PROFILE = profile_flags(_EARLY_SETTINGS)
+if "imports" in _PROFILE:
+    install_import_timer()
+
+# main.py --cmd ИМЯ [ключ=значение …] — команда запущенному экземпляру (app/ipc.py), без загрузки Tk
+if __name__ == "__main__" and "--cmd" in sys.argv:
+    import json as _json
+    from app.ipc import cli_main
+
+    try:
+        with open(_EARLY_SETTINGS, "r", encoding="utf-8") as _f:
+            _port = int(_json.load(_f).get("single_instance_port", 46465))
+    except Exception:
+        _port = 46465
+    sys.exit(cli_main(sys.argv[sys.argv.index("--cmd") + 1:], _port))
+
+import atexit
 import tkinter as tk
 from tkinter import filedialog, ttk
 from tkinter import font as tkfont
-from datetime import datetime
 
 from app.db import AppDB
-from app.views.main import MainWindow
-from app.tray import _start_tray, _stop_tray, _windows_autostart_set, _windows_autostart_get
+from app.views.main import open_main
+from app.tray import _start_tray, _stop_tray, _exit_app, _windows_autostart_set, _windows_autostart_get
+from app.dispatch import CMD_EXIT, CMD_SHOW, UiDispatcher
+from app.jobs import install_jobs
 from app.utils import install_crosslayout_shortcuts, apply_builtins_fresh_style
-import socket
-import threading
+from app.icons import icon_sources, prepared_icons
+from app.ipc import IpcServer, post_command
+from app.storage import backup_db_weekly, load_settings, save_settings
 
 # Resolve storage directory deterministically to avoid mixing different working dirs
 def _get_storage_dir() -> str:
@@ -30,137 +60,9 @@ def _get_storage_dir() -> str:
 STORAGE_DIR = _get_storage_dir()
 SETTINGS_FILE = os.path.join(STORAGE_DIR, "settings.json")
 DB_FILE = os.path.join(STORAGE_DIR, "data.db")
-
-# --- DB backup (weekly rotation, keep last 7 days) ---
-def backup_db_weekly(db_path: str, base_dir: str):
-    try:
-        if not os.path.isfile(db_path):
-            return
-        backup_dir = os.path.join(base_dir, "Копия БД")
-        try:
-            os.makedirs(backup_dir, exist_ok=True)
-        except Exception:
-            pass
-        # Today's stamp
-        today = datetime.now().strftime("%Y-%m-%d")
-        # File name: data.db_YYYY-MM-DD.sqlite (or .db)
-        backup_name = f"data.db_{today}.db"
-        backup_path = os.path.join(backup_dir, backup_name)
-        # Create only if not exists
-        if not os.path.isfile(backup_path):
-            shutil.copy2(db_path, backup_path)
-        # Rotation: keep last 7 files by date in name
-        files = []
-        for fn in os.listdir(backup_dir):
-            if fn.startswith("data.db_") and fn.endswith(".db"):
-                # Extract date safely
-                try:
-                    stamp = fn[len("data.db_"):-len(".db")]
-                    dt = datetime.strptime(stamp, "%Y-%m-%d")
-                except Exception:
-                    dt = None
-                files.append((dt, fn))
-        # Sort by date descending, drop entries with None date last
-        files.sort(key=lambda x: (x[0] is None, x[0] or datetime.min), reverse=True)
-        # Keep first 7 valid dated backups, delete the rest
-        keep = 7
-        for i, (dt, fn) in enumerate(files):
-            if i >= keep:
-                try:
-                    os.remove(os.path.join(backup_dir, fn))
-                except Exception:
-                    pass
-    except Exception:
-        pass
-
-
-def ensure_settings(path: str):
-    if not os.path.exists(path):
-        # Defaults: UI scale, font size, export path and tray/autostart
-        desktop = os.path.join(os.path.expanduser("~"), "Desktop")
-        export_path = desktop if os.path.isdir(desktop) else os.getcwd()
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(
-                {
-                    "version": 1,
-                    "ui_scale": 1.25,
-                    "ui_font_size": 15,
-                    "export_path": export_path,
-                    "tray_enabled": True,
-                    "minimize_to_tray": True,
-                    "start_in_tray": True,
-                    "autostart_enabled": False,
-                    "tray_logo_path": "app/assets/logo.png",
-                    # Meridian notifications
-                    "notify_enabled": False,
-                    "notify_days": [],
-                    "notify_time": "09:00",
-                    # MKL notifications
-                    "mkl_notify_enabled": False,
-                    "mkl_notify_after_days": 3,
-                    "mkl_notify_time": "09:00",
-                    # Sound
-                    "notify_sound_enabled": True,
-                    "notify_sound_alias": "SystemAsterisk",
-                    "notify_sound_mode": "alias",
-                    "notify_sound_file": "",
-                    # Single instance behavior
-                    "single_instance_enabled": True,
-                    "single_instance_port": 46465,
-                },
-                f,
-                ensure_ascii=False,
-                indent=2,
-            )
-
-
-def load_settings(path: str) -> dict:
-    ensure_settings(path)
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if not isinstance(data, dict):
-                return {}
-            # Fill missing keys with defaults
-            defaults = {
-                "ui_scale": 1.25,
-                "ui_font_size": 15,
-                "tray_enabled": True,
-                "minimize_to_tray": True,
-                "start_in_tray": True,
-                "autostart_enabled": False,
-                "tray_logo_path": "app/assets/logo.png",
-                # Meridian notifications
-                "notify_enabled": False,
-                "notify_days": [],
-                "notify_time": "09:00",
-                # MKL notifications
-                "mkl_notify_enabled": False,
-                "mkl_notify_after_days": 3,
-                "mkl_notify_time": "09:00",
-                # Sound
-                "notify_sound_enabled": True,
-                "notify_sound_alias": "SystemAsterisk",
-                "notify_sound_mode": "alias",  # 'alias' or 'file'
-                "notify_sound_file": "",
-                # Single instance
-                "single_instance_enabled": True,
-                "single_instance_port": 46465,
-            }
-            for k, v in defaults.items():
-                data.setdefault(k, v)
-            return data
-    except Exception:
-        return {}
-
-
-def save_settings(path: str, data: dict):
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception:
-        pass
-
+STARTUP_LOG = os.path.join(STORAGE_DIR, "startup.log")
+ICON_CACHE_DIR = os.path.join(STORAGE_DIR, "icon_cache")
+BACKUP_DELAY_MS = 120_000  # резервная копия при старте в трей — через 2 минуты
 
 def _apply_global_fonts(root: tk.Tk, size: int):
     # Update Tk named fonts used by ttk
@@ -224,214 +126,35 @@ def _bind_minimize_to_tray(root: tk.Tk):
         pass
 
 
-def _single_instance_try_signal(port: int) -> bool:
+def _show_from_background(root: tk.Tk):
+    """CMD_SHOW (трей «Открыть», второй запуск): построить окно при первом показе, вернуть из трея, поднять наверх."""
+    from app.tray import _show_main_window
+    _stop_tray(root)
+    _show_main_window(root)
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(0.6)
-            s.connect(("127.0.0.1", int(port)))
-            s.sendall(b"SHOW")
-            return True
+        root.attributes("-topmost", True)
+        root.after(300, lambda: root.attributes("-topmost", False))
     except Exception:
-        return False
-
-def _single_instance_start_server(root: tk.Tk, port: int):
-    def server():
-        try:
-            srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            srv.bind(("127.0.0.1", int(port)))
-            srv.listen(5)
-        except Exception:
-            # Port in use or bind failed — skip server
-            return
-        while True:
-            try:
-                conn, _ = srv.accept()
-            except Exception:
-                break
-            try:
-                data = conn.recv(16)
-                if data and data.strip().upper() == b"SHOW":
-                    try:
-                        root.after(0, lambda: (_stop_tray(root), root.deiconify()))
-                        # Bring to front
-                        root.after(50, lambda: root.attributes("-topmost", True))
-                        root.after(350, lambda: root.attributes("-topmost", False))
-                        # If tray enabled and minimized, also restore main window via helper
-                        try:
-                            from app.tray import _show_main_window
-                            root.after(0, lambda: _show_main_window(root))
-                        except Exception:
-                            pass
-                    except Exception:
-                        pass
-            finally:
-                try:
-                    conn.close()
-                except Exception:
-                    pass
+        pass
 
-    t = threading.Thread(target=server, daemon=True)
-    t.start()
 
-def main():
-    # Early settings load to check single-instance toggle
-    early_settings = load_settings(SETTINGS_FILE)
-    if bool(early_settings.get("single_instance_enabled", True)):
-        port = int(early_settings.get("single_instance_port", 46465))
-        # If an instance is already running, signal it to show and exit this process
-        if _single_instance_try_signal(port):
-            return
+def _single_instance_try_signal(port: int) -> bool:
+    """Второй запуск: попросить работающий экземпляр показать окно (True — команда доставлена)."""
+    return post_command(port, "show")
 
-    # High-DPI scaling for readability (Windows)
-    try:
-        from ctypes import windll
-        windll.shcore.SetProcessDpiAwareness(1)
-    except Exception:
-        pass
+def _single_instance_start_server(root: tk.Tk, port: int):
+    # Commands run on the Tk thread via the UI dispatcher; the asyncio loop only moves frames
+    server = IpcServer(root, port)
+    if server.start():
+        root.ipc_server = server
 
-    root = tk.Tk()
+def _build_window(root: tk.Tk, app_settings: dict):
+    """Настройки окна, которые нужны только для показа UI: раскладки, масштаб, шрифты, стили, геометрия."""
     # Make common shortcuts work with any keyboard layout (RU/EN etc.)
     try:
         install_crosslayout_shortcuts(root)
     except Exception:
         pass
-
-    # Load settings and apply UI scale
-    app_settings = load_settings(SETTINGS_FILE)
-
-    # Set crisp window icon (optimize for title bar): prefer 32x32 or ICO on Windows
-    try:
-        import sys
-        configured = (app_settings.get("tray_logo_path") or "").strip()
-        rel_candidates = [
-            configured,
-            os.path.join("app", "assets", "favicon.ico"),                  # often contains 16/32 px
-            os.path.join("app", "assets", "favicon-32x32.png"),
-            os.path.join("app", "assets", "favicon-16x16.png"),
-            os.path.join("app", "assets", "android-chrome-192x192.png"),
-            os.path.join("app", "assets", "apple-touch-icon.png"),
-            os.path.join("app", "assets", "logo.png"),
-        ]
-        bases = [
-            os.getcwd(),
-            os.path.dirname(__file__),
-            os.path.dirname(sys.executable) if getattr(sys, "frozen", False) else os.getcwd(),
-            getattr(sys, "_MEIPASS", None),
-        ]
-        bases = [b for b in bases if b]
-
-        def _resolve(path_like: str) -> list[str]:
-            if not path_like:
-                return []
-            if os.path.isabs(path_like) and os.path.isfile(path_like):
-                return [path_like]
-            paths = []
-            for b in bases:
-                p = os.path.normpath(os.path.join(b, path_like))
-                try:
-                    if os.path.isfile(p):
-                        paths.append(p)
-                except Exception:
-                    continue
-            return paths
-
-        existing = []
-        for rel in rel_candidates:
-            existing.extend(_resolve(rel))
-
-        # On Windows, prefer .ico directly for the title bar if available
-        icon_path = None
-        if os.name == "nt":
-            for p in existing:
-                if p.lower().endswith(".ico"):
-                    icon_path = p
-                    break
-
-        if icon_path:
-            try:
-                root.iconbitmap(icon_path)
-            except Exception:
-                icon_path = None
-
-        if not icon_path:
-            # Create a 32x32 PNG for the title bar using Pillow if possible
-            try:
-                from PIL import Image
-                src = None
-                # Choose best source for downscale: square PNG with alpha and size >= 32
-                def _score_src(path: str) -> float:
-                    try:
-                        with Image.open(path) as im:
-                            w, h = im.size
-                            ext = os.path.splitext(path)[1].lower()
-                            score = 0.0
-                            if ext == ".png": score += 3.0
-                            if w == h: score += 2.0
-                            if im.mode in ("RGBA", "LA") or ("transparency" in im.info): score += 1.0
-                            long_side = max(w, h)
-                            ideal = 48  # 32..48 for title looks crisp
-                            if long_side >= 32: score += 1.5
-                            score -= abs(long_side - ideal) / 128.0
-                            return score
-                    except Exception:
-                        return -10.0
-                best = None
-                best_s = -1e9
-                for p in existing:
-                    if p.lower().endswith(".ico"):
-                        continue
-                    s = _score_src(p)
-                    if s > best_s:
-                        best_s = s
-                        best = p
-                src = best if best else (existing[0] if existing else None)
-
-                if src:
-                    with Image.open(src) as im:
-                        im = im.convert("RGBA")
-                        im = im.resize((32, 32), Image.LANCZOS)
-                        # Ensure assets dir exists (works both dev and onefile temp)
-                        out_dir = os.path.join(os.getcwd(), "app", "assets")
-                        try:
-                            os.makedirs(out_dir, exist_ok=True)
-                        except Exception:
-                            pass
-                        out_path = os.path.join(out_dir, "_window_icon_32.png")
-                        try:
-                            im.save(out_path, format="PNG")
-                            icon_img = tk.PhotoImage(file=out_path)
-                            root.iconphoto(True, icon_img)
-                            root._app_icon_img = icon_img  # keep ref to prevent GC
-                        except Exception:
-                            # fallback: try direct PhotoImage from src
-                            try:
-                                icon_img = tk.PhotoImage(file=src)
-                                root.iconphoto(True, icon_img)
-                                root._app_icon_img = icon_img
-                            except Exception:
-                                pass
-            except Exception:
-                # Last resort: try first existing as-is
-                try:
-                    if existing:
-                        any_path = existing[0]
-                        if any_path.lower().endswith(".ico") and os.name == "nt":
-                            root.iconbitmap(any_path)
-                        else:
-                            icon_img = tk.PhotoImage(file=any_path)
-                            root.iconphoto(True, icon_img)
-                            root._app_icon_img = icon_img
-                except Exception:
-                    pass
-    except Exception:
-        pass
-    root.app_settings = app_settings
-    # Expose resolved settings path for other modules (tray) to persist reliably
-    try:
-        root.app_settings_path = SETTINGS_FILE
-    except Exception:
-        pass
     ui_scale = float(app_settings.get("ui_scale", 1.25))
     try:
         root.tk.call("tk", "scaling", ui_scale)
@@ -469,6 +192,81 @@ def main():
                 except Exception:
                     pass
 
+
+def _apply_window_icon(root: tk.Tk, app_settings: dict):
+    """Set crisp window icon: ICO on Windows, else prepared 16/32/64 px PNGs from the icon cache."""
+    try:
+        if os.name == "nt":
+            # On Windows, prefer .ico directly for the title bar if available
+            for p in icon_sources(app_settings):
+                if p.lower().endswith(".ico"):
+                    try:
+                        root.iconbitmap(p)
+                        return
+                    except Exception:
+                        break
+        icons = prepared_icons(app_settings, ICON_CACHE_DIR)
+        images = [tk.PhotoImage(file=icons[size]) for size in (64, 32, 16) if size in icons]
+        if not images:
+            # No Pillow and no cache yet: try a PNG source as-is
+            for p in icon_sources(app_settings):
+                if p.lower().endswith(".png"):
+                    images = [tk.PhotoImage(file=p)]
+                    break
+        if images:
+            root.iconphoto(True, *images)
+            root._app_icon_imgs = images  # keep refs to prevent GC
+    except Exception:
+        pass
+
+
+def main():
+    timer = StartupTimer("start", started=_PROCESS_STARTED, cpu_started=_PROCESS_CPU, flags=_PROFILE)
+    timer.mark("import")
+    # Early settings load to check single-instance toggle
+    early_settings = load_settings(SETTINGS_FILE)
+    if bool(early_settings.get("single_instance_enabled", True)):
+        port = int(early_settings.get("single_instance_port", 46465))
+        # If an instance is already running, signal it to show and exit this process
+        if _single_instance_try_signal(port):
+            return
+    timer.mark("settings")
+
+    # High-DPI scaling for readability (Windows)
+    try:
+        from ctypes import windll
+        windll.shcore.SetProcessDpiAwareness(1)
+    except Exception:
+        pass
+
+    root = tk.Tk()
+    timer.mark("tk")
+    app_settings = early_settings
+    root.app_settings = app_settings
+    root.icon_cache_dir = ICON_CACHE_DIR
+    root.startup_log_path = STARTUP_LOG
+    # Expose resolved settings path for other modules (tray) to persist reliably
+    try:
+        root.app_settings_path = SETTINGS_FILE
+    except Exception:
+        pass
+
+    # UI work from background threads (tray, single-instance server, workers) goes through this queue
+    dispatcher = UiDispatcher(root)
+    dispatcher.register(CMD_SHOW, lambda _payload: _show_from_background(root))
+    dispatcher.register(CMD_EXIT, lambda _payload: _exit_app(root))
+    root.dispatcher = dispatcher
+    root.show_from_background = lambda: _show_from_background(root)
+    dispatcher.start()
+
+    # Трей-режим: окно, шрифты, стили, иконка и сиды БД строятся только по «Открыть»
+    tray_first = bool(app_settings.get("tray_enabled", True) and app_settings.get("start_in_tray", True))
+    if tray_first:
+        try:
+            root.withdraw()
+        except Exception:
+            pass
+
     # One-time DB reset if requested in settings
     try:
         if bool(app_settings.get("reset_db_once", False)):
@@ -485,15 +283,27 @@ def main():
                 pass
     except Exception:
         pass
+    timer.mark("reset-check")
 
-    # Create DB backup (weekly rotation, keep last 7)
-    try:
-        backup_db_weekly(DB_FILE, STORAGE_DIR)
-    except Exception:
-        pass
+    # Create DB backup (weekly rotation, keep last 7); при старте в трей — позже, не в момент входа в систему
+    if tray_first:
+        def _deferred_backup():
+            try:
+                backup_db_weekly(DB_FILE, STORAGE_DIR)
+            except Exception:
+                pass
+
+        root.after(BACKUP_DELAY_MS, _deferred_backup)
+    else:
+        try:
+            backup_db_weekly(DB_FILE, STORAGE_DIR)
+        except Exception:
+            pass
+        timer.mark("backup")
 
-    # Ensure DB
-    root.db = AppDB(DB_FILE)
+    # Ensure DB (в трей-режиме — только схема; сиды и синхронизация каталога — при открытии окна)
+    root.db = AppDB(DB_FILE, defer_seed=tray_first)
+    timer.mark("db")
 
     # Apply autostart setting (Windows)
     try:
@@ -504,34 +314,9 @@ def main():
                 _windows_autostart_set(want_autostart)
     except Exception:
         pass
+    timer.mark("autostart")
 
-    # --- Notifications scheduler (Meridian 'Не заказан') ---
-    _scheduler = {"snoozed_until": None, "mkl_snoozed_until": None}
-
-    def _parse_notify_time(s: str):
-        try:
-            parts = (s or "").strip().split(":")
-            hh = int(parts[0])
-            mm = int(parts[1]) if len(parts) > 1 else 0
-            return max(0, min(23, hh)), max(0, min(59, mm))
-        except Exception:
-            return 9, 0  # default 09:00
-
-    def _should_notify(now):
-        settings = root.app_settings or {}
-        if not bool(settings.get("notify_enabled", False)):
-            return False
-        days = settings.get("notify_days") or []
-        try:
-            # Python Monday=0 ... Sunday=6
-            wday = now.weekday()
-        except Exception:
-            wday = -1
-        if wday not in days:
-            return False
-        hh, mm = _parse_notify_time(settings.get("notify_time", "09:00"))
-        return (now.hour == hh and now.minute == mm)
-
+    # --- Scheduled jobs: notifications, backup, reports (app/jobs.py) ---
     def _reveal_from_tray():
         # Robustly bring window to front even if tray helpers are unavailable
         try:
@@ -559,100 +344,8 @@ def main():
         except Exception:
             pass
 
-    def _check_and_notify():
-        from datetime import datetime, timedelta
-
-        now = datetime.now()
-
-        # Meridian snooze
-        until = _scheduler.get("snoozed_until")
-        if until and now < until:
-            pass
-        else:
-            if _should_notify(now):
-                # Meridian 'Не заказан'
-                try:
-                    db = getattr(root, "db", None)
-                    orders = db.list_meridian_orders() if db else []
-                    pending = [o for o in orders if (o.get("status", "") or "").strip() == "Не заказан"]
-                except Exception:
-                    pending = []
-                if pending:
-                    _reveal_from_tray()
-                    try:
-                        from app.views.notify import show_meridian_notification
-                        def on_snooze(minutes):
-                            _scheduler["snoozed_until"] = now + timedelta(minutes=minutes)
-                        def on_mark_ordered():
-                            try:
-                                for o in pending:
-                                    root.db.update_meridian_order(o["id"], {"status": "Заказан", "date": datetime.now().strftime("%Y-%m-%d %H:%M")})
-                            except Exception:
-                                pass
-                        show_meridian_notification(root, pending, on_snooze=on_snooze, on_mark_ordered=on_mark_ordered)
-                    except Exception:
-                        pass
-
-        # MKL notifications: time-based daily check with age threshold
-        try:
-            settings = root.app_settings or {}
-            if bool(settings.get("mkl_notify_enabled", False)):
-                hh, mm = _parse_notify_time(settings.get("mkl_notify_time", "09:00"))
-                if now.hour == hh and now.minute == mm:
-                    # Snooze gate for MKL
-                    mkl_until = _scheduler.get("mkl_snoozed_until")
-                    if not (mkl_until and now < mkl_until):
-                        days = int(settings.get("mkl_notify_after_days", 3))
-                        threshold = now - timedelta(days=max(0, days))
-                        try:
-                            db = getattr(root, "db", None)
-                            mkl_orders = db.list_mkl_orders() if db else []
-                        except Exception:
-                            mkl_orders = []
-                        aged_pending = []
-                        for o in mkl_orders:
-                            try:
-                                if (o.get("status", "") or "").strip() != "Не заказан":
-                                    continue
-                                ds = (o.get("date", "") or "").strip()
-                                dt = None
-                                for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d", "%d.%m.%Y %H:%M", "%d.%m.%Y"):
-                                    try:
-                                        from datetime import datetime as _dt
-                                        dt = _dt.strptime(ds, fmt)
-                                        break
-                                    except Exception:
-                                        continue
-                                if dt is None:
-                                    continue
-                                if dt <= threshold:
-                                    aged_pending.append(o)
-                            except Exception:
-                                continue
-                        if aged_pending:
-                            _reveal_from_tray()
-                            try:
-                                from app.views.notify import show_mkl_notification
-                                def on_snooze_days(d):
-                                    _scheduler["mkl_snoozed_until"] = now + timedelta(days=d)
-                                def on_mark_ordered_mkl():
-                                    try:
-                                        for o in aged_pending:
-                                            root.db.update_mkl_order(o["id"], {"status": "Заказан", "date": datetime.now().strftime("%Y-%m-%d %H:%M")})
-                                    except Exception:
-                                        pass
-                                show_mkl_notification(root, aged_pending, on_snooze_days=on_snooze_days, on_mark_ordered=on_mark_ordered_mkl)
-                            except Exception:
-                                pass
-        except Exception:
-            pass
-
-        # Re-check every minute
-        root.after(60_000, _check_and_notify)
-
-    # Start scheduler loop
     try:
-        root.after(3_000, _check_and_notify)
+        install_jobs(root, _reveal_from_tray, lambda: backup_db_weekly(DB_FILE, STORAGE_DIR)).start(3_000)
     except Exception:
         pass
 
@@ -680,30 +373,57 @@ def main():
         _bind_minimize_to_tray(root)
     except Exception:
         pass
+    timer.mark("services")
 
-    # Launch UI
-    if app_settings.get("tray_enabled", True) and app_settings.get("start_in_tray", True):
-        # Initialize UI, then start hidden in tray
+    def ensure_ui(ui_timer: StartupTimer | None = None):
+        """Построить окно (один раз): масштаб, шрифты, стили, иконка, сиды БД, главное меню."""
+        if getattr(root, "main_initialized", False):
+            return
+        own = ui_timer is None
+        ui_timer = ui_timer or StartupTimer("open", flags=_PROFILE)
+        _build_window(root, app_settings)
+        ui_timer.mark("window")
         try:
-            MainWindow(root)
-            root.main_initialized = True
+            _apply_window_icon(root, app_settings)
         except Exception:
             pass
+        ui_timer.mark("icon")
+        try:
+            root.db.ensure_ready()
+        except Exception:
+            pass
+        ui_timer.mark("db-ready")
+        open_main(root)
+        root.main_initialized = True
+        ui_timer.mark("main-menu")
+        if own:
+            ui_timer.write(STARTUP_LOG)
+
+    root.ensure_ui = ensure_ui
+
+    # Launch UI
+    if tray_first:
         try:
-            root.withdraw()
             _start_tray(root)
         except Exception:
-            # Fallback to visible UI
-            MainWindow(root)
-            root.main_initialized = True
-            root.mainloop()
-            return
+            pass
+        timer.mark("tray")
+        if getattr(root, "tray_icon", None) is None:
+            # Трей недоступен (нет pystray/Pillow) — показываем окно
+            ensure_ui(timer)
+            try:
+                root.deiconify()
+            except Exception:
+                pass
     else:
-        MainWindow(root)
-        root.main_initialized = True
+        ensure_ui(timer)
+    timer.write(STARTUP_LOG)
 
     root.mainloop()
 
 
 if __name__ == "__main__":
+    # Пул процессов разбора PDF-прайсов (app/pricelist.py) в собранном exe
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
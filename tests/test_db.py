@@ -0,0 +1,24 @@
+from app.db import AppDB
+
+
+def test_mkl_order_pages_and_positions_follow_full_list(tmp_path):
+    db = AppDB(str(tmp_path / "data.db"), defer_seed=True)
+    for n in range(25):
+        db.add_mkl_order({"fio": f"Клиент {n}", "product": "Линза", "qty": "1"})
+    db.delete_mkl_order(7)
+    orders = db.list_mkl_orders()
+    assert db.count_mkl_orders() == len(orders) == 24
+    assert db.list_mkl_orders(limit=10, offset=10) == orders[10:20]
+    assert [db.mkl_order_position(o["id"]) for o in orders] == list(range(len(orders)))
+    assert db.mkl_order_position(7) is None
+
+
+def test_client_pages_and_positions_follow_full_list(tmp_path):
+    path = str(tmp_path / "data.db")
+    db = AppDB(path, defer_seed=True)
+    for fio in ("Петров", "иванов", "Иванов", "Сидоров", "Абрамов", "петров"):
+        db.add_client(fio, "79000000000")
+    clients = db.list_clients()
+    assert db.list_clients(limit=3, offset=2) == clients[2:5]
+    assert [db.client_position(c["id"]) for c in clients] == list(range(len(clients)))
+    assert AppDB.read_clients(path) == clients
@@ -0,0 +1,27 @@
+from app.pricelist import parse_csv
+
+
+HEADER_ROWS = [
+    "Наименование;Кол-во;Цена",
+    "Линза Acuvue Oasys;6;1 250,00",
+    "Раствор Opti-Free 355 мл;12;690",
+]
+
+
+def _write(tmp_path, lines):
+    path = tmp_path / "price.csv"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def _prices(rows):
+    return [(r["product"], r["price"]) for r in rows]
+
+
+def test_title_row_above_header_is_not_price_column(tmp_path):
+    expected = [("Линза Acuvue Oasys", 1250.0), ("Раствор Opti-Free 355 мл", 690.0)]
+    assert _prices(parse_csv(_write(tmp_path, HEADER_ROWS))) == expected
+    # Выгрузка Excel дополняет титул разделителями, «ручной» CSV — нет
+    for title in ("Цены указаны в рублях с НДС;;", "Цены указаны в рублях с НДС"):
+        assert _prices(parse_csv(_write(tmp_path, [title, ";;"] + HEADER_ROWS))) == expected
+        assert _prices(parse_csv(_write(tmp_path, [title, ""] + HEADER_ROWS))) == expected
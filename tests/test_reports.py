@@ -0,0 +1,27 @@
+from app.db import AppDB
+from app.reports import ReportEngine
+
+
+def _totals(engine: ReportEngine) -> list:
+    return [
+        tuple(r) for r in engine.conn.execute(
+            "SELECT order_type, day, product, status, orders, qty FROM report_daily ORDER BY 1, 2, 3, 4;"
+        ).fetchall()
+    ]
+
+
+def test_refresh_matches_rebuild_after_mkl_delete(tmp_path):
+    db = AppDB(str(tmp_path / "data.db"), defer_seed=True)
+    engine = ReportEngine(db)
+    ids = [
+        db.add_mkl_order({"fio": f"Клиент {n}", "product": "Линза", "qty": "3", "date": "2024-05-01 10:00"})
+        for n in range(5)
+    ]
+    engine.refresh()
+    db.delete_mkl_order(ids[0])
+    db.delete_mkl_order(ids[1])
+    engine.refresh()
+    incremental = _totals(engine)
+    engine.rebuild()
+    assert incremental == _totals(engine)
+    assert incremental == [("mkl", "2024-05-01", "Линза", "Не заказан", 3, 9)]
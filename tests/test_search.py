@@ -0,0 +1,17 @@
+from app.search import ClientSearchIndex
+
+
+CLIENTS = [
+    {"fio": "Иванов Пётр Сергеевич", "phone": "+7 900 123-45-67"},
+    {"fio": "Петрова Анна", "phone": "8 (912) 555-00-11"},
+    {"fio": "Сидоров Олег", "phone": "9001112233"},
+]
+
+
+def test_full_phone_with_country_code_matches_any_stored_form():
+    index = ClientSearchIndex(CLIENTS)
+    for query in ("89001234567", "+7 900 123-45-67", "79001234567"):
+        assert index.search(query) == [0]
+    for query in ("+79125550011", "89125550011"):
+        assert index.search(query) == [1]
+    assert index.search("8 900 111-22-33") == [2]